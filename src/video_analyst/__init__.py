@@ -1,3 +1,18 @@
 """Video Analyst - Analyze videos and produce AI reproduction plans."""
 
 __version__ = "1.7.0"
+
+from .analyzer import AnalysisResult, Timings, TokenUsage
+from .config import Config
+from .models import VideoReproductionPlan
+from .session import AnalysisOutcome, VideoAnalyst
+
+__all__ = [
+    "AnalysisOutcome",
+    "AnalysisResult",
+    "Config",
+    "Timings",
+    "TokenUsage",
+    "VideoAnalyst",
+    "VideoReproductionPlan",
+]
@@ -2,28 +2,100 @@
 
 from __future__ import annotations
 
+import json
+import sqlite3
 import sys
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 
+from .archive import ResponseArchive, open_archive, prompt_fingerprint
 from .config import Config
+from .context_cache import ContextCache, create_context_cache
 from .humanizer import humanize_voiceovers
-from .models import VideoReproductionPlan, resolve_schema_refs
-from .prompts.system import get_system_prompt
-from .prompts.templates import get_user_prompt
-
-
-# Gemini 2.5 Flash pricing (per 1M tokens)
+from .ledger import check_budget, open_ledger
+from .models import VideoReproductionPlan, plan_schema, resolve_schema_refs
+from .placeholders import expand_placeholders
+from .profiles import PROFILES, Profile, resolve_profile
+from .prompts.system import get_derive_system_prompt, get_system_prompt
+from .prompts.templates import get_derive_prompt, get_outline_prompt, get_user_prompt
+from .routing import ModelRoute, route_model
+from .store import open_plan_store
+from .upload import ResumableUploader, open_uploader, progress_printer
+from .validator import validate_and_repair
+
+if TYPE_CHECKING:
+    from .dedup import PhashIndex
+
+
+# Gemini pricing (per 1M tokens; cache storage per 1M tokens per hour)
 PRICING = {
-    "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
-    "gemini-2.5-pro": {"input": 1.25, "output": 10.00},
-    "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
+    "gemini-2.5-flash": {
+        "input": 0.30,
+        "output": 2.50,
+        "cached_input": 0.03,
+        "cache_storage": 1.00,
+    },
+    "gemini-2.5-pro": {
+        "input": 1.25,
+        "output": 10.00,
+        "cached_input": 0.125,
+        "cache_storage": 4.50,
+    },
+    "gemini-2.0-flash": {
+        "input": 0.10,
+        "output": 0.40,
+        "cached_input": 0.025,
+        "cache_storage": 1.00,
+    },
 }
-DEFAULT_PRICING = {"input": 0.30, "output": 2.50}  # Flash fallback
+DEFAULT_PRICING = PRICING["gemini-2.5-flash"]  # Flash fallback
+
+# Gemini video input at default resolution: 258 tokens/frame at 1 fps + 32 tokens/s audio
+VIDEO_TOKENS_PER_SECOND = 290
+
+
+def _token_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    thinking_tokens: int = 0,
+    cached_tokens: int = 0,
+    cache_storage_token_hours: float = 0.0,
+) -> float:
+    """USD cost of a token mix. Thinking tokens are billed as output."""
+    rates = PRICING.get(model, DEFAULT_PRICING)
+    uncached = prompt_tokens - cached_tokens
+    input_cost = (uncached / 1_000_000) * rates["input"]
+    cached_cost = (cached_tokens / 1_000_000) * rates["cached_input"]
+    storage_cost = (cache_storage_token_hours / 1_000_000) * rates["cache_storage"]
+    output_cost = ((completion_tokens + thinking_tokens) / 1_000_000) * rates["output"]
+    return input_cost + cached_cost + storage_cost + output_cost
+
+
+@dataclass
+class CallUsage:
+    """Usage of a single generate_content attempt."""
+
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    thinking_tokens: int = 0
+    cached_tokens: int = 0
+    latency_seconds: float = 0.0
+
+    def cost_usd(self) -> float:
+        return _token_cost(
+            self.model,
+            self.prompt_tokens,
+            self.completion_tokens,
+            self.thinking_tokens,
+            self.cached_tokens,
+        )
 
 
 @dataclass
@@ -32,28 +104,121 @@ class TokenUsage:
     completion_tokens: int = 0
     total_tokens: int = 0
     attempts: int = 0
-
-    def add(self, response) -> None:
-        """Accumulate token usage from a Gemini response."""
+    thinking_tokens: int = 0
+    # Prompt tokens spent on image/audio/video parts
+    media_tokens: int = 0
+    # Estimated prompt tokens had the full video been attached instead of
+    # reduced-modality input. 0 when the full video was sent.
+    full_video_prompt_tokens: int = 0
+    # Prompt tokens served from a context cache (included in prompt_tokens)
+    cached_tokens: int = 0
+    # Context cache storage used, in token-hours
+    cache_storage_token_hours: float = 0.0
+    # One entry per attempt, for the usage ledger
+    calls: list[CallUsage] = field(default_factory=list)
+    # Models tried in order, and why the cascade escalated (if it did)
+    route: list[str] = field(default_factory=list)
+    escalation_reason: str | None = None
+
+    def add(
+        self,
+        response,
+        full_video_media_tokens: int = 0,
+        model: str = "",
+        latency_seconds: float = 0.0,
+    ) -> None:
+        """Accumulate token usage from a Gemini response.
+
+        ``full_video_media_tokens`` is the estimated media cost of the full
+        video, used to report savings of reduced-modality input.
+        """
         self.attempts += 1
+        call = CallUsage(model=model, latency_seconds=latency_seconds)
+        self.calls.append(call)
         if hasattr(response, "usage_metadata") and response.usage_metadata:
             meta = response.usage_metadata
-            self.prompt_tokens += getattr(meta, "prompt_token_count", 0) or 0
-            self.completion_tokens += getattr(meta, "candidates_token_count", 0) or 0
+            prompt = getattr(meta, "prompt_token_count", 0) or 0
+            call.prompt_tokens = prompt
+            call.completion_tokens = getattr(meta, "candidates_token_count", 0) or 0
+            call.thinking_tokens = getattr(meta, "thoughts_token_count", 0) or 0
+            call.cached_tokens = getattr(meta, "cached_content_token_count", 0) or 0
+            self.prompt_tokens += prompt
+            self.completion_tokens += call.completion_tokens
+            self.thinking_tokens += call.thinking_tokens
             self.total_tokens += getattr(meta, "total_token_count", 0) or 0
+            self.cached_tokens += call.cached_tokens
+
+            media = sum(
+                d.token_count or 0
+                for d in getattr(meta, "prompt_tokens_details", None) or []
+                if d.modality and d.modality != types.MediaModality.TEXT
+            )
+            self.media_tokens += media
+            if full_video_media_tokens:
+                self.full_video_prompt_tokens += prompt - media + full_video_media_tokens
+
+    def token_reduction(self) -> float | None:
+        """Fraction of prompt tokens saved versus full-video input, if measured."""
+        if not self.full_video_prompt_tokens:
+            return None
+        return 1 - self.prompt_tokens / self.full_video_prompt_tokens
 
     def cost_usd(self, model: str = "gemini-2.5-flash") -> float:
-        """Calculate cost in USD based on model pricing."""
-        rates = PRICING.get(model, DEFAULT_PRICING)
-        input_cost = (self.prompt_tokens / 1_000_000) * rates["input"]
-        output_cost = (self.completion_tokens / 1_000_000) * rates["output"]
-        return input_cost + output_cost
+        """Calculate cost in USD based on model pricing.
+
+        Cached prompt tokens are billed at the cached-input rate, plus
+        hourly storage for the cache itself. Each attempt is priced at the
+        model that served it; ``model`` prices the rest.
+        """
+        if not self.calls:
+            return _token_cost(
+                model,
+                self.prompt_tokens,
+                self.completion_tokens,
+                self.thinking_tokens,
+                self.cached_tokens,
+                self.cache_storage_token_hours,
+            )
+        return sum(
+            _token_cost(
+                call.model or model,
+                call.prompt_tokens,
+                call.completion_tokens,
+                call.thinking_tokens,
+                call.cached_tokens,
+            )
+            for call in self.calls
+        ) + self.storage_cost_usd(model)
+
+    def storage_cost_usd(self, model: str) -> float:
+        """The context cache storage part of ``cost_usd``."""
+        # The cache is created for the first model of the route
+        cache_model = self.route[0] if self.route else model
+        return _token_cost(
+            cache_model, 0, 0, cache_storage_token_hours=self.cache_storage_token_hours
+        )
+
+
+@dataclass
+class Timings:
+    """Wall-clock seconds spent in each pipeline stage."""
+
+    download_seconds: float = 0.0
+    upload_seconds: float = 0.0
+    analysis_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.download_seconds + self.upload_seconds + self.analysis_seconds
 
 
 @dataclass
 class AnalysisResult:
     plan: VideoReproductionPlan
     token_usage: TokenUsage
+    # Source URL of the near-duplicate whose stored plan was reused, if any
+    reused_from: str | None = None
+    timings: Timings = field(default_factory=Timings)
 
 
 def _wait_for_file_active(
@@ -71,9 +236,53 @@ def _wait_for_file_active(
             print(f"  File state: {f.state}, waiting...", file=sys.stderr)
         time.sleep(2)
     else:
-        raise RuntimeError(
-            f"File processing timed out after {timeout}s: {uploaded_file.name}"
-        )
+        raise RuntimeError(f"File processing timed out after {timeout}s: {uploaded_file.name}")
+
+
+def build_generation_config(
+    system_prompt: str,
+    schema: dict,
+    cached_content: str | None = None,
+    model: str = "",
+    profile: Profile | None = None,
+) -> types.GenerateContentConfig:
+    """Request config for a structured plan response.
+
+    With ``cached_content`` the system prompt already lives in the cache and
+    must not be resent. ``profile`` sets media resolution and thinking budget
+    (as far as ``model`` supports them).
+    """
+    return types.GenerateContentConfig(
+        system_instruction=None if cached_content else system_prompt,
+        cached_content=cached_content,
+        response_mime_type="application/json",
+        response_schema=schema,
+        **(profile or PROFILES["balanced"]).generation_settings(model),
+    )
+
+
+def video_part(
+    uploaded_file,
+    profile: Profile | None = None,
+    start_seconds: float | None = None,
+    end_seconds: float | None = None,
+) -> types.Part:
+    """Part referencing an uploaded video, sampled at the profile's frame rate.
+
+    ``start_seconds``/``end_seconds`` clip the part so only that range is
+    tokenized.
+    """
+    metadata = profile.video_metadata() if profile else None
+    if start_seconds is not None or end_seconds is not None:
+        metadata = metadata or types.VideoMetadata()
+        if start_seconds is not None:
+            metadata.start_offset = f"{start_seconds:.1f}s"
+        if end_seconds is not None:
+            metadata.end_offset = f"{end_seconds:.1f}s"
+    return types.Part(
+        file_data=types.FileData(file_uri=uploaded_file.uri, mime_type=uploaded_file.mime_type),
+        video_metadata=metadata,
+    )
 
 
 def _generate_with_retry(
@@ -82,33 +291,84 @@ def _generate_with_retry(
     contents: list,
     system_prompt: str,
     schema: dict,
-    uploaded_file,
+    media_parts: list,
     user_prompt: str,
     token_usage: TokenUsage,
     verbose: bool = False,
     max_retries: int = 2,
+    full_video_media_tokens: int = 0,
+    cache: ContextCache | None = None,
+    escalate_to: str | None = None,
+    profile: Profile | None = None,
+    style: str | None = None,
+    archive: ResponseArchive | None = None,
 ) -> VideoReproductionPlan:
-    """Generate content with retry on truncation or validation errors."""
-
-    for attempt in range(max_retries + 1):
+    """Generate content with retry on truncation, parse or unrepairable plan errors.
+
+    ``media_parts`` are the non-text parts of the request, reused when it is
+    rebuilt for a retry. With a context ``cache`` the media and system prompt
+    live in the cache, so ``contents`` holds only the text prompt.
+
+    With ``escalate_to``, the first failed attempt switches to that model,
+    which then gets the full ``max_retries``. The cache is bound to the first
+    model, so escalated requests send the media inline.
+
+    With ``style``, ``{{style}}``/``{{char:Name}}`` placeholders in the parsed
+    plan are expanded before it is validated. Every raw response is written
+    to ``archive`` when given.
+    """
+    token_usage.route.append(model)
+    total_attempts = max_retries + 1 + (1 if escalate_to else 0)
+
+    def retry_contents(prompt: str) -> list:
+        request_media = [] if cache is not None else media_parts
+        return [types.Content(parts=[*request_media, types.Part.from_text(text=prompt)])]
+
+    def escalate(reason: str) -> None:
+        nonlocal model, escalate_to, cache
+        print(f"  {model} failed ({reason}), escalating to {escalate_to}", file=sys.stderr)
+        model, escalate_to, cache = escalate_to, None, None
+        token_usage.route.append(model)
+        token_usage.escalation_reason = reason
+
+    for attempt in range(total_attempts):
+        last_attempt = attempt == total_attempts - 1
         if verbose and attempt > 0:
             print(f"  Retry attempt {attempt}...", file=sys.stderr)
+        if cache is not None:
+            cache.keep_alive()
 
+        started = time.monotonic()
         response = client.models.generate_content(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=schema,
-                temperature=0.7,
-                max_output_tokens=65536,
+            config=build_generation_config(
+                system_prompt,
+                schema,
+                cached_content=cache.name if cache else None,
+                model=model,
+                profile=profile,
             ),
         )
 
-        token_usage.add(response)
+        token_usage.add(
+            response,
+            full_video_media_tokens=full_video_media_tokens,
+            model=model,
+            latency_seconds=time.monotonic() - started,
+        )
 
         raw = response.text
+        finish_reason = None
+        if response.candidates and response.candidates[0].finish_reason:
+            finish_reason = str(response.candidates[0].finish_reason)
+        if archive is not None:
+            archive.record(
+                raw,
+                token_usage.calls[-1],
+                prompt_fingerprint(system_prompt, schema, contents),
+                finish_reason=finish_reason,
+            )
         if verbose:
             print(f"  Response length: {len(raw)} chars", file=sys.stderr)
             if response.usage_metadata:
@@ -122,51 +382,308 @@ def _generate_with_retry(
 
         # Check if response was truncated
         truncated = False
-        if response.candidates and response.candidates[0].finish_reason:
-            reason = str(response.candidates[0].finish_reason)
-            if "MAX_TOKENS" in reason or "LENGTH" in reason:
-                truncated = True
-                if verbose:
-                    print(f"  Response truncated (reason: {reason})", file=sys.stderr)
+        if finish_reason and ("MAX_TOKENS" in finish_reason or "LENGTH" in finish_reason):
+            truncated = True
+            if verbose:
+                print(f"  Response truncated (reason: {finish_reason})", file=sys.stderr)
 
         # Try to parse
         try:
             plan = VideoReproductionPlan.model_validate_json(raw)
-            return plan
         except Exception as e:
-            if attempt < max_retries:
-                if truncated:
+            if not last_attempt:
+                if escalate_to:
+                    escalate("truncated output" if truncated else "unparseable output")
+                    contents = retry_contents(user_prompt)
+                elif truncated:
                     print(
                         "  Output truncated, retrying with condensed request...",
                         file=sys.stderr,
                     )
-                    condensed_prompt = (
+                    contents = retry_contents(
                         user_prompt
                         + "\n\nIMPORTANT: Keep the total response under 50000 characters. "
                         "Limit to the most important scenes (max 15 scenes). "
                         "Keep prompts concise but complete."
                     )
-                    contents = [
-                        types.Content(
-                            parts=[
-                                types.Part.from_uri(
-                                    file_uri=uploaded_file.uri,
-                                    mime_type=uploaded_file.mime_type,
-                                ),
-                                types.Part.from_text(text=condensed_prompt),
-                            ]
-                        )
-                    ]
                 else:
                     print(f"  Parse error, retrying: {e}", file=sys.stderr)
                 continue
             raise RuntimeError(
-                f"Failed to parse Gemini response after {max_retries + 1} attempts: {e}"
+                f"Failed to parse Gemini response after {total_attempts} attempts: {e}"
             ) from e
 
+        if style is not None:
+            notes = expand_placeholders(plan, style)
+            if verbose and notes:
+                print(f"  Placeholders: {'; '.join(notes)}", file=sys.stderr)
+        # Before validation, so speech estimates are of the final voiceover text
+        plan = humanize_voiceovers(plan)
+
+        # Fix constraint violations locally; only retry for what needs the model
+        report = validate_and_repair(plan)
+        if verbose and report.repairs:
+            print(f"  Repaired locally: {'; '.join(report.repairs)}", file=sys.stderr)
+        if report.ok:
+            return plan
+        if last_attempt:
+            print(
+                f"  Returning plan with unresolved issues: {' '.join(report.defects)}",
+                file=sys.stderr,
+            )
+            return plan
+
+        if escalate_to:
+            escalate(f"{len(report.defects)} validation issue(s)")
+        else:
+            print(
+                f"  Plan has {len(report.defects)} issue(s) needing the model, retrying...",
+                file=sys.stderr,
+            )
+        contents = retry_contents(
+            user_prompt
+            + "\n\nIMPORTANT: A previous answer had these problems. Avoid them:\n"
+            + "\n".join(f"- {defect}" for defect in report.defects)
+        )
+
     raise RuntimeError("Unexpected: exhausted retries without returning or raising")
 
 
+def upload_and_wait(
+    client: genai.Client,
+    path: Path,
+    verbose: bool = False,
+    uploader: ResumableUploader | None = None,
+):
+    """Upload a local file to the Gemini Files API and wait until it is ACTIVE.
+
+    With an ``uploader`` the file is sent in resumable chunks, reporting
+    progress for files larger than one chunk.
+    """
+    if uploader is not None:
+        on_progress = None
+        if verbose or path.stat().st_size > uploader.chunk_size:
+            on_progress = progress_printer(f"Uploading {path.name}")
+        uploaded = uploader.upload(path, on_progress=on_progress)
+    else:
+        uploaded = client.files.upload(file=path)
+    _wait_for_file_active(client, uploaded, verbose=verbose)
+    if verbose:
+        print(f"  File ready: {uploaded.name}", file=sys.stderr)
+    return uploaded
+
+
+def _keyframe_parts(
+    client: genai.Client,
+    video_path: Path,
+    verbose: bool = False,
+    include_audio: bool = True,
+    uploader: ResumableUploader | None = None,
+):
+    """Build timestamped image parts plus an uploaded audio part.
+
+    Returns (parts, uploaded_files, full_video_media_tokens).
+    """
+    from .keyframes import prepare_keyframe_input
+
+    prepared = prepare_keyframe_input(video_path, include_audio=include_audio)
+    if verbose:
+        print(
+            f"  Selected {len(prepared.frames)} keyframes from {prepared.duration:.0f}s",
+            file=sys.stderr,
+        )
+
+    parts: list = []
+    uploaded_files = []
+    if prepared.audio_path is not None:
+        try:
+            audio_file = upload_and_wait(
+                client, prepared.audio_path, verbose=verbose, uploader=uploader
+            )
+        finally:
+            prepared.audio_path.unlink(missing_ok=True)
+        uploaded_files.append(audio_file)
+        parts.append(types.Part.from_text(text="Audio track of the full video:"))
+        parts.append(types.Part.from_uri(file_uri=audio_file.uri, mime_type=audio_file.mime_type))
+
+    for frame in prepared.frames:
+        minutes, secs = divmod(frame.timestamp, 60)
+        parts.append(types.Part.from_text(text=f"Keyframe at {int(minutes)}:{secs:04.1f}"))
+        parts.append(types.Part.from_bytes(data=frame.jpeg, mime_type="image/jpeg"))
+
+    full_video_tokens = int(prepared.duration * VIDEO_TOKENS_PER_SECOND)
+    return parts, uploaded_files, full_video_tokens
+
+
+def _storyboard_parts(frames_dir: Path, verbose: bool = False):
+    """Build timestamped inline image parts from downloaded storyboard frames.
+
+    Returns the parts; nothing is uploaded.
+    """
+    from .storyboard import load_storyboard
+
+    frames = load_storyboard(frames_dir)
+    if not frames:
+        raise RuntimeError(f"No storyboard frames in {frames_dir}")
+    if verbose:
+        print(f"  Sending {len(frames)} storyboard frames", file=sys.stderr)
+
+    parts: list = []
+    for frame in frames:
+        minutes, secs = divmod(frame.timestamp, 60)
+        parts.append(types.Part.from_text(text=f"Frame at {int(minutes)}:{secs:04.1f}"))
+        parts.append(types.Part.from_bytes(data=frame.jpeg, mime_type="image/jpeg"))
+    return parts
+
+
+@dataclass
+class SchemaCost:
+    """Prompt tokens of system prompt plus response schema for one mode."""
+
+    mode: str
+    legacy_tokens: int
+    compact_tokens: int
+
+    @property
+    def savings(self) -> float:
+        return 1 - self.compact_tokens / self.legacy_tokens if self.legacy_tokens else 0.0
+
+
+def measure_schema_tokens(
+    client: genai.Client,
+    model: str,
+    mode: str,
+    target_language: str = "en",
+    style: str = "realistic",
+) -> SchemaCost:
+    """Compare the fully described schema with the compact one plus its field reference.
+
+    The schema is counted as JSON text, the form in which it reaches the model.
+    """
+    legacy = get_system_prompt(
+        mode=mode, target_language=target_language, style=style, include_field_reference=False
+    ) + json.dumps(resolve_schema_refs(VideoReproductionPlan.model_json_schema()))
+    compact = get_system_prompt(
+        mode=mode, target_language=target_language, style=style
+    ) + json.dumps(plan_schema(mode))
+
+    def count(text: str) -> int:
+        return client.models.count_tokens(model=model, contents=text).total_tokens or 0
+
+    return SchemaCost(mode=mode, legacy_tokens=count(legacy), compact_tokens=count(compact))
+
+
+def _video_seconds(video_metadata: dict) -> float | None:
+    """Seconds of video actually sent: the analyzed ranges, else the full duration."""
+    ranges = video_metadata.get("analyzed_ranges")
+    if ranges:
+        return sum(end - start for start, end in ranges)
+    return video_metadata.get("duration")
+
+
+def record_usage(config: Config, token_usage: TokenUsage, kind: str, **labels) -> None:
+    """Append ``token_usage`` to the usage ledger; a ledger error only warns."""
+    try:
+        ledger = open_ledger(config)
+        if ledger is not None:
+            ledger.record(token_usage, kind=kind, model=config.model_name, **labels)
+    except sqlite3.Error as e:
+        print(f"  Warning: could not record usage: {e}", file=sys.stderr)
+
+
+def store_plan(
+    config: Config,
+    plan: VideoReproductionPlan,
+    token_usage: TokenUsage,
+    video_metadata: dict | None = None,
+    **labels,
+) -> None:
+    """Add a plan to the local plan store; a store error only warns."""
+    video_metadata = video_metadata or {}
+    model = token_usage.route[-1] if token_usage.route else config.model_name
+    try:
+        store = open_plan_store(config)
+        if store is not None:
+            store.add(
+                plan,
+                url=video_metadata.get("url"),
+                platform=video_metadata.get("platform"),
+                model=model,
+                cost_usd=token_usage.cost_usd(config.model_name),
+                **labels,
+            )
+    except sqlite3.Error as e:
+        print(f"  Warning: could not store plan: {e}", file=sys.stderr)
+
+
+def derive_plan(
+    plan: VideoReproductionPlan,
+    config: Config,
+    target_language: str | None = None,
+    style: str | None = None,
+    verbose: bool = False,
+    client: genai.Client | None = None,
+) -> AnalysisResult:
+    """Restyle and/or translate an existing plan from its text alone.
+
+    Sends only the plan JSON and the target style directives — no video —
+    so it costs a small fraction of a full analysis. ``style=None`` keeps
+    the current style; ``target_language=None`` keeps the current language.
+    """
+    check_budget(config)
+    client = client or genai.Client(api_key=config.gemini_api_key)
+    started = time.monotonic()
+    token_usage = TokenUsage()
+    target_language = target_language or plan.target_language
+
+    system_prompt = get_derive_system_prompt(target_language=target_language, style=style)
+    user_prompt = get_derive_prompt(
+        plan_json=plan.model_dump_json(),
+        target_language=target_language,
+        style=style,
+        source_language=plan.target_language,
+    )
+    schema = plan_schema("full")
+
+    try:
+        derived = _generate_with_retry(
+            client=client,
+            model=config.model_name,
+            contents=[types.Content(parts=[types.Part.from_text(text=user_prompt)])],
+            system_prompt=system_prompt,
+            schema=schema,
+            media_parts=[],
+            user_prompt=user_prompt,
+            token_usage=token_usage,
+            verbose=verbose,
+            archive=open_archive(config, kind="derive", style=style, language=target_language),
+        )
+    finally:
+        record_usage(config, token_usage, "derive", style=style, language=target_language)
+    return AnalysisResult(
+        plan=derived,
+        token_usage=token_usage,
+        timings=Timings(analysis_seconds=time.monotonic() - started),
+    )
+
+
+def _preselect_highlights(video_path: Path, video_metadata: dict, verbose: bool = False):
+    """Cut the liveliest windows for upload, or None to upload the whole file.
+
+    Preselection is an optimization: when it cannot run (no numpy or
+    ffmpeg, undecodable file) the full video is sent as before.
+    """
+    from .highlights import preselect_highlights
+
+    try:
+        return preselect_highlights(
+            video_path, source_ranges=video_metadata.get("analyzed_ranges"), verbose=verbose
+        )
+    except RuntimeError as e:
+        print(f"  Warning: highlight preselection skipped: {e}", file=sys.stderr)
+        return None
+
+
 def analyze_video(
     video_path: Path,
     mode: str,
@@ -175,70 +692,268 @@ def analyze_video(
     config: Config,
     style: str = "realistic",
     verbose: bool = False,
+    input_mode: str = "video",
+    client: genai.Client | None = None,
+    dedup_index: PhashIndex | None = None,
 ) -> AnalysisResult:
-    """Upload video to Gemini and produce a structured reproduction plan."""
-
-    client = genai.Client(api_key=config.gemini_api_key)
+    """Upload video to Gemini and produce a structured reproduction plan.
+
+    ``input_mode`` is "video" (send the full file), "keyframes" (send
+    locally selected frames plus a low-bitrate audio track) or "storyboard"
+    (``video_path`` is a directory of storyboard frames; see
+    storyboard.download_storyboard). ``client`` and ``dedup_index`` let
+    long-lived callers reuse them across videos.
+    """
+
+    # Step 0: Reuse the plan of an already-analyzed near-duplicate.
+    # Storyboard thumbnails are too coarse to hash against decoded video.
+    index = signature = None
+    if config.dedup and input_mode != "storyboard":
+        from .dedup import PhashIndex, video_signature
+
+        index = dedup_index or PhashIndex(config.data_dir / "phash-index")
+        signature = video_signature(video_path)
+        matches = [m for m in index.lookup(signature) if m.entry.mode == mode]
+        for match in matches:
+            entry = match.entry
+            if (entry.target_language, entry.style) == (target_language, style):
+                print(
+                    f"[2/4] Near-duplicate of {entry.url} "
+                    f"(distance {match.distance:.1f}), reusing stored plan",
+                    file=sys.stderr,
+                )
+                return AnalysisResult(
+                    plan=match.load_plan(index),
+                    token_usage=TokenUsage(),
+                    reused_from=entry.url,
+                )
+        if matches:
+            # Same video analyzed with another style/language: rewrite its plan as text
+            entry = matches[0].entry
+            print(
+                f"[2/4] Near-duplicate of {entry.url} "
+                f"(distance {matches[0].distance:.1f}), deriving from stored plan",
+                file=sys.stderr,
+            )
+            derived = derive_plan(
+                matches[0].load_plan(index),
+                config,
+                target_language=target_language,
+                style=style if style != entry.style else None,
+                verbose=verbose,
+                client=client,
+            )
+            index.add(
+                signature,
+                derived.plan,
+                url=video_metadata.get("url") or str(video_path),
+                mode=mode,
+                target_language=target_language,
+                style=style,
+            )
+            store_plan(
+                config,
+                derived.plan,
+                derived.token_usage,
+                video_metadata,
+                mode=mode,
+                style=style,
+                language=target_language,
+            )
+            derived.reused_from = entry.url
+            return derived
+
+    check_budget(config)
+    client = client or genai.Client(api_key=config.gemini_api_key)
     token_usage = TokenUsage()
+    timings = Timings()
+    full_video_media_tokens = 0
+    profile = resolve_profile(config.profile, mode, config.mode_profiles)
+    if verbose:
+        print(f"  Profile: {profile.name}", file=sys.stderr)
 
-    # Step 1: Upload video file
+    # Step 1: Upload media
     print("[2/4] Uploading to Gemini...", file=sys.stderr)
-    uploaded_file = client.files.upload(file=video_path)
+    started = time.monotonic()
+    uploader = open_uploader(config)
+    if input_mode == "keyframes":
+        # A caption transcript stands in for the audio track
+        media_parts, uploaded_files, full_video_media_tokens = _keyframe_parts(
+            client,
+            video_path,
+            verbose=verbose,
+            include_audio=not video_metadata.get("transcript"),
+            uploader=uploader,
+        )
+        video_metadata = {**video_metadata, "input_mode": "keyframes"}
+    elif input_mode == "storyboard":
+        media_parts, uploaded_files = _storyboard_parts(video_path, verbose=verbose), []
+        duration = video_metadata.get("duration") or 0
+        full_video_media_tokens = int(duration * VIDEO_TOKENS_PER_SECOND)
+        video_metadata = {**video_metadata, "input_mode": "storyboard"}
+    else:
+        upload_path = video_path
+        if mode == "highlights" and config.highlight_preselect:
+            selection = _preselect_highlights(video_path, video_metadata, verbose)
+            if selection is not None:
+                upload_path = selection.clip_path
+                video_metadata = {
+                    **video_metadata,
+                    "analyzed_ranges": selection.ranges,
+                    "highlights_preselected": True,
+                }
+                full_video_media_tokens = int(selection.duration * VIDEO_TOKENS_PER_SECOND)
+        try:
+            uploaded_file = upload_and_wait(client, upload_path, verbose=verbose, uploader=uploader)
+        finally:
+            if upload_path != video_path:
+                upload_path.unlink(missing_ok=True)
+        uploaded_files = [uploaded_file]
+        media_parts = [video_part(uploaded_file, profile)]
 
-    # Wait for file to be processed
-    _wait_for_file_active(client, uploaded_file, verbose=verbose)
-    if verbose:
-        print(f"  File ready: {uploaded_file.name}", file=sys.stderr)
+    timings.upload_seconds = time.monotonic() - started
 
-    # Step 2: Build prompts
-    system_prompt = get_system_prompt(
-        mode=mode, target_language=target_language, style=style
-    )
-    user_prompt = get_user_prompt(
-        mode=mode,
-        target_language=target_language,
-        video_metadata=video_metadata,
-        style=style,
-    )
+    started = time.monotonic()
+    cache: ContextCache | None = None
+    try:
+        # Step 2: Build prompts
+        system_prompt = get_system_prompt(mode=mode, target_language=target_language, style=style)
+        user_prompt = get_user_prompt(
+            mode=mode,
+            target_language=target_language,
+            video_metadata=video_metadata,
+            style=style,
+        )
+
+        # Step 3: Build schema
+        schema = plan_schema(mode)
+
+        # Step 4: Generate structured content
+        print("[3/4] Analyzing video...", file=sys.stderr)
+        if config.two_phase:
+            # Scene calls have nothing to escalate from; the cascade does not apply
+            route = ModelRoute(model=config.model_name, escalate_to=None, reason="two-phase")
+        else:
+            route = route_model(config, mode, _video_seconds(video_metadata))
+        if verbose and config.cascade:
+            print(f"  Model route: {route.model} ({route.reason})", file=sys.stderr)
+
+        request_media = media_parts
+        if config.context_cache:
+            cache = create_context_cache(
+                client,
+                route.model,
+                media_parts,
+                system_prompt,
+                ttl_seconds=config.cache_ttl_seconds,
+                verbose=verbose,
+            )
+            if cache is not None:
+                request_media = []
+
+        contents = [types.Content(parts=[*request_media, types.Part.from_text(text=user_prompt)])]
+        archive = open_archive(
+            config,
+            kind="analyze",
+            url=video_metadata.get("url") or str(video_path),
+            mode=mode,
+            style=style,
+            language=target_language,
+            input_mode=input_mode,
+        )
+
+        if config.two_phase:
+            from .twophase import generate_two_phase
 
-    # Step 3: Build schema
-    schema = resolve_schema_refs(VideoReproductionPlan.model_json_schema())
+            clip = None
+            if input_mode == "video":
 
-    # Step 4: Generate structured content
-    print("[3/4] Analyzing video...", file=sys.stderr)
+                def clip(start: float, end: float) -> list:
+                    return [video_part(uploaded_file, profile, start, end)]
 
-    contents = [
-        types.Content(
-            parts=[
-                types.Part.from_uri(
-                    file_uri=uploaded_file.uri,
-                    mime_type=uploaded_file.mime_type,
+            plan = generate_two_phase(
+                client=client,
+                model=route.model,
+                system_prompt=system_prompt,
+                outline_prompt=get_outline_prompt(
+                    mode=mode,
+                    target_language=target_language,
+                    video_metadata=video_metadata,
+                    style=style,
                 ),
-                types.Part.from_text(text=user_prompt),
-            ]
+                mode=mode,
+                target_language=target_language,
+                style=style,
+                media_parts=media_parts,
+                token_usage=token_usage,
+                clip=clip,
+                duration=_video_seconds(video_metadata),
+                profile=profile,
+                cache=cache,
+                verbose=verbose,
+                archive=archive,
+            )
+        else:
+            plan = _generate_with_retry(
+                client=client,
+                model=route.model,
+                contents=contents,
+                system_prompt=system_prompt,
+                schema=schema,
+                media_parts=media_parts,
+                user_prompt=user_prompt,
+                token_usage=token_usage,
+                verbose=verbose,
+                full_video_media_tokens=full_video_media_tokens,
+                cache=cache,
+                escalate_to=route.escalate_to,
+                profile=profile,
+                style=style,
+                archive=archive,
+            )
+
+        # Step 5: Voiceovers were humanized before validation
+        print("[4/4] Generating reproduction plan...", file=sys.stderr)
+        timings.analysis_seconds = time.monotonic() - started
+    finally:
+        # Step 6: Cleanup cache and uploaded files
+        if cache is not None:
+            token_usage.cache_storage_token_hours += cache.close()
+        for uploaded in uploaded_files:
+            try:
+                client.files.delete(name=uploaded.name)
+            except errors.APIError as e:
+                # Uploaded files expire after 48 hours anyway
+                print(f"  Warning: could not delete {uploaded.name}: {e}", file=sys.stderr)
+        record_usage(
+            config,
+            token_usage,
+            "analyze",
+            url=video_metadata.get("url") or str(video_path),
+            mode=mode,
+            style=style,
+            language=target_language,
+            input_mode=input_mode,
+            video_seconds=_video_seconds(video_metadata),
         )
-    ]
-
-    plan = _generate_with_retry(
-        client=client,
-        model=config.model_name,
-        contents=contents,
-        system_prompt=system_prompt,
-        schema=schema,
-        uploaded_file=uploaded_file,
-        user_prompt=user_prompt,
-        token_usage=token_usage,
-        verbose=verbose,
-    )
 
-    # Step 5: Post-process voiceover text
-    print("[4/4] Generating reproduction plan...", file=sys.stderr)
-    plan = humanize_voiceovers(plan)
-
-    # Step 6: Cleanup uploaded file
-    try:
-        client.files.delete(name=uploaded_file.name)
-    except Exception:
-        pass  # Best-effort cleanup
+    if index is not None:
+        index.add(
+            signature,
+            plan,
+            url=video_metadata.get("url") or str(video_path),
+            mode=mode,
+            target_language=target_language,
+            style=style,
+        )
+    store_plan(
+        config,
+        plan,
+        token_usage,
+        video_metadata,
+        mode=mode,
+        style=style,
+        language=target_language,
+    )
 
-    return AnalysisResult(plan=plan, token_usage=token_usage)
+    return AnalysisResult(plan=plan, token_usage=token_usage, timings=timings)
@@ -0,0 +1,177 @@
+"""Archive of raw Gemini responses and offline reprocessing.
+
+Every generate_content attempt is written as one gzipped JSON record with the
+raw response text, a fingerprint of the prompt that produced it, the model
+and its token usage. ``reprocess_archive`` re-runs parse → placeholders →
+validate → humanize → format over the archive without any network calls, so
+changes to those steps can be applied to past results for free.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import ValidationError
+
+from .config import Config
+
+if TYPE_CHECKING:
+    from .analyzer import CallUsage
+
+PLAN_RESPONSE = "VideoReproductionPlan"
+
+
+def prompt_fingerprint(system_prompt: str, schema: dict, contents: list) -> str:
+    """Hash of the system prompt, response schema and text parts of a request.
+
+    Media parts are left out: the fingerprint identifies the prompt version,
+    not the video.
+    """
+    digest = hashlib.sha256()
+    digest.update(system_prompt.encode())
+    digest.update(json.dumps(schema, sort_keys=True).encode())
+    for content in contents:
+        for part in getattr(content, "parts", None) or []:
+            if getattr(part, "text", None):
+                digest.update(b"\0" + part.text.encode())
+    return digest.hexdigest()[:16]
+
+
+class ResponseArchive:
+    """Writes the raw responses of one run under ``root/YYYY-MM/``.
+
+    ``labels`` (url, mode, style, language, kind...) are stored on every
+    record so reprocessing can format the plan as the run did.
+    """
+
+    def __init__(self, root: Path, run_id: str | None = None, **labels) -> None:
+        self.root = root
+        self.run_id = run_id or uuid.uuid4().hex
+        self.labels = labels
+        self._attempt = 0
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        raw: str | None,
+        call: CallUsage,
+        prompt_fingerprint: str,
+        finish_reason: str | None = None,
+        response_model: str = PLAN_RESPONSE,
+    ) -> Path:
+        with self._lock:
+            self._attempt += 1
+            attempt = self._attempt
+        now = time.time()
+        record = {
+            "run_id": self.run_id,
+            "attempt": attempt,
+            "ts": now,
+            "response_model": response_model,
+            "prompt_fingerprint": prompt_fingerprint,
+            "finish_reason": finish_reason,
+            "usage": dataclasses.asdict(call),
+            **self.labels,
+            "raw": raw or "",
+        }
+        directory = self.root / time.strftime("%Y-%m", time.gmtime(now))
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.run_id}-{attempt:03d}.json.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        return path
+
+
+def archive_root(config: Config) -> Path:
+    return config.data_dir / "responses"
+
+
+def open_archive(config: Config, run_id: str | None = None, **labels) -> ResponseArchive | None:
+    """An archive for one run, or None when archiving is disabled."""
+    if not config.archive:
+        return None
+    return ResponseArchive(archive_root(config), run_id=run_id, **labels)
+
+
+def load_record(path: Path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class ReprocessOutcome:
+    run_id: str
+    output_path: str | None = None
+    error: str | None = None
+
+
+def _final_attempts(root: Path, since: str | None = None) -> list[Path]:
+    """The last archived attempt of every run, optionally from a ``YYYY-MM`` month on."""
+    latest: dict[str, Path] = {}
+    for path in sorted(root.glob("*/*.json.gz")):
+        if since and path.parent.name < since:
+            continue
+        run_id = path.name.rsplit("-", 1)[0]
+        latest[run_id] = path  # sorted, so later attempts win
+    return list(latest.values())
+
+
+def _reprocess_one(job: tuple[Path, Path, str]) -> ReprocessOutcome:
+    # Runs in a worker process: imports stay local to keep the pool start cheap
+    from .formatter import format_output
+    from .humanizer import humanize_voiceovers
+    from .models import VideoReproductionPlan
+    from .placeholders import expand_placeholders
+    from .validator import validate_and_repair
+
+    path, output_dir, fmt = job
+    record = load_record(path)
+    run_id = record["run_id"]
+    if record.get("response_model") != PLAN_RESPONSE:
+        return ReprocessOutcome(run_id=run_id, error=f"not a plan ({record.get('response_model')})")
+    try:
+        plan = VideoReproductionPlan.model_validate_json(record["raw"])
+    except ValidationError as e:
+        return ReprocessOutcome(run_id=run_id, error=f"unparseable: {e.errors()[0]['msg']}")
+    style = record.get("style")
+    if style:
+        expand_placeholders(plan, style)
+    plan = humanize_voiceovers(plan)
+    validate_and_repair(plan)
+    ext = "md" if fmt == "markdown" else "json"
+    output_path = output_dir / f"{run_id}.{ext}"
+    output_path.write_text(format_output(plan, fmt, style=style or "realistic"), encoding="utf-8")
+    return ReprocessOutcome(run_id=run_id, output_path=str(output_path))
+
+
+def reprocess_archive(
+    root: Path,
+    output_dir: Path,
+    fmt: str = "json",
+    since: str | None = None,
+    max_workers: int | None = None,
+) -> list[ReprocessOutcome]:
+    """Rebuild one plan file per archived run across CPU cores. No network calls.
+
+    Only the final attempt of each run is used, since that is the response
+    the run returned (or failed on).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = _final_attempts(root, since)
+    if not paths:
+        return []
+    workers = max_workers or os.cpu_count() or 1
+    jobs = [(path, output_dir, fmt) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_reprocess_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
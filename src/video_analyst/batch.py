@@ -0,0 +1,383 @@
+"""Offline bulk analysis through the Gemini Batch API."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import sqlite3
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from google import genai
+from google.genai import errors, types
+from pydantic import ValidationError
+
+from .analyzer import TokenUsage, build_generation_config, upload_and_wait, video_part
+from .archive import ResponseArchive, prompt_fingerprint
+from .canonical import job_key
+from .config import Config
+from .downloader import AdmissionPolicy, download_video
+from .formatter import format_output
+from .humanizer import humanize_voiceovers
+from .models import VideoReproductionPlan, plan_schema
+from .pipeline import video_metadata
+from .placeholders import expand_placeholders
+from .profiles import Profile, resolve_profile
+from .prompts.system import get_system_prompt
+from .prompts.templates import get_user_prompt
+from .store import PlanStore
+from .upload import open_uploader
+from .validator import validate_and_repair
+
+# Batch jobs are billed at half the interactive rate
+BATCH_PRICE_FACTOR = 0.5
+
+_TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+class BatchBackend(Protocol):
+    """Where batch jobs run: the Gemini Batch API or a local stand-in."""
+
+    def create(self, model: str, requests: list[types.InlinedRequest], display_name: str) -> str:
+        """Submit requests and return the job name."""
+        ...
+
+    def state(self, job_name: str) -> str:
+        """Return the job state, e.g. ``JOB_STATE_RUNNING``."""
+        ...
+
+    def responses(self, job_name: str) -> list[types.InlinedResponse]:
+        """Return one response per submitted request, in submission order."""
+        ...
+
+
+class GeminiBatchBackend:
+    def __init__(self, client: genai.Client) -> None:
+        self.client = client
+
+    def create(self, model: str, requests: list[types.InlinedRequest], display_name: str) -> str:
+        job = self.client.batches.create(
+            model=model,
+            src=requests,
+            config=types.CreateBatchJobConfig(display_name=display_name),
+        )
+        return job.name
+
+    def state(self, job_name: str) -> str:
+        job = self.client.batches.get(name=job_name)
+        return job.state.name if hasattr(job.state, "name") else str(job.state)
+
+    def responses(self, job_name: str) -> list[types.InlinedResponse]:
+        job = self.client.batches.get(name=job_name)
+        if job.dest is None or job.dest.inlined_responses is None:
+            raise RuntimeError(f"Batch job {job_name} has no inline responses")
+        return job.dest.inlined_responses
+
+
+class LocalBatchBackend:
+    """In-process stand-in for testing the batch flow without the Batch API.
+
+    ``responder`` turns each request into a response (e.g. canned JSON, or a
+    call to ``client.models.generate_content``). Jobs report RUNNING for
+    ``polls_until_done`` polls so callers exercise their polling loop.
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[types.InlinedRequest], types.GenerateContentResponse],
+        polls_until_done: int = 1,
+    ) -> None:
+        self.responder = responder
+        self.polls_until_done = polls_until_done
+        self._jobs: dict[str, dict] = {}
+
+    def create(self, model: str, requests: list[types.InlinedRequest], display_name: str) -> str:
+        name = f"batches/local-{len(self._jobs) + 1}"
+        self._jobs[name] = {"requests": requests, "polls": 0}
+        return name
+
+    def state(self, job_name: str) -> str:
+        job = self._jobs[job_name]
+        job["polls"] += 1
+        if job["polls"] <= self.polls_until_done:
+            return "JOB_STATE_RUNNING"
+        return "JOB_STATE_SUCCEEDED"
+
+    def responses(self, job_name: str) -> list[types.InlinedResponse]:
+        results = []
+        for request in self._jobs[job_name]["requests"]:
+            try:
+                results.append(types.InlinedResponse(response=self.responder(request)))
+            except errors.APIError as e:
+                results.append(types.InlinedResponse(error=types.JobError(message=str(e))))
+        return results
+
+
+@dataclass
+class BatchItem:
+    url: str
+    output_path: str
+    uploaded_file: str | None = None
+    error: str | None = None
+    # Index of an earlier item for the same video; its plan is copied, not requested
+    duplicate_of: int | None = None
+    # Mode the request was built for when admission routed it elsewhere
+    mode: str | None = None
+    # Of the system prompt and schema of that mode
+    prompt_fingerprint: str | None = None
+
+
+@dataclass
+class BatchState:
+    """Everything needed to resume a submitted job after the process exits."""
+
+    model: str
+    mode: str
+    target_language: str
+    style: str
+    fmt: str
+    items: list[BatchItem] = field(default_factory=list)
+    job_name: str | None = None
+    # Of the requested mode's system prompt and schema; user prompts differ per item
+    prompt_fingerprint: str = ""
+    # keypool.key_id of the key that owns the job and its uploads
+    api_key_id: str = ""
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> BatchState:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["items"] = [BatchItem(**item) for item in data["items"]]
+        return cls(**data)
+
+
+def prepare_batch(
+    urls: list[str],
+    output_dir: Path,
+    config: Config,
+    client: genai.Client,
+    mode: str,
+    target_language: str,
+    style: str,
+    fmt: str,
+    policy: AdmissionPolicy | None = None,
+    verbose: bool = False,
+) -> tuple[BatchState, list[types.InlinedRequest]]:
+    """Download and upload every video and build one inline request per video.
+
+    Failed downloads/uploads are recorded on their item and skipped. Videos
+    the admission policy routes to another mode are requested in that mode.
+    """
+    state = BatchState(
+        model=config.model_name, mode=mode, target_language=target_language, style=style, fmt=fmt
+    )
+    # Per mode: prompt fingerprint, generation config and media profile
+    mode_configs: dict[str, tuple[str, types.GenerateContentConfig, Profile]] = {}
+
+    def config_for(item_mode: str) -> tuple[str, types.GenerateContentConfig, Profile]:
+        if item_mode not in mode_configs:
+            system_prompt = get_system_prompt(
+                mode=item_mode, target_language=target_language, style=style
+            )
+            schema = plan_schema(item_mode)
+            profile = resolve_profile(config.profile, item_mode, config.mode_profiles)
+            mode_configs[item_mode] = (
+                prompt_fingerprint(system_prompt, schema, []),
+                build_generation_config(
+                    system_prompt, schema, model=config.model_name, profile=profile
+                ),
+                profile,
+            )
+        return mode_configs[item_mode]
+
+    state.prompt_fingerprint = config_for(mode)[0]
+    ext = "md" if fmt == "markdown" else "json"
+    uploader = open_uploader(config)
+    requests: list[types.InlinedRequest] = []
+    first_item: dict[str, int] = {}
+
+    for i, url in enumerate(urls, start=1):
+        print(f"[{i}/{len(urls)}] Preparing {url}", file=sys.stderr)
+        item = BatchItem(url=url, output_path=str(output_dir / f"{i:04d}.{ext}"))
+        state.items.append(item)
+        key = job_key(url, verbose=verbose)
+        if key in first_item:
+            item.duplicate_of = first_item[key]
+            print(f"  Same video as item {item.duplicate_of + 1}, not requested", file=sys.stderr)
+            continue
+        first_item[key] = i - 1
+        video_path = None
+        try:
+            result = download_video(
+                url=url,
+                output_dir=config.download_dir,
+                verbose=verbose,
+                policy=policy,
+                mode=mode,
+                max_analysis_seconds=config.max_analysis_duration_seconds,
+                subtitles=config.subtitles,
+            )
+            video_path = result.video_path
+            item.output_path = str(output_dir / f"{i:04d}-{video_path.stem}.{ext}")
+            uploaded = upload_and_wait(client, video_path, verbose=verbose, uploader=uploader)
+            item.uploaded_file = uploaded.name
+        except RuntimeError as e:
+            item.error = str(e)
+            print(f"  Skipped: {e}", file=sys.stderr)
+            continue
+        finally:
+            if video_path is not None:
+                video_path.unlink(missing_ok=True)
+
+        item_mode = result.mode or mode
+        if item_mode != mode:
+            print(f"  Routed to {item_mode} mode by admission policy", file=sys.stderr)
+        item.mode = item_mode
+        item.prompt_fingerprint, gen_config, profile = config_for(item_mode)
+        user_prompt = get_user_prompt(
+            mode=item_mode,
+            target_language=target_language,
+            video_metadata=video_metadata(result),
+            style=style,
+        )
+        requests.append(
+            types.InlinedRequest(
+                model=config.model_name,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            video_part(uploaded, profile),
+                            types.Part.from_text(text=user_prompt),
+                        ],
+                    )
+                ],
+                config=gen_config,
+                metadata={"index": str(len(state.items) - 1)},
+            )
+        )
+
+    return state, requests
+
+
+def wait_for_batch(
+    backend: BatchBackend,
+    job_name: str,
+    initial_interval: float = 30.0,
+    max_interval: float = 600.0,
+    verbose: bool = False,
+) -> str:
+    """Poll with exponential backoff until the job reaches a terminal state."""
+    interval = initial_interval
+    while True:
+        state = backend.state(job_name)
+        if state in _TERMINAL_STATES:
+            return state
+        if verbose:
+            print(f"  {job_name}: {state}, next check in {interval:.0f}s", file=sys.stderr)
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_interval)
+
+
+def collect_batch_results(
+    backend: BatchBackend,
+    state: BatchState,
+    token_usage: TokenUsage,
+    store: PlanStore | None = None,
+    archive_dir: Path | None = None,
+) -> int:
+    """Parse, humanize and write each response. Returns the number of plans written.
+
+    With a plan ``store``, each plan is also added to it; with an
+    ``archive_dir``, each raw response is archived as its own run.
+    """
+    pending = [item for item in state.items if item.error is None and item.duplicate_of is None]
+    responses = backend.responses(state.job_name)
+    written = 0
+
+    for position, inlined in enumerate(responses):
+        # Responses come back in submission order; metadata makes it explicit
+        key = (inlined.metadata or {}).get("index")
+        item = state.items[int(key)] if key is not None else pending[position]
+        if inlined.error is not None:
+            item.error = f"Batch request failed: {inlined.error.message}"
+            continue
+        token_usage.add(inlined.response, model=state.model)
+        if archive_dir is not None:
+            ResponseArchive(
+                archive_dir,
+                run_id=f"{state.job_name.rsplit('/', 1)[-1]}-{state.items.index(item):04d}",
+                kind="batch",
+                url=item.url,
+                mode=item.mode or state.mode,
+                style=state.style,
+                language=state.target_language,
+            ).record(
+                inlined.response.text,
+                token_usage.calls[-1],
+                item.prompt_fingerprint or state.prompt_fingerprint,
+            )
+        try:
+            plan = VideoReproductionPlan.model_validate_json(inlined.response.text or "")
+        except ValidationError as e:
+            item.error = f"Failed to parse response: {e}"
+            continue
+        expand_placeholders(plan, state.style)
+        plan = humanize_voiceovers(plan)
+        report = validate_and_repair(plan)
+        if not report.ok:
+            print(f"  {item.url}: unresolved issues: {' '.join(report.defects)}", file=sys.stderr)
+        Path(item.output_path).write_text(
+            format_output(plan, state.fmt, style=state.style), encoding="utf-8"
+        )
+        written += 1
+        if store is not None:
+            try:
+                store.add(
+                    plan,
+                    url=item.url,
+                    mode=item.mode or state.mode,
+                    style=state.style,
+                    language=state.target_language,
+                    model=state.model,
+                    cost_usd=token_usage.calls[-1].cost_usd() * BATCH_PRICE_FACTOR,
+                )
+            except sqlite3.Error as e:
+                print(f"  Warning: could not store plan: {e}", file=sys.stderr)
+
+    for item in state.items:
+        if item.duplicate_of is None:
+            continue
+        source = state.items[item.duplicate_of]
+        if source.error is not None:
+            item.error = source.error
+            continue
+        shutil.copyfile(source.output_path, item.output_path)
+        written += 1
+
+    return written
+
+
+def cleanup_uploads(client: genai.Client, state: BatchState) -> None:
+    for item in state.items:
+        if item.uploaded_file:
+            try:
+                client.files.delete(name=item.uploaded_file)
+            except errors.APIError as e:
+                # Files expire after 48h anyway
+                print(f"  Warning: could not delete {item.uploaded_file}: {e}", file=sys.stderr)
+            item.uploaded_file = None
@@ -0,0 +1,144 @@
+"""Canonical (platform, video id) identities for video URLs.
+
+``youtu.be/x``, ``youtube.com/shorts/x`` and ``watch?v=x&t=3`` are the same
+video; canonicalizing them lets batch and service callers recognize
+duplicate inputs before paying for a second download and Gemini call.
+TikTok short links carry no id and are expanded with a metadata probe.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlsplit
+
+import yt_dlp
+
+_YOUTUBE_HOSTS = ("youtube.com", "youtube-nocookie.com")
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_PATH = re.compile(r"^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})(?:[/?#]|$)")
+_TIKTOK_PATH = re.compile(
+    r"^(?:/@[^/]+/(?:video|photo)|/v|/embed(?:/v2)?|/share/video)/(\d+)(?:\.html)?(?:[/?#]|$)"
+)
+# Redirecting short links whose path is not the video id
+_TIKTOK_SHORT_HOSTS = ("vm.tiktok.com", "vt.tiktok.com")
+
+
+@dataclass(frozen=True)
+class CanonicalVideo:
+    platform: str
+    video_id: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.platform}:{self.video_id}"
+
+
+def _host(url: str) -> str:
+    host = (urlsplit(url if "//" in url else f"//{url}").hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+def _on(host: str, domain: str) -> bool:
+    return host == domain or host.endswith(f".{domain}")
+
+
+def detect_platform(url: str) -> str:
+    """The platform serving ``url`` by host name: youtube, tiktok or unknown."""
+    host = _host(url)
+    if host == "youtu.be" or any(_on(host, d) for d in _YOUTUBE_HOSTS):
+        return "youtube"
+    if _on(host, "tiktok.com"):
+        return "tiktok"
+    return "unknown"
+
+
+def is_short_link(url: str) -> bool:
+    """True for links that only a redirect can turn into a video id."""
+    parts = urlsplit(url if "//" in url else f"//{url}")
+    host = _host(url)
+    return host in _TIKTOK_SHORT_HOSTS or (host == "tiktok.com" and parts.path.startswith("/t/"))
+
+
+def canonicalize(url: str) -> CanonicalVideo | None:
+    """Parse the video identity out of ``url`` without any network access.
+
+    Returns None for short links, playlists, channels and unknown platforms.
+    """
+    url = url.strip()
+    parts = urlsplit(url if "//" in url else f"//{url}")
+    host = _host(url)
+    platform = detect_platform(url)
+
+    if platform == "youtube":
+        if host == "youtu.be":
+            video_id = parts.path.strip("/").split("/")[0]
+        else:
+            match = _YOUTUBE_PATH.match(parts.path)
+            video_id = match.group(1) if match else (parse_qs(parts.query).get("v") or [""])[0]
+        if _YOUTUBE_ID.match(video_id):
+            return CanonicalVideo("youtube", video_id)
+        return None
+
+    if platform == "tiktok" and not is_short_link(url):
+        match = _TIKTOK_PATH.match(parts.path)
+        if match:
+            return CanonicalVideo("tiktok", match.group(1))
+    return None
+
+
+def canonical_from_info(info: dict) -> CanonicalVideo | None:
+    """The identity of a probed video, from yt-dlp's extractor and id."""
+    extractor = (info.get("extractor_key") or info.get("ie_key") or "").lower()
+    video_id = info.get("id")
+    if video_id and extractor in ("youtube", "tiktok"):
+        return CanonicalVideo(extractor, str(video_id))
+    if info.get("url"):
+        return canonicalize(info["url"])
+    return None
+
+
+_resolved: dict[str, CanonicalVideo] = {}
+_resolved_lock = threading.Lock()
+
+
+def _expand(url: str, verbose: bool) -> CanonicalVideo | None:
+    opts = {"quiet": not verbose, "no_warnings": not verbose}
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            # Unprocessed: the short-link extractor only follows the redirect
+            info = ydl.extract_info(url, download=False, process=False)
+    except yt_dlp.utils.YoutubeDLError as e:
+        print(f"  Warning: could not expand {url}: {e}", file=sys.stderr)
+        return None
+    return canonical_from_info(info) if info else None
+
+
+def resolve_url(url: str, verbose: bool = False) -> CanonicalVideo | None:
+    """Canonicalize ``url``, probing short links for their target.
+
+    Expansions are cached for the life of the process; a link that cannot
+    be expanded resolves to None (and is retried on the next call).
+    """
+    canonical = canonicalize(url)
+    if canonical is not None or not is_short_link(url):
+        return canonical
+    url = url.strip()
+    with _resolved_lock:
+        if url in _resolved:
+            return _resolved[url]
+    canonical = _expand(url, verbose)
+    if canonical is not None:
+        with _resolved_lock:
+            _resolved[url] = canonical
+        if verbose:
+            print(f"  Expanded {url} -> {canonical.key}", file=sys.stderr)
+    return canonical
+
+
+def job_key(url: str, verbose: bool = False) -> str:
+    """A key equal for every URL of the same video; the stripped URL if unknown."""
+    canonical = resolve_url(url, verbose=verbose)
+    return canonical.key if canonical is not None else url.strip()
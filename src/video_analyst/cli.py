@@ -2,16 +2,30 @@
 
 from __future__ import annotations
 
+import dataclasses
+import hashlib
+import shutil
 import sys
+import time
 from importlib.metadata import version
 from pathlib import Path
 
 import click
 
-from .config import Config
-from .downloader import download_video
-from .analyzer import analyze_video
+from .analyzer import Timings, TokenUsage, measure_schema_tokens, record_usage
+from .archive import archive_root, reprocess_archive
+from .canonical import job_key
+from .config import Config, default_data_dir
+from .downloader import AdmissionPolicy, prefilter_urls
 from .formatter import format_output
+from .jobqueue import JobQueue
+from .keypool import KeyPool
+from .ledger import GROUP_BY_COLUMNS, BudgetExceeded, UsageLedger, check_budget
+from .models import VideoReproductionPlan
+from .pipeline import admission_policy, run_bench
+from .profiles import PROFILE_NAMES
+from .session import VideoAnalyst
+from .store import PlanStore, open_plan_store
 from .styles import STYLE_NAMES, list_styles
 
 
@@ -33,6 +47,75 @@ class StyleChoice(click.ParamType):
         return value
 
 
+def _token_summary(tokens: TokenUsage, model: str) -> str:
+    cost = tokens.cost_usd(model)
+    token_summary = (
+        f"Tokens — prompt: {tokens.prompt_tokens:,}, "
+        f"completion: {tokens.completion_tokens:,}, "
+        f"total: {tokens.total_tokens:,} | "
+        f"Cost: ${cost:.4f} USD"
+    )
+    if tokens.attempts > 1:
+        token_summary += f" ({tokens.attempts} attempts)"
+    if len(tokens.route) > 1:
+        token_summary += (
+            f"\nModel route: {' -> '.join(tokens.route)} (escalated: {tokens.escalation_reason})"
+        )
+    elif tokens.route and tokens.route[0] != model:
+        token_summary += f"\nModel route: {tokens.route[0]}"
+    if tokens.cached_tokens:
+        token_summary += f"\nCached prompt tokens: {tokens.cached_tokens:,}"
+    reduction = tokens.token_reduction()
+    if reduction is not None:
+        token_summary += (
+            f"\nKeyframes input: ~{reduction:.0%} fewer prompt tokens than full video "
+            f"(est. {tokens.full_video_prompt_tokens:,})"
+        )
+    return token_summary
+
+
+def _timing_summary(timings: Timings) -> str:
+    return (
+        f"Time — download: {timings.download_seconds:.1f}s, "
+        f"upload: {timings.upload_seconds:.1f}s, "
+        f"analysis: {timings.analysis_seconds:.1f}s, "
+        f"total: {timings.total_seconds:.1f}s"
+    )
+
+
+def _write_output(formatted: str, output: str | None, plan: VideoReproductionPlan) -> None:
+    if output:
+        Path(output).write_text(formatted, encoding="utf-8")
+        print(
+            f"\nDone! Plan saved to {output} "
+            f"({len(plan.scenes)} scenes, {plan.total_duration_seconds}s total)",
+            file=sys.stderr,
+        )
+    else:
+        click.echo(formatted)
+        print(
+            f"\nDone! {len(plan.scenes)} scenes, {plan.total_duration_seconds}s total",
+            file=sys.stderr,
+        )
+
+
+_profile_option = click.option(
+    "--profile",
+    "-p",
+    type=click.Choice(PROFILE_NAMES),
+    default=None,
+    help="Latency/cost profile: media resolution, frame rate and thinking budget "
+    "(default: balanced, or VIDEO_ANALYST_PROFILE_<MODE>).",
+)
+
+_subtitles_option = click.option(
+    "--subtitles/--no-subtitles",
+    default=None,
+    help="Pass the platform's source-language captions to the model as a transcript "
+    "(with --input keyframes, instead of the audio track).",
+)
+
+
 @click.group()
 @click.version_option(version=version("video-analyst"), prog_name="video-analyst")
 def main() -> None:
@@ -43,34 +126,81 @@ def main() -> None:
 @main.command()
 @click.argument("url")
 @click.option(
-    "--mode", "-m",
+    "--mode",
+    "-m",
     type=click.Choice(["summary", "highlights", "full"]),
     default="full",
     help="Analysis mode: summary (condensed), highlights (50-70% duration), or full (comprehensive).",
 )
 @click.option(
-    "--lang", "-l",
+    "--lang",
+    "-l",
     default="en",
     help="Target language for voiceover (e.g. en, vi, ja).",
 )
 @click.option(
-    "--style", "-s",
+    "--style",
+    "-s",
     type=StyleChoice(),
     default="realistic",
     help="Visual style for prompts. Use --style list to see options.",
 )
 @click.option(
-    "--format", "-f", "fmt",
+    "--format",
+    "-f",
+    "fmt",
     type=click.Choice(["json", "markdown"]),
     default="json",
     help="Output format.",
 )
 @click.option(
-    "--output", "-o",
+    "--output",
+    "-o",
     type=click.Path(),
     default=None,
     help="Output file path (default: stdout).",
 )
+@click.option(
+    "--input",
+    "input_mode",
+    type=click.Choice(["video", "keyframes", "storyboard"]),
+    default="video",
+    help="Send the full video, local keyframes plus compressed audio (cheaper), or "
+    "YouTube storyboard thumbnails plus captions (no video download; quick triage).",
+)
+@click.option(
+    "--max-analysis-duration",
+    type=int,
+    default=None,
+    help="Download at most this many seconds of the source (sampled for summary/highlights).",
+)
+@click.option(
+    "--dedup/--no-dedup",
+    default=None,
+    help="Reuse plans of previously analyzed near-duplicate videos (perceptual hash).",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=None,
+    help="Cache the video and system prompt on Gemini so retries reuse them at cached rates.",
+)
+@click.option(
+    "--two-phase/--no-two-phase",
+    default=None,
+    help="Outline the video first, then write every scene in parallel (faster, never truncated).",
+)
+@click.option(
+    "--cascade/--no-cascade",
+    default=None,
+    help="Try a cheaper model first for short jobs and escalate to --model on failure.",
+)
+@click.option(
+    "--preselect/--no-preselect",
+    default=None,
+    help="Highlights mode: upload only the loudest, most active parts (needs numpy and ffmpeg).",
+)
+@_profile_option
+@_subtitles_option
 @click.option("--keep-video", is_flag=True, help="Keep downloaded video after analysis.")
 @click.option("--model", default=None, help="Override Gemini model name.")
 @click.option("--verbose", "-v", is_flag=True, help="Verbose output.")
@@ -81,98 +211,829 @@ def analyze(
     style: str,
     fmt: str,
     output: str | None,
+    input_mode: str,
+    max_analysis_duration: int | None,
+    dedup: bool | None,
+    cache: bool | None,
+    two_phase: bool | None,
+    cascade: bool | None,
+    preselect: bool | None,
+    profile: str | None,
+    subtitles: bool | None,
     keep_video: bool,
     model: str | None,
     verbose: bool,
 ) -> None:
-    """Analyze a video URL and produce a reproduction plan."""
+    """Analyze a video URL (or local video file) and produce a reproduction plan."""
 
     # Load config
     config = Config.from_env()
     if model:
         config.model_name = model
+    if max_analysis_duration:
+        config.max_analysis_duration_seconds = max_analysis_duration
+    if dedup is not None:
+        config.dedup = dedup
+    if cache is not None:
+        config.context_cache = cache
+    if two_phase is not None:
+        config.two_phase = two_phase
+    if cascade is not None:
+        config.cascade = cascade
+    if preselect is not None:
+        config.highlight_preselect = preselect
+    if profile:
+        config.profile = profile
+    if subtitles is not None:
+        config.subtitles = subtitles
+
+    try:
+        analyst = VideoAnalyst(config, verbose=verbose)
+        analysis = analyst.analyze(url, mode, lang, style, input_mode, keep_video=keep_video)
+        plan = analysis.plan
+        if analysis.reused_from:
+            print(f"  Plan reused from {analysis.reused_from}", file=sys.stderr)
+
+        # Format output
+        formatted = format_output(plan, fmt, style=style)
+
+        _write_output(formatted, output, plan)
+        print(_token_summary(analysis.token_usage, config.model_name), file=sys.stderr)
+        if verbose:
+            print(_timing_summary(analysis.timings), file=sys.stderr)
+
+    except RuntimeError as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        print("\nAborted.", file=sys.stderr)
+        raise SystemExit(130)
+
+
+@main.command()
+@click.argument("urls_file", type=click.File("r"))
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["summary", "highlights", "full"]),
+    default="full",
+    help="Requested analysis mode, used for routing decisions.",
+)
+@click.option("--max-duration", type=int, default=None, help="Reject videos longer than this (s).")
+@click.option("--max-size", type=int, default=None, help="Reject videos larger than this (MB).")
+@click.option("--allow-live", is_flag=True, help="Admit live streams.")
+@click.option(
+    "--summary-over",
+    type=int,
+    default=None,
+    help="Route videos longer than this (s) to summary mode.",
+)
+@click.option(
+    "--max-analysis-duration",
+    type=int,
+    default=None,
+    help="Seconds of each source that would be downloaded, for size estimates.",
+)
+@click.option("--workers", "-w", type=int, default=8, help="Parallel metadata probes.")
+def prefilter(
+    urls_file,
+    mode: str,
+    max_duration: int | None,
+    max_size: int | None,
+    allow_live: bool,
+    summary_over: int | None,
+    max_analysis_duration: int | None,
+    workers: int,
+) -> None:
+    """Check URLs against the admission policy using metadata only.
+
+    Reads one URL per line and prints a tab-separated decision per URL:
+    admitted, reason, mode, duration, estimated MB, URL.
+    """
+    urls = [line.strip() for line in urls_file if line.strip() and not line.startswith("#")]
+    policy = AdmissionPolicy(
+        max_duration_seconds=max_duration,
+        max_size_mb=max_size,
+        allow_live=allow_live,
+        summary_over_seconds=summary_over,
+    )
+
+    decisions = prefilter_urls(
+        urls,
+        policy,
+        mode=mode,
+        max_workers=workers,
+        max_analysis_seconds=max_analysis_duration,
+    )
+    for d in decisions:
+        size = f"{d.estimated_size_mb:.1f}" if d.estimated_size_mb is not None else "-"
+        click.echo(
+            f"{'yes' if d.admitted else 'no'}\t{d.reason}\t{d.mode or '-'}\t"
+            f"{d.duration if d.duration is not None else '-'}\t{size}\t{d.url}"
+        )
+
+    admitted = sum(d.admitted for d in decisions)
+    print(f"\n{admitted}/{len(decisions)} admitted", file=sys.stderr)
+
+
+@main.command()
+@click.argument("urls_file", type=click.File("r"))
+@click.option(
+    "--output-dir",
+    "-d",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Directory for one plan file per URL (and batch state).",
+)
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["summary", "highlights", "full"]),
+    default="full",
+    help="Analysis mode for every URL.",
+)
+@click.option("--lang", "-l", default="en", help="Target language for voiceover.")
+@click.option(
+    "--style",
+    "-s",
+    type=StyleChoice(),
+    default="realistic",
+    help="Visual style for prompts.",
+)
+@click.option(
+    "--format",
+    "-f",
+    "fmt",
+    type=click.Choice(["json", "markdown"]),
+    default="json",
+    help="Output format.",
+)
+@click.option(
+    "--async-api",
+    is_flag=True,
+    help="Submit everything as one Gemini Batch API job (half price, hours of latency).",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="With --async-api: keep polling the job recorded in the output directory.",
+)
+@_profile_option
+@_subtitles_option
+@click.option("--model", default=None, help="Override Gemini model name.")
+@click.option("--verbose", "-v", is_flag=True, help="Verbose output.")
+def batch(
+    urls_file,
+    output_dir: str,
+    mode: str,
+    lang: str,
+    style: str,
+    fmt: str,
+    async_api: bool,
+    resume: bool,
+    profile: str | None,
+    subtitles: bool | None,
+    model: str | None,
+    verbose: bool,
+) -> None:
+    """Analyze every URL in a file (one per line), writing one plan per URL."""
+
+    config = Config.from_env()
+    if model:
+        config.model_name = model
+    if profile:
+        config.profile = profile
+    if subtitles is not None:
+        config.subtitles = subtitles
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    urls = [line.strip() for line in urls_file if line.strip() and not line.startswith("#")]
+
+    if async_api:
+        _run_async_batch(urls, out_dir, config, mode, lang, style, fmt, resume, verbose)
+        return
 
-    video_path: Path | None = None
+    ext = "md" if fmt == "markdown" else "json"
+    failures = 0
+    analyst = VideoAnalyst(config, verbose=verbose)
+    # Plan file written for each canonical video, so repeated URLs are analyzed once
+    saved: dict[str, Path] = {}
+    for i, url in enumerate(urls, start=1):
+        print(f"\n=== [{i}/{len(urls)}] {url}", file=sys.stderr)
+        key = job_key(url, verbose=verbose)
+        if key in saved:
+            path = out_dir / f"{i:04d}.{ext}"
+            shutil.copyfile(saved[key], path)
+            print(f"Same video as {saved[key].name}, copied to {path}", file=sys.stderr)
+            continue
+        try:
+            analysis = analyst.analyze(url, mode, lang, style)
+        except BudgetExceeded as e:
+            failures += len(urls) - i + 1
+            print(f"Error: {e}. Skipping the remaining URLs.", file=sys.stderr)
+            break
+        except RuntimeError as e:
+            failures += 1
+            print(f"Error: {e}", file=sys.stderr)
+            continue
+        path = out_dir / f"{i:04d}.{ext}"
+        path.write_text(format_output(analysis.plan, fmt, style=style), encoding="utf-8")
+        print(f"Saved {path}", file=sys.stderr)
+        saved[key] = path
+        print(_token_summary(analysis.token_usage, config.model_name), file=sys.stderr)
 
+    print(f"\n{len(urls) - failures}/{len(urls)} succeeded", file=sys.stderr)
+    if len(analyst.keys) > 1:
+        print(f"API keys:\n{analyst.keys.summary()}", file=sys.stderr)
+    if failures:
+        raise SystemExit(1)
+
+
+def _run_async_batch(
+    urls: list[str],
+    out_dir: Path,
+    config: Config,
+    mode: str,
+    lang: str,
+    style: str,
+    fmt: str,
+    resume: bool,
+    verbose: bool,
+) -> None:
+    from .batch import (
+        BATCH_PRICE_FACTOR,
+        BatchState,
+        GeminiBatchBackend,
+        cleanup_uploads,
+        collect_batch_results,
+        prepare_batch,
+        wait_for_batch,
+    )
+
+    state_path = out_dir / "batch-state.json"
+    # The job, its uploads and their cleanup all belong to one key
+    keys = KeyPool.from_config(config)
+    state = BatchState.load(state_path) if resume and state_path.exists() else None
     try:
-        # Step 1: Download
-        print(f"[1/4] Downloading video... ({url})", file=sys.stderr)
-        result = download_video(
-            url=url,
-            output_dir=config.download_dir,
+        key = keys.get(state.api_key_id) if state and state.api_key_id else keys.keys[0]
+    except RuntimeError as e:
+        raise click.UsageError(f"{e}; the batch job was submitted with it") from e
+    config = dataclasses.replace(config, gemini_api_key=key.api_key)
+    client = key.client
+    backend = GeminiBatchBackend(client)
+
+    if resume:
+        if state is None:
+            raise click.UsageError(f"No batch state found at {state_path}")
+        print(f"Resuming batch job {state.job_name}", file=sys.stderr)
+    else:
+        try:
+            check_budget(config)
+        except BudgetExceeded as e:
+            print(f"Error: {e}", file=sys.stderr)
+            raise SystemExit(1)
+        state, requests = prepare_batch(
+            urls,
+            out_dir,
+            config,
+            client,
+            mode,
+            lang,
+            style,
+            fmt,
+            policy=admission_policy(config),
             verbose=verbose,
         )
-        video_path = result.video_path
+        state.api_key_id = key.id
+        if not requests:
+            state.save(state_path)
+            print("Nothing to submit: every URL failed to prepare.", file=sys.stderr)
+            raise SystemExit(1)
+        state.job_name = backend.create(
+            config.model_name, requests, display_name=f"video-analyst-{out_dir.name}"
+        )
+        state.save(state_path)
+        print(
+            f"Submitted {len(requests)} requests as {state.job_name} (state saved to {state_path})",
+            file=sys.stderr,
+        )
 
-        if verbose:
-            print(
-                f"  Downloaded: {result.title} ({result.duration}s) -> {video_path}",
-                file=sys.stderr,
-            )
+    job_state = wait_for_batch(backend, state.job_name, verbose=verbose)
+    print(f"Batch job finished: {job_state}", file=sys.stderr)
 
-        # Step 2-4: Analyze
-        analysis = analyze_video(
-            video_path=video_path,
-            mode=mode,
-            target_language=lang,
-            video_metadata={
-                "title": result.title,
-                "duration": result.duration,
-                "description": result.description,
-                "platform": result.platform,
-            },
-            config=config,
-            style=style,
-            verbose=verbose,
+    tokens = TokenUsage()
+    written = 0
+    if job_state in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+        written = collect_batch_results(
+            backend,
+            state,
+            tokens,
+            store=open_plan_store(config),
+            archive_dir=archive_root(config) if config.archive else None,
+        )
+        record_usage(
+            config,
+            tokens,
+            "batch",
+            mode=state.mode,
+            style=state.style,
+            language=state.target_language,
+            price_factor=BATCH_PRICE_FACTOR,
+            run_id=state.job_name,
         )
+    cleanup_uploads(client, state)
+    state.save(state_path)
 
-        plan = analysis.plan
-        tokens = analysis.token_usage
+    for item in state.items:
+        if item.error:
+            print(f"  Failed: {item.url}: {item.error}", file=sys.stderr)
+    cost = tokens.cost_usd(state.model) * BATCH_PRICE_FACTOR
+    print(
+        f"\n{written}/{len(state.items)} plans written to {out_dir} | "
+        f"Tokens: {tokens.total_tokens:,} | Cost: ${cost:.4f} USD (batch pricing)",
+        file=sys.stderr,
+    )
+    if written < len(state.items):
+        raise SystemExit(1)
 
-        # Format output
-        formatted = format_output(plan, fmt, style=style)
 
-        # Token cost summary
-        cost = tokens.cost_usd(config.model_name)
-        token_summary = (
-            f"Tokens — prompt: {tokens.prompt_tokens:,}, "
-            f"completion: {tokens.completion_tokens:,}, "
-            f"total: {tokens.total_tokens:,} | "
-            f"Cost: ${cost:.4f} USD"
-        )
-        if tokens.attempts > 1:
-            token_summary += f" ({tokens.attempts} attempts)"
-
-        # Write output
-        if output:
-            Path(output).write_text(formatted, encoding="utf-8")
-            print(
-                f"\nDone! Plan saved to {output} "
-                f"({len(plan.scenes)} scenes, {plan.total_duration_seconds}s total)",
-                file=sys.stderr,
-            )
-        else:
-            click.echo(formatted)
-            print(
-                f"\nDone! {len(plan.scenes)} scenes, "
-                f"{plan.total_duration_seconds}s total",
-                file=sys.stderr,
-            )
+@main.command()
+@click.argument("plan_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--style",
+    "-s",
+    type=StyleChoice(),
+    default=None,
+    help="New visual style. Omit to keep the plan's current style.",
+)
+@click.option(
+    "--lang",
+    "-l",
+    default=None,
+    help="New voiceover language. Omit to keep the plan's current language.",
+)
+@click.option(
+    "--format",
+    "-f",
+    "fmt",
+    type=click.Choice(["json", "markdown"]),
+    default="json",
+    help="Output format.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(),
+    default=None,
+    help="Output file path (default: stdout).",
+)
+@click.option("--model", default=None, help="Override Gemini model name.")
+@click.option("--verbose", "-v", is_flag=True, help="Verbose output.")
+def derive(
+    plan_file: str,
+    style: str | None,
+    lang: str | None,
+    fmt: str,
+    output: str | None,
+    model: str | None,
+    verbose: bool,
+) -> None:
+    """Restyle or translate an existing JSON plan without re-watching the video."""
+
+    if style is None and lang is None:
+        raise click.UsageError("Nothing to derive: pass --style and/or --lang.")
+
+    config = Config.from_env()
+    if model:
+        config.model_name = model
 
-        print(token_summary, file=sys.stderr)
+    try:
+        plan = VideoReproductionPlan.model_validate_json(
+            Path(plan_file).read_text(encoding="utf-8")
+        )
+    except ValueError as e:
+        raise click.BadParameter(f"Not a valid plan: {e}", param_hint="PLAN_FILE")
 
+    try:
+        print("Deriving plan from text...", file=sys.stderr)
+        result = VideoAnalyst(config, verbose=verbose).derive(
+            plan, target_language=lang, style=style
+        )
     except RuntimeError as e:
         print(f"\nError: {e}", file=sys.stderr)
         raise SystemExit(1)
+
+    # The plan does not record its style, so a translation leaves it out
+    formatted = format_output(result.plan, fmt, style=style)
+    _write_output(formatted, output, result.plan)
+    print(_token_summary(result.token_usage, config.model_name), file=sys.stderr)
+
+
+_queue_option = click.option(
+    "--queue",
+    "-q",
+    "queue_path",
+    type=click.Path(dir_okay=False),
+    envvar="VIDEO_ANALYST_QUEUE",
+    default=None,
+    help="Queue database (default: <data dir>/queue.db). Put it on a shared volume "
+    "to spread work across hosts.",
+)
+
+
+def _open_queue(queue_path: str | None, **kwargs) -> JobQueue:
+    return JobQueue(Path(queue_path) if queue_path else default_data_dir() / "queue.db", **kwargs)
+
+
+@main.command()
+@click.argument("urls_file", type=click.File("r"))
+@click.option(
+    "--output-dir",
+    "-d",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Directory workers write one plan file per URL into.",
+)
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["summary", "highlights", "full"]),
+    default="full",
+    help="Analysis mode for every URL.",
+)
+@click.option("--lang", "-l", default="en", help="Target language for voiceover.")
+@click.option("--style", "-s", type=StyleChoice(), default="realistic", help="Visual style.")
+@click.option(
+    "--format",
+    "-f",
+    "fmt",
+    type=click.Choice(["json", "markdown"]),
+    default="json",
+    help="Output format.",
+)
+@click.option("--max-attempts", type=int, default=3, help="Attempts before dead-lettering.")
+@_queue_option
+def enqueue(
+    urls_file,
+    output_dir: str,
+    mode: str,
+    lang: str,
+    style: str,
+    fmt: str,
+    max_attempts: int,
+    queue_path: str | None,
+) -> None:
+    """Add one analysis job per URL to the work queue."""
+    queue = _open_queue(queue_path)
+    out_dir = Path(output_dir).resolve()
+    ext = "md" if fmt == "markdown" else "json"
+    urls = [line.strip() for line in urls_file if line.strip() and not line.startswith("#")]
+
+    seen: set[str] = set()
+    for url in urls:
+        video = job_key(url)
+        if video in seen:
+            print(f"Skipping duplicate: {url}", file=sys.stderr)
+            continue
+        seen.add(video)
+        # Stable output name per video and parameters, so re-enqueueing overwrites
+        key = hashlib.sha1(f"{video}|{mode}|{lang}|{style}".encode()).hexdigest()[:12]
+        queue.enqueue(
+            {
+                "url": url,
+                "mode": mode,
+                "lang": lang,
+                "style": style,
+                "format": fmt,
+                "output": str(out_dir / f"{key}.{ext}"),
+            },
+            max_attempts=max_attempts,
+        )
+    print(f"Enqueued {len(seen)} jobs in {queue.path}", file=sys.stderr)
+
+
+@main.command()
+@_queue_option
+@click.option("--processes", "-p", type=int, default=1, help="Worker processes to run.")
+@click.option(
+    "--visibility-timeout",
+    type=float,
+    default=600.0,
+    help="Seconds without a heartbeat before a job is handed to another worker.",
+)
+@click.option("--once", is_flag=True, help="Exit when no job is ready instead of waiting.")
+@click.option("--model", default=None, help="Override Gemini model name.")
+@click.option("--verbose", "-v", is_flag=True, help="Verbose output.")
+def worker(
+    queue_path: str | None,
+    processes: int,
+    visibility_timeout: float,
+    once: bool,
+    model: str | None,
+    verbose: bool,
+) -> None:
+    """Pull jobs from the queue and run the download/analyze pipeline."""
+    import multiprocessing
+
+    from .worker import run_worker
+
+    config = Config.from_env()
+    if model:
+        config.model_name = model
+    queue = _open_queue(queue_path, visibility_timeout=visibility_timeout)
+
+    if processes <= 1:
+        try:
+            run_worker(queue, config, once=once, verbose=verbose)
+        except KeyboardInterrupt:
+            print("\nWorker stopped.", file=sys.stderr)
+        return
+
+    workers = [
+        multiprocessing.Process(
+            target=run_worker, args=(queue, config), kwargs={"once": once, "verbose": verbose}
+        )
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    try:
+        for p in workers:
+            p.join()
     except KeyboardInterrupt:
-        print("\nAborted.", file=sys.stderr)
-        raise SystemExit(130)
-    finally:
-        # Cleanup downloaded video
-        if video_path and video_path.exists() and not keep_video:
-            video_path.unlink(missing_ok=True)
-            if verbose:
-                print(f"  Cleaned up: {video_path}", file=sys.stderr)
+        for p in workers:
+            p.join()
+        print("\nWorkers stopped.", file=sys.stderr)
+
+
+@main.command(name="queue")
+@_queue_option
+@click.option("--dead", is_flag=True, help="List dead-lettered jobs with their last error.")
+@click.option("--requeue-dead", is_flag=True, help="Move dead-lettered jobs back to the queue.")
+def queue_cmd(queue_path: str | None, dead: bool, requeue_dead: bool) -> None:
+    """Show work queue status."""
+    queue = _open_queue(queue_path)
+    if requeue_dead:
+        click.echo(f"Requeued {queue.requeue_dead()} dead jobs")
+    stats = queue.stats()
+    for status in ("queued", "leased", "done", "dead"):
+        click.echo(f"{status:8s} {stats.get(status, 0)}")
+    if dead:
+        for job in queue.jobs("dead"):
+            click.echo(f"{job.id}\t{job.payload.get('url')}\t{job.last_error}")
+
+
+@main.command()
+@click.option(
+    "--group-by",
+    "-g",
+    type=click.Choice(GROUP_BY_COLUMNS),
+    default="day",
+    help="Aggregate rows by this field.",
+)
+@click.option("--since", default=None, help="Only count usage from this UTC day (YYYY-MM-DD).")
+@click.option(
+    "--daily-budget",
+    type=float,
+    envvar="VIDEO_ANALYST_DAILY_BUDGET",
+    default=None,
+    help="Daily ceiling in USD to report against.",
+)
+@click.option(
+    "--monthly-budget",
+    type=float,
+    envvar="VIDEO_ANALYST_MONTHLY_BUDGET",
+    default=None,
+    help="Monthly ceiling in USD to report against.",
+)
+def usage(
+    group_by: str, since: str | None, daily_budget: float | None, monthly_budget: float | None
+) -> None:
+    """Report recorded token usage and cost from the ledger."""
+    path = default_data_dir() / "ledger.db"
+    if not path.exists():
+        click.echo(f"No usage recorded yet ({path})")
+        return
+    ledger = UsageLedger(path)
+
+    click.echo(
+        f"{group_by:<18} {'runs':>5} {'calls':>6} {'prompt':>11} {'output':>10} "
+        f"{'thinking':>10} {'cached':>10} {'cost $':>10} {'tok/video-s':>12}"
+    )
+    total_cost = 0.0
+    for row in ledger.report(group_by, since=since):
+        per_second = row.tokens_per_video_second
+        total_cost += row.cost_usd
+        click.echo(
+            f"{row.key:<18} {row.runs:>5} {row.calls:>6} {row.prompt_tokens:>11,} "
+            f"{row.completion_tokens:>10,} {row.thinking_tokens:>10,} {row.cached_tokens:>10,} "
+            f"{row.cost_usd:>10.4f} {f'{per_second:,.0f}' if per_second else '-':>12}"
+        )
+    click.echo(f"Total cost: ${total_cost:.4f} USD")
+
+    today, month = ledger.spent_today(), ledger.spent_this_month()
+    if daily_budget is not None:
+        click.echo(f"Today (UTC): ${today:.4f} of ${daily_budget:.2f} daily budget")
+    if monthly_budget is not None:
+        click.echo(f"This month (UTC): ${month:.4f} of ${monthly_budget:.2f} monthly budget")
+
+
+@main.command()
+@click.argument("url")
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["summary", "highlights", "full"]),
+    default="full",
+    help="Analysis mode for every run.",
+)
+@click.option("--lang", "-l", default="en", help="Target language for voiceover.")
+@click.option(
+    "--style",
+    "-s",
+    type=StyleChoice(),
+    default="realistic",
+    help="Visual style for prompts.",
+)
+@click.option(
+    "--profiles",
+    default=",".join(PROFILE_NAMES),
+    show_default=True,
+    help="Comma-separated profiles to compare.",
+)
+@click.option("--model", default=None, help="Override Gemini model name.")
+@click.option("--verbose", "-v", is_flag=True, help="Verbose output.")
+def bench(
+    url: str, mode: str, lang: str, style: str, profiles: str, model: str | None, verbose: bool
+) -> None:
+    """Analyze one video with each profile and compare tokens, latency and plan size."""
+
+    names = [name.strip() for name in profiles.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROFILE_NAMES]
+    if unknown:
+        raise click.BadParameter(
+            f"Unknown profile(s): {', '.join(unknown)}", param_hint="--profiles"
+        )
+
+    config = Config.from_env()
+    if model:
+        config.model_name = model
+
+    try:
+        results = run_bench(url, config, mode, lang, style, names, verbose=verbose)
+    except RuntimeError as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+    click.echo(
+        f"\n{'profile':<10} {'prompt':>9} {'output':>8} {'thinking':>9} {'cost $':>8} "
+        f"{'latency s':>10} {'scenes':>7} {'plan KB':>8}"
+    )
+    for result in results:
+        if result.error:
+            click.echo(f"{result.profile:<10} failed: {result.error}")
+            continue
+        tokens = result.analysis.token_usage
+        click.echo(
+            f"{result.profile:<10} {tokens.prompt_tokens:>9,} {tokens.completion_tokens:>8,} "
+            f"{tokens.thinking_tokens:>9,} {tokens.cost_usd(config.model_name):>8.4f} "
+            f"{result.latency_seconds:>10.1f} {len(result.analysis.plan.scenes):>7} "
+            f"{result.plan_bytes / 1024:>8.1f}"
+        )
+
+
+def _plan_store_path() -> Path:
+    return default_data_dir() / "plans.db"
+
+
+@main.command()
+@click.argument("query")
+@click.option(
+    "--mode",
+    "-m",
+    type=click.Choice(["summary", "highlights", "full"]),
+    default=None,
+    help="Only plans of this mode.",
+)
+@click.option("--style", "-s", default=None, help="Only plans in this visual style.")
+@click.option("--lang", "-l", default=None, help="Only plans in this target language.")
+@click.option("--limit", "-n", type=int, default=20, show_default=True, help="Maximum results.")
+def search(query: str, mode: str | None, style: str | None, lang: str | None, limit: int) -> None:
+    """Full-text search of stored plans (titles, tags, characters, scenes, voiceovers).
+
+    QUERY accepts SQLite FTS5 syntax (e.g. 'cat AND kitchen', '"exact phrase"',
+    'voiceover:recipe'); anything else is matched as plain words.
+    """
+    path = _plan_store_path()
+    if not path.exists():
+        click.echo(f"No plans stored yet ({path})")
+        return
+    hits = PlanStore(path).search(query, limit=limit, mode=mode, style=style, language=lang)
+    for hit in hits:
+        day = time.strftime("%Y-%m-%d", time.gmtime(hit.ts))
+        labels = "/".join(v or "-" for v in (hit.mode, hit.style, hit.language))
+        click.echo(f"{hit.id}\t{day}\t{labels}\t{hit.title}\t{hit.url or '-'}")
+        click.echo(f"\t{hit.snippet}")
+    print(f"\n{len(hits)} match(es)", file=sys.stderr)
+
+
+@main.command()
+@click.argument("plan_id", type=int)
+@click.option(
+    "--format",
+    "-f",
+    "fmt",
+    type=click.Choice(["json", "markdown"]),
+    default="json",
+    help="Output format.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(),
+    default=None,
+    help="Output file path (default: stdout).",
+)
+def show(plan_id: int, fmt: str, output: str | None) -> None:
+    """Print a stored plan by the id shown by 'search'."""
+    path = _plan_store_path()
+    stored = PlanStore(path).get(plan_id) if path.exists() else None
+    if stored is None:
+        print(f"Error: no stored plan with id {plan_id}", file=sys.stderr)
+        raise SystemExit(1)
+    print(
+        f"{stored.title} — {stored.url or 'no source URL'} "
+        f"({stored.mode or '-'}, {stored.style or '-'}, {stored.language or '-'}, "
+        f"{stored.model or '-'}, ${stored.cost_usd:.4f})",
+        file=sys.stderr,
+    )
+    plan = stored.plan
+    _write_output(format_output(plan, fmt, style=stored.style or "realistic"), output, plan)
+
+
+@main.command()
+@click.option(
+    "--output-dir",
+    "-d",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Directory for one rebuilt plan file per archived run.",
+)
+@click.option(
+    "--format",
+    "-f",
+    "fmt",
+    type=click.Choice(["json", "markdown"]),
+    default="json",
+    help="Output format.",
+)
+@click.option("--since", default=None, help="Only runs archived from this UTC month (YYYY-MM).")
+@click.option("--workers", "-w", type=int, default=None, help="Processes (default: CPU count).")
+def reprocess(output_dir: str, fmt: str, since: str | None, workers: int | None) -> None:
+    """Rebuild plans from archived raw responses without any network calls.
+
+    Re-runs parsing, placeholder expansion, validation, the humanizer and the
+    formatter as they are now, using the last attempt of every archived run.
+    """
+    root = default_data_dir() / "responses"
+    if not root.exists():
+        click.echo(f"No responses archived yet ({root})")
+        return
+    started = time.monotonic()
+    outcomes = reprocess_archive(root, Path(output_dir), fmt, since=since, max_workers=workers)
+    failed = [o for o in outcomes if o.error]
+    for outcome in failed:
+        print(f"  {outcome.run_id}: {outcome.error}", file=sys.stderr)
+    print(
+        f"\nRebuilt {len(outcomes) - len(failed)}/{len(outcomes)} runs into {output_dir} "
+        f"in {time.monotonic() - started:.1f}s",
+        file=sys.stderr,
+    )
+
+
+@main.command(name="schema-stats")
+@click.option("--lang", "-l", default="en", help="Target language for the system prompt.")
+@click.option(
+    "--style",
+    "-s",
+    type=StyleChoice(),
+    default="realistic",
+    help="Visual style for the system prompt.",
+)
+@click.option("--model", default=None, help="Override Gemini model name.")
+def schema_stats(lang: str, style: str, model: str | None) -> None:
+    """Count prompt tokens saved by the compact per-mode response schemas."""
+    from google import genai
+
+    config = Config.from_env()
+    client = genai.Client(api_key=config.gemini_api_key)
+    click.echo(f"{'mode':<12} {'described':>10} {'compact':>10} {'saved':>7}")
+    for mode in ("summary", "highlights", "full"):
+        cost = measure_schema_tokens(client, model or config.model_name, mode, lang, style)
+        click.echo(
+            f"{mode:<12} {cost.legacy_tokens:>10,} {cost.compact_tokens:>10,} {cost.savings:>7.0%}"
+        )
+    click.echo("Output tokens drop further: derived fields are no longer generated per scene.")
 
 
 @main.command(name="styles")
@@ -1,29 +1,129 @@
 """Configuration loading from environment variables."""
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
+def _optional_int(name: str) -> int | None:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def _optional_float(name: str) -> float | None:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def default_data_dir() -> Path:
+    """Local state directory (indexes, queues, ledgers); needs no API key."""
+    return Path(os.environ.get("VIDEO_ANALYST_DATA_DIR", Path.home() / ".video-analyst"))
+
+
+def _mode_profiles() -> dict[str, str]:
+    """Per-mode default profiles from VIDEO_ANALYST_PROFILE_<MODE>."""
+    profiles = {}
+    for mode in ("summary", "highlights", "full"):
+        value = os.environ.get(f"VIDEO_ANALYST_PROFILE_{mode.upper()}")
+        if value:
+            profiles[mode] = value
+    return profiles
+
+
+def _flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _api_keys() -> list[str]:
+    """GEMINI_API_KEY, then GEMINI_API_KEYS (comma or space separated), then
+    the keys file (one per line, # comments), without duplicates."""
+    keys = [os.environ.get("GEMINI_API_KEY", "")]
+    keys += os.environ.get("GEMINI_API_KEYS", "").replace(",", " ").split()
+    keys_file = os.environ.get("VIDEO_ANALYST_KEYS_FILE")
+    if keys_file:
+        try:
+            lines = Path(keys_file).expanduser().read_text(encoding="utf-8").splitlines()
+        except OSError as e:
+            raise SystemExit(f"Error: cannot read VIDEO_ANALYST_KEYS_FILE: {e}")
+        keys += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(k.strip() for k in keys if k.strip()))
+
+
 @dataclass
 class Config:
+    # Key used when no pool is involved; the first key of the pool
     gemini_api_key: str
     model_name: str = "gemini-2.5-flash"
     download_dir: Path = Path("downloads")
     max_video_size_mb: int = 200
+    max_video_duration_seconds: int | None = None
+    max_analysis_duration_seconds: int | None = None
+    # Resumable upload chunk size; rounded down to a multiple of 256 KiB
+    upload_chunk_mb: int = 8
+    data_dir: Path = Path.home() / ".video-analyst"
+    dedup: bool = False
+    context_cache: bool = False
+    cache_ttl_seconds: int = 600
+    ledger: bool = True
+    # Keep every plan in the local full-text plan store
+    plan_store: bool = True
+    # Keep every raw Gemini response for offline reprocessing
+    archive: bool = True
+    cascade: bool = False
+    two_phase: bool = False
+    # Fetch platform captions and pass them to the prompt as a transcript
+    subtitles: bool = False
+    # In highlights mode, upload only the loudest, most active windows
+    highlight_preselect: bool = False
+    # Latency/cost profile for every mode; None picks the mode's default
+    profile: str | None = None
+    # Default profile per mode, overriding profiles.MODE_PROFILES
+    mode_profiles: dict[str, str] = field(default_factory=dict)
+    cascade_model: str = "gemini-2.0-flash"
+    daily_budget_usd: float | None = None
+    monthly_budget_usd: float | None = None
+    # Every configured key, for spreading jobs across quotas (see keypool)
+    gemini_api_keys: tuple[str, ...] = ()
+
+    @property
+    def api_keys(self) -> tuple[str, ...]:
+        return self.gemini_api_keys or (self.gemini_api_key,)
 
     @classmethod
     def from_env(cls) -> "Config":
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
+        api_keys = _api_keys()
+        if not api_keys:
             raise SystemExit(
                 "Error: GEMINI_API_KEY environment variable is required.\n"
-                "Set it with: export GEMINI_API_KEY=your_key_here"
+                "Set it with: export GEMINI_API_KEY=your_key_here\n"
+                "(or GEMINI_API_KEYS / VIDEO_ANALYST_KEYS_FILE for a pool of keys)"
             )
 
         return cls(
-            gemini_api_key=api_key,
+            gemini_api_key=api_keys[0],
+            gemini_api_keys=tuple(api_keys),
             model_name=os.environ.get("VIDEO_ANALYST_MODEL", "gemini-2.5-flash"),
             download_dir=Path(os.environ.get("VIDEO_ANALYST_DOWNLOAD_DIR", "downloads")),
             max_video_size_mb=int(os.environ.get("VIDEO_ANALYST_MAX_VIDEO_SIZE_MB", "200")),
+            max_video_duration_seconds=_optional_int("VIDEO_ANALYST_MAX_VIDEO_DURATION"),
+            max_analysis_duration_seconds=_optional_int("VIDEO_ANALYST_MAX_ANALYSIS_DURATION"),
+            upload_chunk_mb=int(os.environ.get("VIDEO_ANALYST_UPLOAD_CHUNK_MB", "8")),
+            data_dir=default_data_dir(),
+            dedup=_flag("VIDEO_ANALYST_DEDUP"),
+            context_cache=_flag("VIDEO_ANALYST_CONTEXT_CACHE"),
+            cache_ttl_seconds=int(os.environ.get("VIDEO_ANALYST_CACHE_TTL", "600")),
+            cascade=_flag("VIDEO_ANALYST_CASCADE"),
+            two_phase=_flag("VIDEO_ANALYST_TWO_PHASE"),
+            subtitles=_flag("VIDEO_ANALYST_SUBTITLES"),
+            highlight_preselect=_flag("VIDEO_ANALYST_HIGHLIGHT_PRESELECT"),
+            profile=os.environ.get("VIDEO_ANALYST_PROFILE") or None,
+            mode_profiles=_mode_profiles(),
+            cascade_model=os.environ.get("VIDEO_ANALYST_CASCADE_MODEL", "gemini-2.0-flash"),
+            ledger=os.environ.get("VIDEO_ANALYST_LEDGER", "1").lower() not in ("0", "false", "no"),
+            plan_store=os.environ.get("VIDEO_ANALYST_PLAN_STORE", "1").lower()
+            not in ("0", "false", "no"),
+            archive=os.environ.get("VIDEO_ANALYST_ARCHIVE", "1").lower()
+            not in ("0", "false", "no"),
+            daily_budget_usd=_optional_float("VIDEO_ANALYST_DAILY_BUDGET"),
+            monthly_budget_usd=_optional_float("VIDEO_ANALYST_MONTHLY_BUDGET"),
         )
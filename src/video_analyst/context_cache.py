@@ -0,0 +1,86 @@
+"""Gemini explicit context caching for the uploaded video and system prompt."""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from google import genai
+from google.genai import errors, types
+
+
+class ContextCache:
+    """A cached-content entry holding the media parts and system instruction.
+
+    Requests that reference it send only their text prompt; the cached
+    tokens are billed at the reduced cached-input rate plus hourly storage.
+    """
+
+    def __init__(
+        self,
+        client: genai.Client,
+        cached: types.CachedContent,
+        ttl_seconds: int,
+    ) -> None:
+        self.client = client
+        self.name = cached.name
+        self.ttl_seconds = ttl_seconds
+        self.token_count = (
+            cached.usage_metadata.total_token_count if cached.usage_metadata else 0
+        ) or 0
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl_seconds
+
+    def keep_alive(self, min_remaining: int = 60) -> None:
+        """Extend the TTL if the entry would expire within ``min_remaining`` seconds."""
+        if self.expires_at - time.time() >= min_remaining:
+            return
+        self.client.caches.update(
+            name=self.name,
+            config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+        )
+        self.expires_at = time.time() + self.ttl_seconds
+
+    def close(self) -> float:
+        """Delete the entry. Returns the token-hours of storage that were used."""
+        try:
+            self.client.caches.delete(name=self.name)
+        except errors.APIError as e:
+            # The TTL expires it anyway
+            print(f"  Warning: could not delete context cache {self.name}: {e}", file=sys.stderr)
+        hours = (time.time() - self.created_at) / 3600
+        return self.token_count * hours
+
+
+def create_context_cache(
+    client: genai.Client,
+    model: str,
+    media_parts: list,
+    system_prompt: str,
+    ttl_seconds: int = 600,
+    verbose: bool = False,
+) -> ContextCache | None:
+    """Cache media plus system prompt. Returns None if the API refuses.
+
+    Caching has a per-model minimum token count, so very short inputs are
+    rejected; callers fall back to sending the media inline.
+    """
+    try:
+        cached = client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name="video-analyst",
+                contents=[types.Content(role="user", parts=media_parts)],
+                system_instruction=system_prompt,
+                ttl=f"{ttl_seconds}s",
+            ),
+        )
+    except errors.APIError as e:
+        if verbose:
+            print(f"  Context cache unavailable, sending media inline: {e}", file=sys.stderr)
+        return None
+
+    cache = ContextCache(client, cached, ttl_seconds)
+    if verbose:
+        print(f"  Context cache: {cache.name} ({cache.token_count:,} tokens)", file=sys.stderr)
+    return cache
@@ -0,0 +1,221 @@
+"""Perceptual-hash index for spotting reposted videos and reusing their plans."""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from . import media
+from .media import np
+from .models import VideoReproductionPlan
+
+# Frames hashed per video, spread evenly over its duration
+SIGNATURE_FRAMES = 16
+# Mean per-frame Hamming distance (out of 64 bits) still considered the same video
+DEFAULT_MAX_DISTANCE = 8
+_HASH_SIZE = 32
+_LOW_FREQ = 8
+# Rows compared per step during lookup, bounds memory for large indexes
+_LOOKUP_CHUNK = 4096
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so ``D @ X @ D.T`` is the 2-D DCT of X."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    d[0] /= np.sqrt(2)
+    return d
+
+
+def phash_frames(frames: np.ndarray) -> np.ndarray:
+    """Compute 64-bit DCT pHashes for a stack of 32x32 grayscale frames.
+
+    ``frames`` has shape (N, 32, 32); returns N uint64 hashes.
+    """
+    media.require_numpy()
+    d = _dct_matrix(_HASH_SIZE)
+    coeffs = d @ frames.astype(np.float64) @ d.T
+    low = coeffs[:, :_LOW_FREQ, :_LOW_FREQ].reshape(len(frames), -1)
+    # Median of the AC terms; the DC term would dominate and is excluded
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(low > median, axis=1)
+    return bits.view(">u8").ravel().astype(np.uint64)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint64 element."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    table = np.array([i.bit_count() for i in range(256)], dtype=np.uint8)
+    return table[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1)
+
+
+def video_signature(video_path: Path, frames: int = SIGNATURE_FRAMES) -> np.ndarray:
+    """Hash ``frames`` evenly spaced frames of a local video."""
+    media.require_numpy()
+    duration = media.probe_duration(video_path)
+    # Decode at twice the needed rate, then pick evenly spaced frames
+    decoded = media.decode_gray_frames(
+        video_path, fps=2 * frames / max(duration, 1.0), width=_HASH_SIZE, height=_HASH_SIZE
+    )
+    if len(decoded) == 0:
+        raise RuntimeError(f"No frames decoded from {video_path}")
+    picks = np.linspace(0, len(decoded) - 1, num=frames).round().astype(np.int64)
+    return phash_frames(decoded[picks])
+
+
+def signature_distances(query: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+    """Mean Hamming distance from each query frame to its closest frame per stored video.
+
+    Matching each frame against every stored frame tolerates trims, intros
+    and small offsets between reposts. Returns one distance per row of
+    ``signatures`` (shape (N, K)).
+    """
+    out = np.empty(len(signatures))
+    for start in range(0, len(signatures), _LOOKUP_CHUNK):
+        chunk = signatures[start : start + _LOOKUP_CHUNK]
+        xor = chunk[:, None, :] ^ query[None, :, None]  # (n, query, stored)
+        out[start : start + len(chunk)] = _popcount(xor).min(axis=2).mean(axis=1)
+    return out
+
+
+@dataclass
+class IndexEntry:
+    url: str
+    mode: str
+    target_language: str
+    style: str
+    plan_file: str
+
+
+@dataclass
+class IndexMatch:
+    entry: IndexEntry
+    distance: float
+
+    def load_plan(self, index: PhashIndex) -> VideoReproductionPlan:
+        path = index.root / self.entry.plan_file
+        return VideoReproductionPlan.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+class PhashIndex:
+    """Array-backed signature index stored in a directory.
+
+    Layout: ``signatures.npy`` (N x K uint64), ``entries.json`` (N entries)
+    and ``plans/<id>.json``. Safe to share between threads and processes:
+    writers hold an exclusive lock on ``index.lock`` and merge into the
+    index on disk, and readers pick up entries other processes added.
+    """
+
+    def __init__(self, root: Path) -> None:
+        media.require_numpy()
+        self.root = root
+        self._lock = threading.Lock()
+        self._sig_path = root / "signatures.npy"
+        self._entries_path = root / "entries.json"
+        self._lock_path = root / "index.lock"
+        self.signatures = np.zeros((0, SIGNATURE_FRAMES), dtype=np.uint64)
+        self.entries: list[IndexEntry] = []
+        # mtime_ns of the entries.json last loaded, to skip unchanged reloads
+        self._loaded_mtime: int | None = None
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _mtime(self) -> int | None:
+        try:
+            return self._entries_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> None:
+        """Read the index from disk; the caller holds the file lock."""
+        mtime = self._mtime()
+        if mtime is None or mtime == self._loaded_mtime or not self._sig_path.exists():
+            return
+        self.signatures = np.load(self._sig_path)
+        entries = json.loads(self._entries_path.read_text(encoding="utf-8"))
+        self.entries = [IndexEntry(**e) for e in entries]
+        self._loaded_mtime = mtime
+
+    def _refresh(self) -> None:
+        """Reload if another process changed the index; the caller holds ``_lock``."""
+        mtime = self._mtime()
+        if mtime is not None and mtime != self._loaded_mtime:
+            with self._file_lock(exclusive=False):
+                self._load()
+
+    def lookup(
+        self, signature: np.ndarray, max_distance: float = DEFAULT_MAX_DISTANCE
+    ) -> list[IndexMatch]:
+        """Return stored videos within ``max_distance``, closest first."""
+        with self._lock:
+            self._refresh()
+            signatures, entries = self.signatures, list(self.entries)
+        if not entries:
+            return []
+        distances = signature_distances(signature, signatures)
+        order = np.argsort(distances)
+        return [
+            IndexMatch(entry=entries[i], distance=float(distances[i]))
+            for i in order
+            if distances[i] <= max_distance
+        ]
+
+    def add(
+        self,
+        signature: np.ndarray,
+        plan: VideoReproductionPlan,
+        url: str,
+        mode: str,
+        target_language: str,
+        style: str,
+    ) -> None:
+        with self._lock, self._file_lock(exclusive=True):
+            # Another process may have added entries since our last load
+            self._load()
+            (self.root / "plans").mkdir(parents=True, exist_ok=True)
+            plan_file = f"plans/{uuid.uuid4().hex}.json"
+            (self.root / plan_file).write_text(plan.model_dump_json(), encoding="utf-8")
+
+            self.entries.append(
+                IndexEntry(
+                    url=url,
+                    mode=mode,
+                    target_language=target_language,
+                    style=style,
+                    plan_file=plan_file,
+                )
+            )
+            self.signatures = np.vstack([self.signatures, signature[None, :]])
+            self._save()
+
+    def _save(self) -> None:
+        # Write-then-rename so a crash never leaves a half-written index
+        tmp_sig = self._sig_path.with_suffix(".tmp.npy")
+        np.save(tmp_sig, self.signatures)
+        tmp_entries = self._entries_path.with_suffix(".tmp")
+        tmp_entries.write_text(json.dumps([asdict(e) for e in self.entries]), encoding="utf-8")
+        os.replace(tmp_sig, self._sig_path)
+        os.replace(tmp_entries, self._entries_path)
+        self._loaded_mtime = self._mtime()
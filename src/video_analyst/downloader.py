@@ -3,12 +3,21 @@
 from __future__ import annotations
 
 import glob as globmod
+import math
+import subprocess
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Literal
 
 import yt_dlp
 
+from .canonical import detect_platform
+from .formats import select_format
+from .storyboard import DEFAULT_MAX_FRAMES, download_storyboard
+from .transcript import TranscriptSegment, fetch_transcript
+
 
 @dataclass
 class DownloadResult:
@@ -18,15 +27,60 @@ class DownloadResult:
     description: str
     platform: str
     original_url: str
+    # Mode chosen by admission routing; None means use the requested mode
+    mode: str | None = None
+    # Source time ranges (start, end) in seconds contained in video_path,
+    # in playback order. None means the whole video was downloaded.
+    ranges: list[tuple[float, float]] | None = None
+    # Source-language captions, when requested and available
+    transcript: list[TranscriptSegment] | None = None
+
+
+AdmissionReason = Literal[
+    "ok",
+    "routed",
+    "unavailable",
+    "live",
+    "upcoming",
+    "too_long",
+    "too_large",
+    "platform_not_allowed",
+]
+
+
+@dataclass
+class AdmissionPolicy:
+    """Limits checked against probed metadata before any media is downloaded.
+
+    ``None`` disables the corresponding check.
+    """
+
+    max_duration_seconds: int | None = None
+    max_size_mb: int | None = None
+    allow_live: bool = False
+    allowed_platforms: tuple[str, ...] | None = None
+    # Videos longer than this are admitted but routed to summary mode
+    summary_over_seconds: int | None = None
+
+
+@dataclass
+class AdmissionDecision:
+    admitted: bool
+    reason: AdmissionReason
+    url: str
+    detail: str = ""
+    mode: str | None = None
+    platform: str = "unknown"
+    duration: int | None = None
+    estimated_size_mb: float | None = None
 
 
-def _detect_platform(url: str) -> str:
-    url_lower = url.lower()
-    if "tiktok.com" in url_lower:
-        return "tiktok"
-    if "youtube.com" in url_lower or "youtu.be" in url_lower:
-        return "youtube"
-    return "unknown"
+class AdmissionRejected(RuntimeError):
+    """Raised by download_video when the admission policy rejects a video."""
+
+    def __init__(self, decision: AdmissionDecision) -> None:
+        super().__init__(f"Video rejected ({decision.reason}): {decision.detail}")
+        self.decision = decision
 
 
 def _find_downloaded_file(output_dir: Path, video_id: str) -> Path | None:
@@ -45,8 +99,9 @@ def _find_downloaded_file(output_dir: Path, video_id: str) -> Path | None:
     return None
 
 
-# Format preference: 480p MP4 keeps file size small for fast Gemini upload/processing.
-# Still sufficient quality for scene analysis. Falls back through higher quality if needed.
+# Fallback format preference when the probe lists no formats to choose from
+# (see formats.select_format): 480p MP4 keeps the upload small and is still
+# sufficient for scene analysis. Also used to resolve formats while probing.
 _FORMAT_STRING = (
     "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/"
     "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/"
@@ -56,15 +111,286 @@ _FORMAT_STRING = (
 )
 
 
+# Analysis budget when summary mode runs on a long source without an explicit limit
+_SUMMARY_DEFAULT_BUDGET_SECONDS = 240
+# Length of each sampled window when a budget is spread across the source
+_SAMPLE_WINDOW_SECONDS = 30
+
+
+def _sampled_windows(
+    duration: float, budget: float, window: float = _SAMPLE_WINDOW_SECONDS
+) -> list[tuple[float, float]]:
+    """Spread ``budget`` seconds over the source as evenly spaced windows.
+
+    The first window always starts at 0 so the hook is included.
+    """
+    count = max(1, math.ceil(budget / window))
+    window = budget / count
+    if count == 1:
+        return [(0.0, window)]
+    step = (duration - window) / (count - 1)
+    return [(round(i * step, 1), round(i * step + window, 1)) for i in range(count)]
+
+
+def plan_download_ranges(
+    duration: float | None, mode: str, max_analysis_seconds: int | None = None
+) -> list[tuple[float, float]] | None:
+    """Choose which parts of the source to download for the given mode.
+
+    - full: the first ``max_analysis_seconds`` (continuity matters most)
+    - summary: sampled windows totalling ``max_analysis_seconds``, or a
+      default budget for long sources
+    - highlights: sampled windows totalling ``max_analysis_seconds``
+
+    Returns None when the whole video should be downloaded.
+    """
+    if not duration:
+        return None
+
+    budget = max_analysis_seconds
+    if budget is None and mode == "summary":
+        budget = _SUMMARY_DEFAULT_BUDGET_SECONDS
+    if budget is None or duration <= budget:
+        return None
+
+    if mode == "full":
+        return [(0.0, float(budget))]
+    return _sampled_windows(duration, budget)
+
+
+def _concat_sections(sections: list[Path], output_path: Path) -> None:
+    """Join downloaded sections into one file of their container without re-encoding."""
+    list_file = output_path.with_suffix(".concat.txt")
+    list_file.write_text("".join(f"file '{p.resolve()}'\n" for p in sections), encoding="utf-8")
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                str(list_file),
+                "-c",
+                "copy",
+                str(output_path),
+            ],
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"Failed to join downloaded sections: {e}") from e
+    finally:
+        list_file.unlink(missing_ok=True)
+    for p in sections:
+        p.unlink(missing_ok=True)
+
+
+def _estimate_filesize(info: dict) -> int | None:
+    """Estimate download bytes for the format(s) yt-dlp selected during the probe."""
+    selected = info.get("requested_formats") or [info]
+    duration = info.get("duration")
+    total = 0
+    for fmt in selected:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size and fmt.get("tbr") and duration:
+            # tbr is in kbit/s
+            size = fmt["tbr"] * 1000 / 8 * duration
+        if not size:
+            return None
+        total += size
+    return int(total)
+
+
+def probe_video(url: str, verbose: bool = False) -> dict:
+    """Extract metadata and resolve formats without downloading any media."""
+    ydl_opts: dict = {
+        "format": _FORMAT_STRING,
+        "quiet": not verbose,
+        "no_warnings": not verbose,
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise RuntimeError(f"Metadata probe failed: {e}") from e
+    if info is None:
+        raise RuntimeError(f"Failed to extract info from: {url}")
+    return info
+
+
+def _routes_to_summary(policy: AdmissionPolicy, duration: float | None, mode: str) -> bool:
+    return (
+        policy.summary_over_seconds is not None
+        and duration is not None
+        and duration > policy.summary_over_seconds
+        and mode != "summary"
+    )
+
+
+def evaluate_admission(
+    info: dict,
+    url: str,
+    policy: AdmissionPolicy,
+    mode: str = "full",
+    max_analysis_seconds: int | None = None,
+) -> AdmissionDecision:
+    """Decide whether a probed video should be downloaded, and in which mode.
+
+    The size estimate covers the stream and ranges download_video() would
+    fetch for the same ``max_analysis_seconds``.
+    """
+    platform = detect_platform(url)
+    duration = info.get("duration")
+    routed = _routes_to_summary(policy, duration, mode)
+    ranges = plan_download_ranges(duration, "summary" if routed else mode, max_analysis_seconds)
+    max_bytes = policy.max_size_mb * 1024 * 1024 if policy.max_size_mb is not None else None
+    choice = select_format(
+        info,
+        "summary" if routed else mode,
+        max_bytes=max_bytes,
+        seconds=sum(b - a for a, b in ranges) if ranges else None,
+    )
+    size_bytes = choice.estimated_bytes if choice else _estimate_filesize(info)
+    size_mb = size_bytes / (1024 * 1024) if size_bytes is not None else None
+
+    def _decide(admitted: bool, reason: AdmissionReason, detail: str = "", **kw):
+        return AdmissionDecision(
+            admitted=admitted,
+            reason=reason,
+            url=url,
+            detail=detail,
+            platform=platform,
+            duration=duration,
+            estimated_size_mb=size_mb,
+            **kw,
+        )
+
+    if policy.allowed_platforms is not None and platform not in policy.allowed_platforms:
+        return _decide(False, "platform_not_allowed", f"platform '{platform}' is not allowed")
+
+    live_status = info.get("live_status")
+    if live_status == "is_upcoming":
+        return _decide(False, "upcoming", "premiere or scheduled stream has not started")
+    if (info.get("is_live") or live_status in ("is_live", "post_live")) and not policy.allow_live:
+        return _decide(False, "live", f"live status '{live_status or 'is_live'}'")
+
+    if (
+        policy.max_duration_seconds is not None
+        and duration is not None
+        and duration > policy.max_duration_seconds
+    ):
+        return _decide(
+            False, "too_long", f"{duration}s exceeds {policy.max_duration_seconds}s limit"
+        )
+
+    if policy.max_size_mb is not None and size_mb is not None and size_mb > policy.max_size_mb:
+        return _decide(
+            False, "too_large", f"~{size_mb:.1f} MB exceeds {policy.max_size_mb} MB limit"
+        )
+
+    if routed:
+        return _decide(
+            True,
+            "routed",
+            f"{duration}s exceeds {policy.summary_over_seconds}s, using summary mode",
+            mode="summary",
+        )
+
+    return _decide(True, "ok", mode=mode)
+
+
+def check_admission(
+    url: str,
+    policy: AdmissionPolicy,
+    mode: str = "full",
+    verbose: bool = False,
+    max_analysis_seconds: int | None = None,
+) -> AdmissionDecision:
+    """Probe a URL and evaluate it against the policy. Never downloads media."""
+    try:
+        info = probe_video(url, verbose=verbose)
+    except RuntimeError as e:
+        return AdmissionDecision(
+            admitted=False,
+            reason="unavailable",
+            url=url,
+            detail=str(e),
+            platform=detect_platform(url),
+        )
+    return evaluate_admission(
+        info, url, policy, mode=mode, max_analysis_seconds=max_analysis_seconds
+    )
+
+
+def prefilter_urls(
+    urls: list[str],
+    policy: AdmissionPolicy,
+    mode: str = "full",
+    max_workers: int = 8,
+    max_analysis_seconds: int | None = None,
+) -> list[AdmissionDecision]:
+    """Check many URLs in parallel at metadata cost only. Preserves input order."""
+
+    def check(url: str) -> AdmissionDecision:
+        return check_admission(url, policy, mode=mode, max_analysis_seconds=max_analysis_seconds)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(check, urls))
+
+
+def _probe_and_admit(
+    url: str,
+    ydl_opts: dict,
+    policy: AdmissionPolicy,
+    mode: str,
+    verbose: bool,
+    max_analysis_seconds: int | None = None,
+) -> tuple[dict, AdmissionDecision]:
+    """Probe ``url`` and raise AdmissionRejected unless the policy admits it."""
+    with yt_dlp.YoutubeDL(ydl_opts) as probe:
+        info = probe.extract_info(url, download=False)
+    if info is None:
+        raise RuntimeError(f"Failed to extract info from: {url}")
+
+    decision = evaluate_admission(
+        info, url, policy, mode=mode, max_analysis_seconds=max_analysis_seconds
+    )
+    if not decision.admitted:
+        raise AdmissionRejected(decision)
+    if verbose and decision.estimated_size_mb is not None:
+        print(
+            f"  Admitted: ~{decision.estimated_size_mb:.1f} MB estimated",
+            file=sys.stderr,
+        )
+    return info, decision
+
+
 def download_video(
     url: str,
     output_dir: Path,
     max_size_mb: int = 500,
     verbose: bool = False,
+    policy: AdmissionPolicy | None = None,
+    mode: str = "full",
+    max_analysis_seconds: int | None = None,
+    subtitles: bool = False,
 ) -> DownloadResult:
-    """Download video from URL as MP4, return path and metadata."""
+    """Probe, admit and download a video from URL as MP4, return path and metadata.
+
+    Raises AdmissionRejected if the probed metadata fails the policy. When no
+    policy is given, only ``max_size_mb`` is enforced. Long sources are
+    downloaded partially according to plan_download_ranges(). With
+    ``subtitles``, source-language captions are fetched as a transcript.
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
-    platform = _detect_platform(url)
+    platform = detect_platform(url)
+    if policy is None:
+        policy = AdmissionPolicy(max_size_mb=max_size_mb)
 
     progress_hook_state = {"started": False}
 
@@ -87,13 +413,59 @@ def download_video(
     }
 
     try:
+        # Metadata first: reject before paying for the download
+        info, decision = _probe_and_admit(
+            url,
+            {**ydl_opts, "progress_hooks": []},
+            policy,
+            mode,
+            verbose,
+            max_analysis_seconds=max_analysis_seconds,
+        )
+
+        ranges = plan_download_ranges(
+            info.get("duration"), decision.mode or mode, max_analysis_seconds
+        )
+        choice = select_format(
+            info,
+            decision.mode or mode,
+            max_bytes=policy.max_size_mb * 1024 * 1024 if policy.max_size_mb is not None else None,
+            seconds=sum(b - a for a, b in ranges) if ranges else None,
+        )
+        if choice is not None:
+            ydl_opts["format"] = choice.format_id
+            if verbose:
+                print(f"  Format {choice.describe()}", file=sys.stderr)
+        if ranges:
+            if verbose:
+                spans = ", ".join(f"{a:.0f}-{b:.0f}s" for a, b in ranges)
+                print(f"  Downloading ranges: {spans}", file=sys.stderr)
+            ydl_opts.update(
+                download_ranges=yt_dlp.utils.download_range_func(None, ranges),
+                force_keyframes_at_cuts=True,
+                outtmpl=str(output_dir / "%(id)s.section-%(section_start)s.%(ext)s"),
+            )
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            if info is None:
-                raise RuntimeError(f"Failed to extract info from: {url}")
+            info = ydl.process_ie_result(info, download=True)
 
             video_id = info.get("id", "unknown")
-            video_path = _find_downloaded_file(output_dir, video_id)
+            if ranges:
+                sections = sorted(
+                    (Path(p) for p in globmod.glob(str(output_dir / f"{video_id}.section-*"))),
+                    key=lambda p: float(p.name.split("section-")[1].rsplit(".", 1)[0]),
+                )
+                if not sections:
+                    raise RuntimeError(f"Downloaded sections not found for video ID: {video_id}")
+                # Sections share one format; keep its real container
+                suffix = sections[0].suffix
+                if len(sections) == 1:
+                    video_path = sections[0].rename(output_dir / f"{video_id}{suffix}")
+                else:
+                    video_path = output_dir / f"{video_id}{suffix}"
+                    _concat_sections(sections, video_path)
+            else:
+                video_path = _find_downloaded_file(output_dir, video_id)
 
             if video_path is None:
                 # Fallback: try prepare_filename
@@ -102,14 +474,14 @@ def download_video(
                 if not video_path.exists():
                     video_path = Path(filename)
                     if not video_path.exists():
-                        raise RuntimeError(
-                            f"Downloaded file not found for video ID: {video_id}"
-                        )
+                        raise RuntimeError(f"Downloaded file not found for video ID: {video_id}")
 
             size_mb = video_path.stat().st_size / (1024 * 1024)
             if verbose:
                 print(f"  File size: {size_mb:.1f} MB", file=sys.stderr)
 
+            transcript = fetch_transcript(ydl, info, verbose=verbose) if subtitles else None
+
             return DownloadResult(
                 video_path=video_path,
                 title=info.get("title", "Untitled"),
@@ -117,7 +489,53 @@ def download_video(
                 description=info.get("description", ""),
                 platform=platform,
                 original_url=url,
+                mode=decision.mode,
+                ranges=ranges,
+                transcript=transcript,
             )
 
     except yt_dlp.utils.DownloadError as e:
         raise RuntimeError(f"Download failed: {e}") from e
+
+
+def download_storyboard_input(
+    url: str,
+    output_dir: Path,
+    verbose: bool = False,
+    policy: AdmissionPolicy | None = None,
+    mode: str = "full",
+    max_frames: int = DEFAULT_MAX_FRAMES,
+) -> DownloadResult:
+    """Probe and admit a video, then fetch only its storyboard frames and captions.
+
+    ``video_path`` of the result is a directory of timestamped frames (see
+    storyboard.load_storyboard). The media size limit does not apply since
+    no video is downloaded.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    policy = replace(policy or AdmissionPolicy(), max_size_mb=None)
+    ydl_opts: dict = {
+        "quiet": not verbose,
+        "no_warnings": not verbose,
+    }
+    try:
+        info, decision = _probe_and_admit(url, ydl_opts, policy, mode, verbose)
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            frames_dir = download_storyboard(
+                ydl, info, output_dir, max_frames=max_frames, verbose=verbose
+            )
+            # Without audio, captions are the only record of what is said
+            transcript = fetch_transcript(ydl, info, verbose=verbose)
+    except yt_dlp.utils.DownloadError as e:
+        raise RuntimeError(f"Storyboard download failed: {e}") from e
+
+    return DownloadResult(
+        video_path=frames_dir,
+        title=info.get("title", "Untitled"),
+        duration=info.get("duration"),
+        description=info.get("description", ""),
+        platform=detect_platform(url),
+        original_url=url,
+        mode=decision.mode,
+        transcript=transcript,
+    )
@@ -0,0 +1,194 @@
+"""Choice of the smallest adequate stream from a probe's format list.
+
+The analysis needs legible frames and the audio track, not quality: each
+mode sets minimums, and the smallest stream meeting them within the size
+budget is downloaded. A single progressive (video+audio) format is preferred,
+since a separate video and audio pair costs a second download and an ffmpeg
+merge. MP4 streams (with M4A audio for pairs) rank before any other
+container, whatever their size: they merge, concatenate and upload as MP4.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class StreamRequirements:
+    # Minimums apply to the short side, so vertical videos are judged fairly
+    min_short_side: int
+    min_fps: float
+    audio: bool = True
+    # Larger frames only add upload and processing time
+    max_short_side: int = 720
+
+
+MODE_REQUIREMENTS = {
+    "summary": StreamRequirements(min_short_side=240, min_fps=15),
+    "highlights": StreamRequirements(min_short_side=360, min_fps=24),
+    "full": StreamRequirements(min_short_side=360, min_fps=24),
+}
+
+
+@dataclass
+class FormatChoice:
+    # yt-dlp format selector: "18" or "134+140"
+    format_id: str
+    progressive: bool
+    width: int | None
+    height: int | None
+    fps: float | None
+    ext: str | None
+    estimated_bytes: int | None
+    # Container of the separate audio stream of a pair
+    audio_ext: str | None = None
+
+    @property
+    def mp4(self) -> bool:
+        """Whether the stream (and its audio) is in an MP4 container."""
+        return self.ext == "mp4" and (self.progressive or self.audio_ext in ("m4a", "mp4"))
+
+    @property
+    def short_side(self) -> int | None:
+        if self.width and self.height:
+            return min(self.width, self.height)
+        return self.height
+
+    def meets(self, requirements: StreamRequirements) -> bool:
+        """Whether the stream satisfies the minimums; unknown values pass."""
+        side, fps = self.short_side, self.fps
+        if side is not None and not (
+            requirements.min_short_side <= side <= requirements.max_short_side
+        ):
+            return False
+        return fps is None or fps >= requirements.min_fps
+
+    def describe(self) -> str:
+        size = f"{self.width}x{self.height}" if self.width and self.height else "unknown size"
+        fps = f", {self.fps:g}fps" if self.fps else ""
+        kind = "progressive" if self.progressive else "video+audio merge"
+        estimate = (
+            f"~{self.estimated_bytes / (1024 * 1024):.1f} MB"
+            if self.estimated_bytes is not None
+            else "size unknown"
+        )
+        return f"{self.format_id} ({size}{fps}, {self.ext or '?'}, {kind}), {estimate}"
+
+
+def _has_video(fmt: dict) -> bool:
+    # None means unknown; yt-dlp marks missing streams with "none"
+    return fmt.get("vcodec") != "none"
+
+
+def _has_audio(fmt: dict) -> bool:
+    return fmt.get("acodec") != "none"
+
+
+def _usable(fmt: dict) -> bool:
+    return (
+        fmt.get("format_note") != "storyboard"
+        and fmt.get("protocol") != "mhtml"
+        and not fmt.get("has_drm")
+        and (_has_video(fmt) or _has_audio(fmt))
+    )
+
+
+def estimate_bytes(fmt: dict, duration: float | None, seconds: float | None = None) -> int | None:
+    """Bytes of ``fmt`` for ``seconds`` of the source (all of it by default).
+
+    Uses the listed file size, scaled to ``seconds``, else the bitrate.
+    """
+    seconds = seconds if seconds is not None else duration
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size and duration and seconds is not None:
+        return int(size * min(1.0, seconds / duration))
+    if size:
+        return int(size)
+    if fmt.get("tbr") and seconds:
+        # tbr is in kbit/s
+        return int(fmt["tbr"] * 1000 / 8 * seconds)
+    return None
+
+
+def _choice(video: dict, audio: dict | None, duration, seconds) -> FormatChoice:
+    sizes = [estimate_bytes(f, duration, seconds) for f in (video, audio) if f is not None]
+    return FormatChoice(
+        format_id=(
+            f"{video['format_id']}+{audio['format_id']}" if audio else str(video["format_id"])
+        ),
+        progressive=audio is None and _has_audio(video),
+        width=video.get("width"),
+        height=video.get("height"),
+        fps=video.get("fps"),
+        ext=video.get("ext"),
+        estimated_bytes=None if None in sizes else sum(sizes),
+        audio_ext=audio.get("ext") if audio else None,
+    )
+
+
+def select_format(
+    info: dict,
+    mode: str = "full",
+    max_bytes: int | None = None,
+    seconds: float | None = None,
+) -> FormatChoice | None:
+    """Pick the smallest stream meeting the mode's minimums within ``max_bytes``.
+
+    ``seconds`` is how much of the source will be downloaded (all of it by
+    default). Progressive formats win over video+audio pairs; a source below
+    the minimums gets its sharpest stream under the cap, and when nothing
+    fits the budget the smallest adequate stream is returned for admission
+    to judge. Returns None when the probe lists no usable formats.
+    """
+    requirements = MODE_REQUIREMENTS.get(mode, MODE_REQUIREMENTS["full"])
+    duration = info.get("duration")
+    formats = [f for f in info.get("formats") or [] if f.get("format_id") and _usable(f)]
+
+    candidates = [
+        _choice(f, None, duration, seconds)
+        for f in formats
+        if _has_video(f) and (_has_audio(f) or not requirements.audio)
+    ]
+    audio_only = [f for f in formats if _has_audio(f) and not _has_video(f)]
+    if audio_only and requirements.audio:
+        # Speech survives the smallest audio stream, preferably M4A; unknown sizes rank last
+        audio = min(
+            audio_only,
+            key=lambda f: (
+                f.get("ext") not in ("m4a", "mp4"),
+                estimate_bytes(f, duration, seconds) or float("inf"),
+                f.get("abr") or 0,
+            ),
+        )
+        candidates += [
+            _choice(f, audio, duration, seconds)
+            for f in formats
+            if _has_video(f) and not _has_audio(f)
+        ]
+    if not candidates:
+        return None
+
+    adequate = [c for c in candidates if c.meets(requirements)]
+    if not adequate:
+        capped = [
+            c for c in candidates if (c.short_side or 0) <= requirements.max_short_side
+        ] or candidates
+        sharpest = max(c.short_side or 0 for c in capped)
+        adequate = [c for c in capped if (c.short_side or 0) == sharpest]
+
+    within = [
+        c
+        for c in adequate
+        if max_bytes is None or c.estimated_bytes is None or c.estimated_bytes <= max_bytes
+    ]
+    if not within:
+        return min(adequate, key=lambda c: (not c.mp4, c.estimated_bytes or 0))
+    return min(
+        within,
+        key=lambda c: (
+            not c.mp4,
+            not c.progressive,
+            c.estimated_bytes is None,
+            c.estimated_bytes or 0,
+        ),
+    )
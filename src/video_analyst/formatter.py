@@ -10,8 +10,8 @@ def format_json(plan: VideoReproductionPlan) -> str:
     return plan.model_dump_json(indent=2)
 
 
-def format_markdown(plan: VideoReproductionPlan, style: str = "realistic") -> str:
-    """Format plan as human-readable Markdown."""
+def format_markdown(plan: VideoReproductionPlan, style: str | None = "realistic") -> str:
+    """Format plan as human-readable Markdown; a None style is left out of the header."""
     lines: list[str] = []
 
     # Header
@@ -19,12 +19,14 @@ def format_markdown(plan: VideoReproductionPlan, style: str = "realistic") -> st
     lines.append("")
     lines.append(f"> {plan.description}")
     lines.append("")
-    lines.append(
+    header = (
         f"**Duration**: {plan.total_duration_seconds}s | "
         f"**Language**: {plan.target_language} | "
-        f"**Scenes**: {len(plan.scenes)} | "
-        f"**Style**: {style}"
+        f"**Scenes**: {len(plan.scenes)}"
     )
+    if style is not None:
+        header += f" | **Style**: {style}"
+    lines.append(header)
     lines.append("")
 
     # Viral structure
@@ -49,12 +51,8 @@ def format_markdown(plan: VideoReproductionPlan, style: str = "realistic") -> st
     lines.append("## Scenes")
     lines.append("")
     for scene in plan.scenes:
-        method_label = (
-            "T2I → I2V" if scene.generation_method == "t2i_i2v" else "T2V"
-        )
-        lines.append(
-            f"### Scene {scene.scene_number} — {scene.duration_seconds}s [{method_label}]"
-        )
+        method_label = "T2I → I2V" if scene.generation_method == "t2i_i2v" else "T2V"
+        lines.append(f"### Scene {scene.scene_number} — {scene.duration_seconds}s [{method_label}]")
         lines.append(f"*{scene.scene_description}*")
         lines.append("")
 
@@ -76,9 +74,7 @@ def format_markdown(plan: VideoReproductionPlan, style: str = "realistic") -> st
             lines.append("")
 
         # Voiceover
-        lines.append(
-            f"**Voiceover** ({scene.voiceover_duration_estimate_seconds}s):"
-        )
+        lines.append(f"**Voiceover** ({scene.voiceover_duration_estimate_seconds}s):")
         lines.append(f"> {scene.voiceover_text}")
         lines.append("")
         lines.append("---")
@@ -100,7 +96,7 @@ def format_markdown(plan: VideoReproductionPlan, style: str = "realistic") -> st
     return "\n".join(lines)
 
 
-def format_output(plan: VideoReproductionPlan, fmt: str, style: str = "realistic") -> str:
+def format_output(plan: VideoReproductionPlan, fmt: str, style: str | None = "realistic") -> str:
     """Format the plan in the requested format."""
     if fmt == "markdown":
         return format_markdown(plan, style=style)
@@ -0,0 +1,173 @@
+"""Local highlight preselection for highlights mode.
+
+Audio loudness and frame motion are scored per second on a decoded low-res
+stream, and the best-scoring windows covering the target fraction of the
+video are cut into a smaller file. Only that file is uploaded; the windows'
+source timestamps go to the prompt as analyzed ranges.
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import media
+from .media import np
+
+# Share of the source kept; highlights plans cover 50-70% of it
+DEFAULT_TARGET_FRACTION = 0.6
+# Highlights are picked as whole windows of this length
+WINDOW_SECONDS = 6
+_AUDIO_SAMPLE_RATE = 8000
+_MOTION_FPS = 2.0
+_MOTION_SIZE = (64, 36)
+# Relative weight of motion against loudness when both are available
+_MOTION_WEIGHT = 0.5
+
+
+@dataclass
+class HighlightSelection:
+    clip_path: Path
+    # Selected (start, end) ranges in source time, in playback order
+    ranges: list[tuple[float, float]]
+    # Seconds of the input covered by the clip, and of the whole input
+    seconds: float
+    duration: float
+
+
+def audio_energy(samples: np.ndarray, seconds: int, rate: int = _AUDIO_SAMPLE_RATE) -> np.ndarray:
+    """Loudness of each second in dBFS, from mono 16-bit ``samples``."""
+    media.require_numpy()
+    energy = np.full(seconds, -100.0)
+    whole = min(seconds, len(samples) // rate)
+    if whole:
+        x = samples[: whole * rate].reshape(whole, rate).astype(np.float32) / 32768.0
+        energy[:whole] = 20 * np.log10(np.sqrt((x * x).mean(axis=1)) + 1e-5)
+    return energy
+
+
+def motion_energy(frames: np.ndarray, seconds: int, fps: float = _MOTION_FPS) -> np.ndarray:
+    """Mean absolute pixel change per second, from grayscale frames sampled at ``fps``."""
+    media.require_numpy()
+    if len(frames) < 2:
+        return np.zeros(seconds)
+    diffs = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2))
+    # Difference i ends at frame i + 1
+    second = np.minimum((np.arange(1, len(frames)) / fps).astype(np.int64), seconds - 1)
+    totals = np.bincount(second, weights=diffs, minlength=seconds)
+    counts = np.bincount(second, minlength=seconds)
+    return np.divide(totals, counts, out=np.zeros(seconds), where=counts > 0)
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """Scale to [0, 1] between the 5th and 95th percentiles, ignoring outliers."""
+    low, high = np.percentile(values, [5, 95])
+    if high - low < 1e-9:
+        return np.zeros_like(values, dtype=np.float64)
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def combine_scores(audio: np.ndarray | None, motion: np.ndarray) -> np.ndarray:
+    if audio is None:
+        return _normalize(motion)
+    return (1 - _MOTION_WEIGHT) * _normalize(audio) + _MOTION_WEIGHT * _normalize(motion)
+
+
+def select_windows(
+    scores: np.ndarray, target_seconds: float, window: int = WINDOW_SECONDS
+) -> list[tuple[float, float]]:
+    """Best non-overlapping windows totalling ``target_seconds``, merged and in order.
+
+    The opening window is always kept so the hook survives.
+    """
+    media.require_numpy()
+    n = len(scores)
+    window = max(1, min(window, n))
+    sums = np.concatenate([[0.0], np.cumsum(scores)])
+    # Mean score of the window starting at each second
+    means = (sums[window:] - sums[:-window]) / window
+    count = max(1, min(math.ceil(target_seconds / window), n // window))
+
+    starts = [0]
+    means[:window] = -np.inf
+    while len(starts) < count and np.isfinite(means).any():
+        best = int(np.argmax(means))
+        starts.append(best)
+        means[max(0, best - window + 1) : best + window] = -np.inf
+
+    ranges: list[tuple[float, float]] = []
+    for start in sorted(starts):
+        end = min(start + window, n)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], float(end))
+        else:
+            ranges.append((float(start), float(end)))
+    return ranges
+
+
+def to_source_time(
+    ranges: list[tuple[float, float]], source_ranges: list[tuple[float, float]] | None
+) -> list[tuple[float, float]]:
+    """Map ranges of a file made of ``source_ranges`` excerpts back to source time.
+
+    A range spanning the join between two excerpts is split in two.
+    """
+    if not source_ranges:
+        return ranges
+    mapped = []
+    for start, end in ranges:
+        offset = 0.0
+        for a, b in source_ranges:
+            length = b - a
+            lo, hi = max(start, offset), min(end, offset + length)
+            if hi > lo:
+                mapped.append((round(a + lo - offset, 1), round(a + hi - offset, 1)))
+            offset += length
+    return mapped
+
+
+def preselect_highlights(
+    video_path: Path,
+    target_fraction: float = DEFAULT_TARGET_FRACTION,
+    source_ranges: list[tuple[float, float]] | None = None,
+    verbose: bool = False,
+) -> HighlightSelection | None:
+    """Cut the loudest, most active windows of ``video_path`` into a smaller MP4.
+
+    ``source_ranges`` are the source excerpts ``video_path`` already holds
+    (DownloadResult.ranges). Returns None when the video is too short for a
+    selection to save anything.
+    """
+    media.require_numpy()
+    duration = media.probe_duration(video_path)
+    seconds = int(duration)
+    target = duration * target_fraction
+    if seconds < 2 * WINDOW_SECONDS or duration - target < WINDOW_SECONDS:
+        return None
+
+    with_audio = media.has_audio(video_path)
+    audio = None
+    if with_audio:
+        samples = media.decode_audio_pcm(video_path, _AUDIO_SAMPLE_RATE)
+        audio = audio_energy(samples, seconds)
+    frames = media.decode_gray_frames(video_path, _MOTION_FPS, *_MOTION_SIZE)
+    scores = combine_scores(audio, motion_energy(frames, seconds))
+
+    ranges = select_windows(scores, target)
+    clip_path = video_path.with_name(f"{video_path.stem}.highlights.mp4")
+    media.cut_ranges(video_path, ranges, clip_path, audio=with_audio)
+    kept = sum(b - a for a, b in ranges)
+    if verbose:
+        spans = ", ".join(f"{a:.0f}-{b:.0f}s" for a, b in ranges)
+        print(
+            f"  Preselected {kept:.0f}s of {duration:.0f}s for upload: {spans}",
+            file=sys.stderr,
+        )
+    return HighlightSelection(
+        clip_path=clip_path,
+        ranges=to_source_time(ranges, source_ranges),
+        seconds=kept,
+        duration=duration,
+    )
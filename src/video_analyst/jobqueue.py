@@ -0,0 +1,228 @@
+"""Durable SQLite work queue with leases, heartbeats and dead-lettering.
+
+Any number of worker processes, on one or many hosts, can share a queue
+file. A leased job is invisible to other workers until its lease expires;
+workers extend the lease with heartbeats while they run. Jobs whose worker
+crashed reappear after the visibility timeout, and jobs that keep failing
+move to the ``dead`` state instead of looping forever.
+
+The database uses the rollback journal rather than WAL because WAL needs
+shared memory, which network filesystems do not provide.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    lease_owner: str | None
+    lease_expires_at: float | None
+    last_error: str | None
+    result: dict | None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> Job:
+        return cls(
+            id=row["id"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            lease_owner=row["lease_owner"],
+            lease_expires_at=row["lease_expires_at"],
+            last_error=row["last_error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+        )
+
+
+class JobQueue:
+    def __init__(
+        self,
+        path: Path,
+        visibility_timeout: float = 600.0,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> _Transaction:
+        # One short-lived connection per operation: safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Transaction(conn)
+
+    def enqueue(self, payload: dict, max_attempts: int | None = None) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (payload, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (json.dumps(payload), max_attempts or self.max_attempts, now, now, now),
+            )
+            return cur.lastrowid
+
+    def lease(self, worker_id: str) -> Job | None:
+        """Claim the oldest ready job, including jobs whose lease has expired."""
+        now = time.time()
+        with self._connect() as conn:
+            # Expired leases that already used every attempt crashed their workers
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, updated_at = ?,"
+                " last_error = COALESCE(last_error, 'lease expired')"
+                " WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE (status = 'queued' AND available_at <= ?)"
+                " OR (status = 'leased' AND lease_expires_at < ?)"
+                " ORDER BY available_at, id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires_at = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.visibility_timeout, now, row["id"]),
+            )
+            return Job.from_row(
+                conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            )
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease. False means the lease was lost to another worker."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.visibility_timeout, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: dict | None = None) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result) if result is not None else None, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> str | None:
+        """Record a failure and requeue with backoff, or dead-letter it.
+
+        Returns the new status ('queued' or 'dead'), or None if the lease was
+        already lost. ``retry=False`` dead-letters immediately.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return None
+            exhausted = row["attempts"] >= row["max_attempts"]
+            status = "dead" if exhausted or not retry else "queued"
+            backoff = self.retry_delay * 2 ** (row["attempts"] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL,"
+                " lease_expires_at = NULL, available_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, now + backoff, now, job_id),
+            )
+            return status
+
+    def release(self, job_id: int, worker_id: str) -> None:
+        """Give a job back without counting the attempt (e.g. on shutdown)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1,"
+                " lease_owner = NULL, lease_expires_at = NULL, available_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now, now, job_id, worker_id),
+            )
+
+    def requeue_dead(self) -> int:
+        """Move every dead-lettered job back to the queue with fresh attempts."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?,"
+                " updated_at = ? WHERE status = 'dead'",
+                (now, now),
+            )
+            return cur.rowcount
+
+    def stats(self) -> dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            return {row["status"]: row["n"] for row in rows}
+
+    def jobs(self, status: str) -> list[Job]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,))
+            return [Job.from_row(row) for row in rows]
+
+
+class _Transaction:
+    """Context manager running the block in BEGIN IMMEDIATE and closing the connection.
+
+    IMMEDIATE takes the write lock up front so two workers can never lease
+    the same job.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
@@ -0,0 +1,114 @@
+"""Reduced-modality input: representative keyframes plus a compressed audio track."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import pairwise
+from pathlib import Path
+
+from . import media
+from .media import np
+
+# Frames are scored on a coarse grid: cheap to decode, enough to see cuts.
+_SAMPLE_FPS = 1.0
+_SAMPLE_SIZE = (64, 36)
+_HISTOGRAM_BINS = 32
+
+
+@dataclass
+class Keyframe:
+    timestamp: float
+    jpeg: bytes
+
+
+@dataclass
+class KeyframeInput:
+    frames: list[Keyframe]
+    audio_path: Path | None
+    duration: float
+
+
+def histogram_differences(frames: np.ndarray, bins: int = _HISTOGRAM_BINS) -> np.ndarray:
+    """Total-variation distance between luminance histograms of consecutive frames.
+
+    ``frames`` is a uint8 array of shape (N, H, W). Returns N-1 scores in [0, 1];
+    score ``i`` compares frame ``i`` with frame ``i + 1``.
+    """
+    media.require_numpy()
+    n = len(frames)
+    if n < 2:
+        return np.zeros(0)
+    # One bincount over all frames: offset each frame's bins into its own block
+    binned = frames.reshape(n, -1).astype(np.int64) * bins // 256
+    offsets = (np.arange(n) * bins)[:, None]
+    hist = np.bincount((binned + offsets).ravel(), minlength=n * bins).reshape(n, bins)
+    hist = hist / hist.sum(axis=1, keepdims=True)
+    return 0.5 * np.abs(np.diff(hist, axis=0)).sum(axis=1)
+
+
+def select_keyframes(
+    frames: np.ndarray,
+    threshold: float = 0.3,
+    max_gap: int = 10,
+    max_frames: int = 60,
+) -> np.ndarray:
+    """Pick indices of representative frames.
+
+    Takes the first frame, every frame following a histogram jump above
+    ``threshold`` (a cut), and fills gaps so no stretch longer than
+    ``max_gap`` frames goes unsampled. If that exceeds ``max_frames``, the
+    strongest changes are kept.
+    """
+    media.require_numpy()
+    n = len(frames)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    scores = np.concatenate([[np.inf], histogram_differences(frames)])
+    selected = np.union1d([0], np.flatnonzero(scores > threshold))
+
+    # Fill long static stretches with evenly spaced frames
+    bounds = np.append(selected, n)
+    fillers = [
+        np.linspace(start, end, num=(end - start) // max_gap + 1, endpoint=False)[1:]
+        for start, end in pairwise(bounds)
+        if end - start > max_gap
+    ]
+    if fillers:
+        selected = np.union1d(selected, np.concatenate(fillers).astype(np.int64))
+
+    if len(selected) > max_frames:
+        keep = np.argsort(scores[selected])[::-1][:max_frames]
+        selected = np.sort(selected[keep])
+    return selected
+
+
+def prepare_keyframe_input(
+    video_path: Path,
+    max_frames: int = 60,
+    audio_bitrate_kbps: int = 16,
+    frame_height: int = 360,
+    include_audio: bool = True,
+) -> KeyframeInput:
+    """Decode the video locally and build keyframes plus a low-bitrate audio file."""
+    media.require_numpy()
+    duration = media.probe_duration(video_path)
+    width, height = _SAMPLE_SIZE
+    frames = media.decode_gray_frames(video_path, fps=_SAMPLE_FPS, width=width, height=height)
+    indices = select_keyframes(frames, max_frames=max_frames)
+
+    keyframes = [
+        Keyframe(
+            timestamp=float(i / _SAMPLE_FPS),
+            jpeg=media.extract_frame_jpeg(video_path, i / _SAMPLE_FPS, height=frame_height),
+        )
+        for i in indices
+    ]
+
+    audio_path = None
+    if include_audio and media.has_audio(video_path):
+        audio_path = media.extract_audio(
+            video_path, video_path.with_suffix(".keyframes.ogg"), bitrate_kbps=audio_bitrate_kbps
+        )
+
+    return KeyframeInput(frames=keyframes, audio_path=audio_path, duration=duration)
@@ -0,0 +1,214 @@
+"""A pool of Gemini API keys for spreading jobs across projects' quotas.
+
+Each key has its own client, in-flight count and error counters. A job runs
+entirely on one key, because uploaded files and context caches belong to the
+key that created them. Keys answering with quota (429) or auth (401/403)
+errors sit out a cooldown, and the job is retried on another key.
+
+State is per process: worker processes each keep their own pool.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Literal, TypeVar
+
+from google import genai
+
+from .config import Config
+
+T = TypeVar("T")
+
+# First cooldown after a quota error; doubles while the key keeps failing
+QUOTA_COOLDOWN_SECONDS = 60.0
+MAX_QUOTA_COOLDOWN_SECONDS = 900.0
+# A rejected key is usually revoked or misconfigured; check it again much later
+AUTH_COOLDOWN_SECONDS = 3600.0
+
+KeyErrorKind = Literal["quota", "auth"]
+
+
+class NoKeyAvailable(RuntimeError):
+    """Every key is cooling down for longer than the caller is willing to wait."""
+
+
+def key_id(api_key: str) -> str:
+    """A short, non-secret label for a key, for logs and saved state."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+def key_error_kind(error: BaseException) -> KeyErrorKind | None:
+    """Classify an API or upload error as a problem with the key, if it is one."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return "quota"
+    if code in (401, 403):
+        return "auth"
+    return None
+
+
+@dataclass
+class PooledKey:
+    api_key: str = field(repr=False)
+    client: genai.Client = field(repr=False)
+    in_flight: int = 0
+    jobs: int = 0
+    quota_errors: int = 0
+    auth_errors: int = 0
+    other_errors: int = 0
+    # Quota errors since the last success, for the cooldown backoff
+    consecutive_quota_errors: int = 0
+    # time.time() before which the key is out of rotation
+    cooldown_until: float = 0.0
+
+    @property
+    def id(self) -> str:
+        return key_id(self.api_key)
+
+
+class KeyPool:
+    """Hands out keys, least busy first.
+
+    ``start`` rotates the order equally idle keys are picked in, so separate
+    worker processes begin on different keys.
+    """
+
+    def __init__(
+        self, api_keys: Sequence[str], start: int = 0, max_wait_seconds: float = 300.0
+    ) -> None:
+        unique = list(dict.fromkeys(k for k in api_keys if k))
+        if not unique:
+            raise RuntimeError("No Gemini API key configured")
+        shift = start % len(unique)
+        unique = unique[shift:] + unique[:shift]
+        self.keys = [PooledKey(api_key=k, client=genai.Client(api_key=k)) for k in unique]
+        self.max_wait_seconds = max_wait_seconds
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config: Config, start: int = 0) -> KeyPool:
+        return cls(config.api_keys, start=start)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, id: str) -> PooledKey:
+        """The key with label ``id`` (see key_id)."""
+        for key in self.keys:
+            if key.id == id:
+                return key
+        raise RuntimeError(f"API key {id} is not configured")
+
+    def acquire(self, exclude: Sequence[str] = ()) -> PooledKey:
+        """Take the least busy key that is not cooling down.
+
+        Waits for the first cooldown to end when every key is cooling down,
+        up to ``max_wait_seconds``.
+        """
+        deadline = time.monotonic() + self.max_wait_seconds
+        announced = False
+        with self._cond:
+            while True:
+                candidates = [k for k in self.keys if k.id not in exclude]
+                if not candidates:
+                    raise NoKeyAvailable("Every API key has already failed this job")
+                now = time.time()
+                ready = [k for k in candidates if k.cooldown_until <= now]
+                if ready:
+                    # min() keeps the first of equals, which honours the rotation
+                    key = min(ready, key=lambda k: (k.in_flight, k.jobs))
+                    key.in_flight += 1
+                    key.jobs += 1
+                    return key
+                wait = min(k.cooldown_until for k in candidates) - now
+                if wait > deadline - time.monotonic():
+                    raise NoKeyAvailable(
+                        f"All {len(candidates)} API keys are cooling down "
+                        f"(next one is back in {wait:.0f}s)"
+                    )
+                if not announced:
+                    print(
+                        f"  All API keys are cooling down, waiting {wait:.0f}s...",
+                        file=sys.stderr,
+                    )
+                    announced = True
+                self._cond.wait(wait)
+
+    def release(self, key: PooledKey, error: BaseException | None = None) -> KeyErrorKind | None:
+        """Return a key, recording the job's outcome. Returns the key error kind."""
+        kind = key_error_kind(error) if error is not None else None
+        with self._cond:
+            key.in_flight -= 1
+            if error is None:
+                key.consecutive_quota_errors = 0
+            elif kind == "quota":
+                key.quota_errors += 1
+                key.consecutive_quota_errors += 1
+                cooldown = min(
+                    QUOTA_COOLDOWN_SECONDS * 2 ** (key.consecutive_quota_errors - 1),
+                    MAX_QUOTA_COOLDOWN_SECONDS,
+                )
+                key.cooldown_until = time.time() + cooldown
+            elif kind == "auth":
+                key.auth_errors += 1
+                cooldown = AUTH_COOLDOWN_SECONDS
+                key.cooldown_until = time.time() + cooldown
+            else:
+                key.other_errors += 1
+            self._cond.notify_all()
+        if kind is not None:
+            print(
+                f"  API key {key.id}: {kind} error, out of rotation for {cooldown:.0f}s",
+                file=sys.stderr,
+            )
+        return kind
+
+    def run(self, fn: Callable[[PooledKey], T]) -> T:
+        """Run a job on one key; quota and auth errors retry it on another key.
+
+        The last key error is raised when no other key can take the job.
+        """
+        tried: list[str] = []
+        last_error: Exception | None = None
+        while True:
+            try:
+                key = self.acquire(exclude=tried)
+            except NoKeyAvailable:
+                if last_error is not None:
+                    raise last_error
+                raise
+            try:
+                result = fn(key)
+            except Exception as e:
+                kind = self.release(key, e)
+                tried.append(key.id)
+                last_error = e
+                if kind is None or len(tried) == len(self.keys):
+                    raise
+                print(f"  Retrying on another API key ({kind} error)", file=sys.stderr)
+                continue
+            except BaseException:
+                self.release(key)
+                raise
+            self.release(key)
+            return result
+
+    def summary(self) -> str:
+        """One line per key: jobs and error counts."""
+        now = time.time()
+        lines = []
+        with self._cond:
+            for k in self.keys:
+                line = (
+                    f"  {k.id}: {k.jobs} jobs, {k.quota_errors} quota / "
+                    f"{k.auth_errors} auth / {k.other_errors} other errors"
+                )
+                if k.cooldown_until > now:
+                    line += f", cooling down {k.cooldown_until - now:.0f}s"
+                lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,242 @@
+"""Persistent token and cost ledger with budget ceilings.
+
+Every generate_content attempt is written as one row, so failed and retried
+attempts are accounted for too. Days and months are UTC.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .config import Config
+
+if TYPE_CHECKING:
+    from .analyzer import TokenUsage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    month TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT,
+    model TEXT NOT NULL,
+    mode TEXT,
+    style TEXT,
+    language TEXT,
+    input_mode TEXT,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    thinking_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    latency_seconds REAL,
+    video_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS usage_day ON usage (day);
+CREATE INDEX IF NOT EXISTS usage_month ON usage (month);
+"""
+
+GROUP_BY_COLUMNS = ("day", "month", "model", "mode", "style", "language", "input_mode", "kind")
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised before a request when a daily or monthly ceiling is already spent."""
+
+
+@dataclass
+class UsageRow:
+    key: str
+    runs: int
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    thinking_tokens: int
+    cached_tokens: int
+    cost_usd: float
+    video_seconds: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens + self.thinking_tokens
+
+    @property
+    def tokens_per_video_second(self) -> float | None:
+        if not self.video_seconds:
+            return None
+        return self.total_tokens / self.video_seconds
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+def _month(ts: float) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+
+class UsageLedger:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=60)) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(
+        self,
+        token_usage: TokenUsage,
+        kind: str,
+        model: str,
+        url: str | None = None,
+        mode: str | None = None,
+        style: str | None = None,
+        language: str | None = None,
+        input_mode: str | None = None,
+        video_seconds: float | None = None,
+        price_factor: float = 1.0,
+        run_id: str | None = None,
+    ) -> str:
+        """Write one row per attempt, plus one for context cache storage.
+
+        Returns the run id shared by the rows.
+        """
+        run_id = run_id or uuid.uuid4().hex
+        now = time.time()
+        shared = {
+            "ts": now,
+            "day": _day(now),
+            "month": _month(now),
+            "run_id": run_id,
+            "url": url,
+            "mode": mode,
+            "style": style,
+            "language": language,
+            "input_mode": input_mode,
+            "video_seconds": video_seconds,
+        }
+        rows = [
+            {
+                **shared,
+                "kind": kind,
+                "model": call.model or model,
+                "prompt_tokens": call.prompt_tokens,
+                "completion_tokens": call.completion_tokens,
+                "thinking_tokens": call.thinking_tokens,
+                "cached_tokens": call.cached_tokens,
+                "cost_usd": call.cost_usd() * price_factor,
+                "latency_seconds": call.latency_seconds,
+            }
+            for call in token_usage.calls
+        ]
+        if token_usage.cache_storage_token_hours:
+            rows.append(
+                {
+                    **shared,
+                    "kind": "cache_storage",
+                    "model": model,
+                    "cost_usd": token_usage.storage_cost_usd(model),
+                }
+            )
+        if not rows:
+            return run_id
+        with closing(self._connect()) as conn, conn:
+            for row in rows:
+                columns = ", ".join(row)
+                placeholders = ", ".join(f":{name}" for name in row)
+                conn.execute(f"INSERT INTO usage ({columns}) VALUES ({placeholders})", row)
+        return run_id
+
+    def spent(self, day: str | None = None, month: str | None = None) -> float:
+        """Total cost for a UTC day (``YYYY-MM-DD``) or month (``YYYY-MM``)."""
+        column, value = ("day", day) if day else ("month", month)
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT COALESCE(SUM(cost_usd), 0) AS cost FROM usage WHERE {column} = ?",
+                (value,),
+            ).fetchone()
+            return row["cost"]
+
+    def report(self, group_by: str = "day", since: str | None = None) -> list[UsageRow]:
+        """Aggregate usage by one of ``GROUP_BY_COLUMNS``, optionally from a UTC day on.
+
+        Video seconds are counted once per run, not once per attempt.
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"Cannot group by {group_by!r}; use one of {GROUP_BY_COLUMNS}")
+        where, params = ("WHERE day >= ?", (since,)) if since else ("", ())
+        query = f"""
+            WITH filtered AS (SELECT * FROM usage {where}),
+            videos AS (
+                SELECT key, SUM(seconds) AS seconds FROM (
+                    SELECT {group_by} AS key, run_id, MAX(video_seconds) AS seconds
+                    FROM filtered GROUP BY {group_by}, run_id
+                ) GROUP BY key
+            )
+            SELECT f.{group_by} AS key,
+                   COUNT(DISTINCT f.run_id) AS runs,
+                   SUM(f.kind != 'cache_storage') AS calls,
+                   SUM(f.prompt_tokens) AS prompt_tokens,
+                   SUM(f.completion_tokens) AS completion_tokens,
+                   SUM(f.thinking_tokens) AS thinking_tokens,
+                   SUM(f.cached_tokens) AS cached_tokens,
+                   SUM(f.cost_usd) AS cost_usd,
+                   COALESCE(v.seconds, 0) AS video_seconds
+            FROM filtered f LEFT JOIN videos v ON v.key IS f.{group_by}
+            GROUP BY f.{group_by} ORDER BY f.{group_by}
+        """
+        with closing(self._connect()) as conn:
+            return [
+                UsageRow(**{**dict(row), "key": row["key"] or "-"})
+                for row in conn.execute(query, params)
+            ]
+
+    def spent_today(self) -> float:
+        return self.spent(day=_day(time.time()))
+
+    def spent_this_month(self) -> float:
+        return self.spent(month=_month(time.time()))
+
+    def check_budget(self, daily_usd: float | None, monthly_usd: float | None) -> None:
+        """Raise ``BudgetExceeded`` if today's or this month's spend reached its ceiling."""
+        if daily_usd is not None:
+            spent = self.spent_today()
+            if spent >= daily_usd:
+                raise BudgetExceeded(
+                    f"Daily budget exhausted: ${spent:.4f} of ${daily_usd:.2f} spent today (UTC)"
+                )
+        if monthly_usd is not None:
+            spent = self.spent_this_month()
+            if spent >= monthly_usd:
+                raise BudgetExceeded(
+                    f"Monthly budget exhausted: ${spent:.4f} of ${monthly_usd:.2f} "
+                    "spent this month (UTC)"
+                )
+
+
+def open_ledger(config: Config) -> UsageLedger | None:
+    """The configured ledger, or None when ledgering is disabled."""
+    if not config.ledger:
+        return None
+    return UsageLedger(config.data_dir / "ledger.db")
+
+
+def check_budget(config: Config) -> None:
+    """Raise ``BudgetExceeded`` if a configured ceiling is already reached."""
+    if config.daily_budget_usd is None and config.monthly_budget_usd is None:
+        return
+    ledger = open_ledger(config)
+    if ledger is not None:
+        ledger.check_budget(config.daily_budget_usd, config.monthly_budget_usd)
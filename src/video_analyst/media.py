@@ -0,0 +1,237 @@
+"""Local media decoding helpers built on the ffmpeg/ffprobe CLIs."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency (video-analyst[media])
+    np = None
+
+
+def require_numpy() -> None:
+    """Fail with an install hint when the optional numpy dependency is missing."""
+    if np is None:
+        raise RuntimeError(
+            "This feature requires numpy. Install it with: pip install 'video-analyst[media]'"
+        )
+
+
+def _run(cmd: list[str]) -> bytes:
+    try:
+        proc = subprocess.run(cmd, check=True, capture_output=True)
+    except FileNotFoundError as e:
+        raise RuntimeError(f"{cmd[0]} not found in PATH") from e
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode(errors="replace").strip().splitlines()
+        raise RuntimeError(f"{cmd[0]} failed: {stderr[-1] if stderr else e}") from e
+    return proc.stdout
+
+
+def probe_duration(path: Path) -> float:
+    """Return the container duration in seconds."""
+    out = _run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "json",
+            str(path),
+        ]
+    )
+    return float(json.loads(out)["format"]["duration"])
+
+
+def has_audio(path: Path) -> bool:
+    out = _run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "a",
+            "-show_entries",
+            "stream=index",
+            "-of",
+            "json",
+            str(path),
+        ]
+    )
+    return bool(json.loads(out).get("streams"))
+
+
+def decode_gray_frames(
+    path: Path, fps: float = 1.0, width: int = 64, height: int = 36
+) -> np.ndarray:
+    """Decode the video as downsampled grayscale frames.
+
+    Returns a uint8 array of shape (frames, height, width); frame ``i`` is at
+    ``i / fps`` seconds.
+    """
+    require_numpy()
+    raw = _run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-i",
+            str(path),
+            "-an",
+            "-vf",
+            f"fps={fps},scale={width}:{height},format=gray",
+            "-f",
+            "rawvideo",
+            "pipe:1",
+        ]
+    )
+    frame_size = width * height
+    count = len(raw) // frame_size
+    return np.frombuffer(raw[: count * frame_size], dtype=np.uint8).reshape(count, height, width)
+
+
+def extract_frame_jpeg(path: Path, timestamp: float, height: int = 360) -> bytes:
+    """Extract a single frame at ``timestamp`` seconds as JPEG bytes."""
+    return _run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-ss",
+            f"{timestamp:.3f}",
+            "-i",
+            str(path),
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale=-2:{height}",
+            "-q:v",
+            "5",
+            "-f",
+            "image2pipe",
+            "-vcodec",
+            "mjpeg",
+            "pipe:1",
+        ]
+    )
+
+
+def extract_audio(path: Path, output_path: Path, bitrate_kbps: int = 16) -> Path:
+    """Extract the audio track as low-bitrate mono Opus (speech-grade)."""
+    _run(
+        [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-i",
+            str(path),
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            "16000",
+            "-c:a",
+            "libopus",
+            "-b:a",
+            f"{bitrate_kbps}k",
+            str(output_path),
+        ]
+    )
+    return output_path
+
+
+def untile(sheet_path: Path, columns: int, rows: int, output_dir: Path) -> list[Path]:
+    """Split a sprite sheet into its ``columns`` x ``rows`` tiles, row by row.
+
+    Tiles are written as JPEGs to ``output_dir`` and returned in order.
+    """
+    pattern = output_dir / f"{sheet_path.stem}-tile-%03d.jpg"
+    _run(
+        [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-i",
+            str(sheet_path),
+            "-vf",
+            f"untile={columns}x{rows}",
+            "-fps_mode",
+            "passthrough",
+            "-q:v",
+            "3",
+            str(pattern),
+        ]
+    )
+    return sorted(output_dir.glob(f"{sheet_path.stem}-tile-*.jpg"))
+
+
+def decode_audio_pcm(path: Path, sample_rate: int = 8000) -> np.ndarray:
+    """Decode the audio track as mono signed 16-bit samples at ``sample_rate``."""
+    require_numpy()
+    raw = _run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-i",
+            str(path),
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "-f",
+            "s16le",
+            "pipe:1",
+        ]
+    )
+    return np.frombuffer(raw[: len(raw) // 2 * 2], dtype="<i2")
+
+
+def cut_ranges(
+    path: Path, ranges: list[tuple[float, float]], output_path: Path, audio: bool = True
+) -> Path:
+    """Re-encode the given (start, end) ranges of ``path``, joined in order, as MP4.
+
+    Cuts are frame-accurate (trim filters rather than stream copy), so the
+    ranges can be mapped back to source timestamps exactly.
+    """
+    chains, inputs = [], []
+    for i, (start, end) in enumerate(ranges):
+        chains.append(f"[0:v]trim={start:.3f}:{end:.3f},setpts=PTS-STARTPTS[v{i}]")
+        inputs.append(f"[v{i}]")
+        if audio:
+            chains.append(f"[0:a]atrim={start:.3f}:{end:.3f},asetpts=PTS-STARTPTS[a{i}]")
+            inputs.append(f"[a{i}]")
+    chains.append(
+        f"{''.join(inputs)}concat=n={len(ranges)}:v=1:a={int(audio)}[v]" + ("[a]" if audio else "")
+    )
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        str(path),
+        "-filter_complex",
+        ";".join(chains),
+        "-map",
+        "[v]",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "26",
+    ]
+    if audio:
+        cmd += ["-map", "[a]", "-c:a", "aac", "-b:a", "64k"]
+    _run([*cmd, "-movflags", "+faststart", str(output_path)])
+    return output_path
@@ -51,15 +51,17 @@ class Scene(BaseModel):
         )
     )
     voiceover_duration_estimate_seconds: float = Field(
-        description="Estimated voiceover duration based on word count and language"
+        default=0.0,
+        description="Estimated voiceover duration based on word count and language",
     )
     title_card_text: str = Field(
+        default="",
         description=(
             "Short title card text (a few words or one short sentence max) if the original "
             "scene features a prominent title or heading. Use normal case, not ALL CAPS. "
             "Empty string if no significant text is shown or if the text is longer than "
             "a short phrase. Skip long sentences, paragraphs, watermarks, lower-thirds, or captions."
-        )
+        ),
     )
     scene_description: str = Field(
         description="Brief human-readable description of what happens in this scene"
@@ -71,7 +73,10 @@ class CharacterProfile(BaseModel):
         description="Consistent identifier for this character across all scenes"
     )
     character_description: str = Field(
-        description="Detailed visual description. Must be identical in every scene prompt."
+        description=(
+            "Detailed visual description. Scene prompts refer to it as {{char:Name}}, "
+            "which is replaced with this text, instead of repeating it."
+        )
     )
     t2i_reference_prompt: str = Field(
         description=(
@@ -86,12 +91,11 @@ class CharacterProfile(BaseModel):
 class VideoReproductionPlan(BaseModel):
     title: str = Field(description="Engaging title for the video")
     description: str = Field(description="Brief description of the video concept and hook")
-    metadata_tags: list[str] = Field(
-        description="Hashtags and metadata tags for discoverability"
-    )
+    metadata_tags: list[str] = Field(description="Hashtags and metadata tags for discoverability")
     target_language: str = Field(description="Language code for voiceover (e.g. 'en', 'vi')")
     total_duration_seconds: int = Field(
-        description="Total estimated duration of the reproduced video"
+        default=0,
+        description="Total estimated duration of the reproduced video",
     )
     viral_structure_notes: str = Field(
         description=(
@@ -111,6 +115,52 @@ class VideoReproductionPlan(BaseModel):
     )
 
 
+class SceneOutline(BaseModel):
+    """Phase-1 entry of two-phase generation: a scene before its prompts are written."""
+
+    scene_number: int = Scene.model_fields["scene_number"]
+    start_seconds: float = Field(
+        description="Where the scene's source material starts in the attached video"
+    )
+    end_seconds: float = Field(
+        description="Where the scene's source material ends in the attached video"
+    )
+    duration_seconds: int = Scene.model_fields["duration_seconds"]
+    generation_method: Literal["t2i_i2v", "t2v"] = Scene.model_fields["generation_method"]
+    scene_description: str = Field(
+        description=(
+            "What happens in the scene: action, subjects, setting, camera and what is said. "
+            "Detailed enough to write the scene's prompts and voiceover from."
+        )
+    )
+    characters: list[str] = Field(
+        description="character_name of every character on screen. Empty list if none."
+    )
+    title_card_text: str = Scene.model_fields["title_card_text"]
+
+
+class PlanOutline(BaseModel):
+    """Phase-1 result of two-phase generation: every plan field except per-scene prompts."""
+
+    title: str = VideoReproductionPlan.model_fields["title"]
+    description: str = VideoReproductionPlan.model_fields["description"]
+    metadata_tags: list[str] = VideoReproductionPlan.model_fields["metadata_tags"]
+    target_language: str = VideoReproductionPlan.model_fields["target_language"]
+    viral_structure_notes: str = VideoReproductionPlan.model_fields["viral_structure_notes"]
+    characters: list[CharacterProfile] = VideoReproductionPlan.model_fields["characters"]
+    scenes: list[SceneOutline] = Field(description="Ordered outline of the scenes")
+    cover_t2i_prompt: str = VideoReproductionPlan.model_fields["cover_t2i_prompt"]
+
+
+class SceneExpansion(BaseModel):
+    """Phase-2 result of two-phase generation: the written prompts of one scene."""
+
+    video_prompt: str = Scene.model_fields["video_prompt"]
+    video_extend_prompt: str = Scene.model_fields["video_extend_prompt"]
+    t2i_prompt: str = Scene.model_fields["t2i_prompt"]
+    voiceover_text: str = Scene.model_fields["voiceover_text"]
+
+
 def resolve_schema_refs(schema: dict) -> dict:
     """Inline $defs/$ref references for Gemini API compatibility.
 
@@ -136,3 +186,101 @@ def resolve_schema_refs(schema: dict) -> dict:
         return obj
 
     return _resolve(schema)
+
+
+# Fields validate_and_repair recomputes locally, so no mode asks the model for them
+_DERIVED_FIELDS = {
+    "VideoReproductionPlan": {"total_duration_seconds"},
+    "Scene": {"voiceover_duration_estimate_seconds"},
+}
+# Further fields a mode leaves out of its response schema (they load as defaults)
+MODE_OMITTED_FIELDS: dict[str, dict[str, set[str]]] = {
+    "summary": {"Scene": {"title_card_text"}, "SceneOutline": {"title_card_text"}},
+}
+_SCHEMA_ANNOTATIONS = {"description", "title", "default"}
+# Descriptions for prompts that write final text, without {{char:Name}} placeholders
+_LITERAL_DESCRIPTIONS = {
+    "CharacterProfile": {
+        "character_description": (
+            "Detailed visual description. Repeat it word-for-word wherever the character "
+            "appears in a prompt."
+        ),
+    },
+}
+
+
+def _omitted_fields(mode: str) -> dict[str, set[str]]:
+    omitted = {name: set(fields) for name, fields in _DERIVED_FIELDS.items()}
+    for name, fields in MODE_OMITTED_FIELDS.get(mode, {}).items():
+        omitted.setdefault(name, set()).update(fields)
+    return omitted
+
+
+def _compact_object(schema: dict, omitted: set[str]) -> dict:
+    """Drop omitted properties and annotations; every remaining property is required."""
+
+    def _strip(obj):
+        if isinstance(obj, dict):
+            return {
+                k: ({name: _strip(v) for name, v in v.items()} if k == "properties" else _strip(v))
+                for k, v in obj.items()
+                if k not in _SCHEMA_ANNOTATIONS
+            }
+        if isinstance(obj, list):
+            return [_strip(item) for item in obj]
+        return obj
+
+    schema = _strip(schema)
+    schema["properties"] = {
+        name: prop for name, prop in schema["properties"].items() if name not in omitted
+    }
+    schema["required"] = list(schema["properties"])
+    return schema
+
+
+def compact_schema(model: type[BaseModel], mode: str) -> dict:
+    """Compact response schema of ``model`` for ``mode``.
+
+    Field descriptions are stated once in the system prompt (see
+    ``field_reference``) instead of inside the schema, and fields the mode
+    does not need are left out. Responses still load into ``model``;
+    omitted fields take their defaults.
+    """
+    omitted = _omitted_fields(mode)
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+    for name in defs:
+        defs[name] = _compact_object(defs[name], omitted.get(name, set()))
+    compact = _compact_object(schema, omitted.get(model.__name__, set()))
+    compact["$defs"] = defs
+    return resolve_schema_refs(compact)
+
+
+def plan_schema(mode: str) -> dict:
+    """Compact ``VideoReproductionPlan`` schema for ``mode``."""
+    return compact_schema(VideoReproductionPlan, mode)
+
+
+def field_reference(mode: str, placeholders: bool = True) -> str:
+    """Descriptions of every field the ``mode`` schema asks for, one line each.
+
+    With ``placeholders=False`` the descriptions ask for final text, for
+    responses that are not run through ``expand_placeholders``.
+    """
+    omitted = _omitted_fields(mode)
+    sections = [
+        ("VideoReproductionPlan", VideoReproductionPlan, "the top-level object"),
+        ("CharacterProfile", CharacterProfile, "each item of characters"),
+        ("Scene", Scene, "each item of scenes"),
+    ]
+    lines = ["## FIELD REFERENCE"]
+    for name, model, where in sections:
+        lines.append(f"\n{name} ({where}):")
+        for field_name, info in model.model_fields.items():
+            if field_name in omitted.get(name, set()) or not info.description:
+                continue
+            description = info.description
+            if not placeholders:
+                description = _LITERAL_DESCRIPTIONS.get(name, {}).get(field_name, description)
+            lines.append(f"- {field_name}: {description}")
+    return "\n".join(lines)
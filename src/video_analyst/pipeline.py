@@ -0,0 +1,189 @@
+"""Single-URL download → analyze → cleanup pipeline shared by CLI commands and workers."""
+
+from __future__ import annotations
+
+import dataclasses
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from google import genai
+
+from .analyzer import AnalysisResult, analyze_video
+from .config import Config
+from .downloader import (
+    AdmissionPolicy,
+    DownloadResult,
+    download_storyboard_input,
+    download_video,
+)
+from .ledger import check_budget
+
+if TYPE_CHECKING:
+    from .dedup import PhashIndex
+
+
+def admission_policy(config: Config) -> AdmissionPolicy:
+    """Admission limits configured for interactive and worker runs."""
+    return AdmissionPolicy(
+        max_duration_seconds=config.max_video_duration_seconds,
+        max_size_mb=config.max_video_size_mb,
+    )
+
+
+def video_metadata(result: DownloadResult) -> dict:
+    """Prompt metadata for a downloaded video."""
+    return {
+        "url": result.original_url,
+        "title": result.title,
+        "duration": result.duration,
+        "description": result.description,
+        "platform": result.platform,
+        "analyzed_ranges": result.ranges,
+        "transcript": result.transcript,
+    }
+
+
+def run_pipeline(
+    url: str,
+    config: Config,
+    mode: str,
+    lang: str,
+    style: str,
+    input_mode: str = "video",
+    keep_video: bool = False,
+    verbose: bool = False,
+    client: genai.Client | None = None,
+    dedup_index: PhashIndex | None = None,
+) -> AnalysisResult:
+    """Download, analyze and clean up a single URL."""
+    video_path: Path | None = None
+    # Fail before downloading rather than after
+    check_budget(config)
+
+    try:
+        # Step 1: Download
+        print(f"[1/4] Downloading video... ({url})", file=sys.stderr)
+        started = time.monotonic()
+        if input_mode == "storyboard":
+            result = download_storyboard_input(
+                url=url,
+                output_dir=config.download_dir,
+                verbose=verbose,
+                policy=admission_policy(config),
+                mode=mode,
+            )
+        else:
+            result = download_video(
+                url=url,
+                output_dir=config.download_dir,
+                verbose=verbose,
+                policy=admission_policy(config),
+                mode=mode,
+                max_analysis_seconds=config.max_analysis_duration_seconds,
+                subtitles=config.subtitles,
+            )
+        video_path = result.video_path
+        if result.mode and result.mode != mode:
+            print(f"  Routed to {result.mode} mode by admission policy", file=sys.stderr)
+            mode = result.mode
+
+        if verbose:
+            print(
+                f"  Downloaded: {result.title} ({result.duration}s) -> {video_path}",
+                file=sys.stderr,
+            )
+
+        download_seconds = time.monotonic() - started
+
+        # Step 2-4: Analyze
+        analysis = analyze_video(
+            video_path=video_path,
+            mode=mode,
+            target_language=lang,
+            video_metadata=video_metadata(result),
+            config=config,
+            style=style,
+            verbose=verbose,
+            input_mode=input_mode,
+            client=client,
+            dedup_index=dedup_index,
+        )
+        analysis.timings.download_seconds = download_seconds
+        return analysis
+    finally:
+        # Cleanup downloaded video
+        if video_path and video_path.exists() and not keep_video:
+            if video_path.is_dir():
+                shutil.rmtree(video_path, ignore_errors=True)
+            else:
+                video_path.unlink(missing_ok=True)
+            if verbose:
+                print(f"  Cleaned up: {video_path}", file=sys.stderr)
+
+
+@dataclass
+class BenchResult:
+    profile: str
+    analysis: AnalysisResult | None = None
+    latency_seconds: float = 0.0
+    plan_bytes: int = 0
+    error: str | None = None
+
+
+def run_bench(
+    url: str,
+    config: Config,
+    mode: str,
+    lang: str,
+    style: str,
+    profiles: list[str],
+    verbose: bool = False,
+) -> list[BenchResult]:
+    """Download once and analyze the same video with each profile.
+
+    Dedup, context caching and the model cascade are turned off so every
+    run pays for exactly one profile on one model.
+    """
+    check_budget(config)
+    print(f"Downloading video... ({url})", file=sys.stderr)
+    result = download_video(
+        url=url,
+        output_dir=config.download_dir,
+        verbose=verbose,
+        policy=admission_policy(config),
+        mode=mode,
+        max_analysis_seconds=config.max_analysis_duration_seconds,
+        subtitles=config.subtitles,
+    )
+    results = []
+    try:
+        for name in profiles:
+            print(f"\n=== Profile {name}", file=sys.stderr)
+            run_config = dataclasses.replace(
+                config, profile=name, dedup=False, context_cache=False, cascade=False
+            )
+            bench = BenchResult(profile=name)
+            started = time.monotonic()
+            try:
+                bench.analysis = analyze_video(
+                    video_path=result.video_path,
+                    mode=result.mode or mode,
+                    target_language=lang,
+                    video_metadata=video_metadata(result),
+                    config=run_config,
+                    style=style,
+                    verbose=verbose,
+                )
+                bench.plan_bytes = len(bench.analysis.plan.model_dump_json())
+            except RuntimeError as e:
+                bench.error = str(e)
+                print(f"  Failed: {e}", file=sys.stderr)
+            bench.latency_seconds = time.monotonic() - started
+            results.append(bench)
+    finally:
+        result.video_path.unlink(missing_ok=True)
+    return results
@@ -0,0 +1,85 @@
+"""Named latency/cost profiles for Gemini requests.
+
+A profile sets the knobs that dominate video latency and token cost: media
+resolution (tokens per frame), the video frame sampling rate and the
+thinking budget, plus the sampling settings of the plan request.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from google.genai import types
+
+_RESOLUTIONS = {
+    "low": types.MediaResolution.MEDIA_RESOLUTION_LOW,
+    "medium": types.MediaResolution.MEDIA_RESOLUTION_MEDIUM,
+    "high": types.MediaResolution.MEDIA_RESOLUTION_HIGH,
+}
+# 2.5 Pro cannot turn thinking off and needs at least this budget
+_PRO_MIN_THINKING = 128
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    # "low" (66 tokens/frame), "medium"/"high" (258), or None for the API default
+    media_resolution: str | None = None
+    # Video frames sampled per second; None keeps the API default of 1
+    fps: float | None = None
+    # Thinking tokens allowed per request; 0 disables, None leaves it to the model
+    thinking_budget: int | None = None
+    temperature: float = 0.7
+    max_output_tokens: int = 65536
+
+    def generation_settings(self, model: str) -> dict:
+        """Keyword arguments for ``GenerateContentConfig`` on ``model``."""
+        settings: dict = {
+            "temperature": self.temperature,
+            "max_output_tokens": self.max_output_tokens,
+        }
+        if self.media_resolution:
+            settings["media_resolution"] = _RESOLUTIONS[self.media_resolution]
+        if self.thinking_budget is not None and _supports_thinking(model):
+            budget = self.thinking_budget
+            if "pro" in model:
+                budget = max(budget, _PRO_MIN_THINKING)
+            settings["thinking_config"] = types.ThinkingConfig(thinking_budget=budget)
+        return settings
+
+    def video_metadata(self) -> types.VideoMetadata | None:
+        """Sampling settings for a video part, or None to use the API defaults."""
+        if self.fps is None:
+            return None
+        return types.VideoMetadata(fps=self.fps)
+
+
+PROFILES = {
+    "fast": Profile(name="fast", media_resolution="low", fps=0.5, thinking_budget=0),
+    # API defaults: what every request used before profiles existed
+    "balanced": Profile(name="balanced"),
+    "quality": Profile(name="quality", media_resolution="high", fps=2.0, thinking_budget=8192),
+}
+PROFILE_NAMES = list(PROFILES)
+
+# Profile used when none is chosen for the run; Config.mode_profiles
+# (VIDEO_ANALYST_PROFILE_<MODE>) overrides these, "fast" is opt-in
+MODE_PROFILES = {
+    "summary": "balanced",
+    "highlights": "balanced",
+    "full": "balanced",
+}
+
+
+def _supports_thinking(model: str) -> bool:
+    return model.startswith("gemini-2.5")
+
+
+def resolve_profile(
+    name: str | None, mode: str, mode_profiles: dict[str, str] | None = None
+) -> Profile:
+    """The named profile, else the configured default for ``mode``."""
+    name = name or (mode_profiles or {}).get(mode) or MODE_PROFILES.get(mode, "balanced")
+    if name not in PROFILES:
+        raise RuntimeError(f"Unknown profile '{name}'. Choose from: {', '.join(PROFILE_NAMES)}")
+    return PROFILES[name]
@@ -2,11 +2,21 @@
 
 from __future__ import annotations
 
+from ..models import MODE_OMITTED_FIELDS, field_reference
 from ..styles import get_style
 
 
-def get_system_prompt(mode: str, target_language: str, style: str = "realistic") -> str:
-    """Build the system prompt for Gemini video analysis."""
+def get_system_prompt(
+    mode: str,
+    target_language: str,
+    style: str = "realistic",
+    include_field_reference: bool = True,
+) -> str:
+    """Build the system prompt for Gemini video analysis.
+
+    The field reference documents the compact response schema; leave it out
+    only when sending the fully described schema instead.
+    """
 
     style_def = get_style(style)
 
@@ -74,15 +84,20 @@ Apply these principles to maximize engagement:
 
 Apply this visual style to ALL video_prompt, video_extend_prompt, t2i_prompt, and cover_t2i_prompt fields:
 
-Video style directive: {style_def['video_directive']}
+Video style directive: {style_def["video_directive"]}
 
-Image style directive: {style_def['image_directive']}
+Image style directive: {style_def["image_directive"]}
 
 ### CRITICAL STYLE RULES:
-- EVERY video_prompt and video_extend_prompt MUST begin with the video style directive as the first sentence
-- EVERY t2i_prompt MUST begin with the image style directive as the first sentence
-- This is NON-NEGOTIABLE — a prompt missing the style directive is INVALID
-- After the style directive opening, continue with the scene-specific description"""
+- EVERY video_prompt and video_extend_prompt MUST begin with the literal placeholder {{{{style}}}} as the first sentence — it is replaced with the video style directive after generation
+- EVERY t2i_prompt and cover_t2i_prompt MUST begin with {{{{style}}}} as well — there it is replaced with the image style directive
+- Do NOT write out the directive text yourself; a prompt missing {{{{style}}}} is INVALID
+- After the {{{{style}}}} opening, continue with the scene-specific description
+
+### CHARACTER PLACEHOLDERS:
+- In video_prompt, video_extend_prompt, t2i_prompt and cover_t2i_prompt, refer to a character's appearance as {{{{char:character_name}}}} (e.g. {{{{char:Maya}}}}) instead of repeating their character_description
+- The placeholder is replaced with that character's full character_description after generation, so the wording stays identical across scenes
+- Write the character_description itself in full, once, in the characters list"""
 
     veo_rules = """
 
@@ -112,11 +127,18 @@ B. **NO ON-SCREEN TEXT IN VIDEO PROMPTS**: NEVER describe text, titles, captions
    - WRONG: 'A speech bubble saying "What?!" floats above'
    - WRONG: 'Title card reads "Chapter 1"'
    - WRONG: 'Text overlay showing the equation E=mc²'
-   - RIGHT: Describe the VISUAL SCENE without any text elements. If the original video had text, replace it with equivalent visual storytelling (glowing effects, visual metaphors, etc.) or put a short phrase in title_card_text for post-production overlay.
+   - RIGHT: Describe the VISUAL SCENE without any text elements. If the original video had text, replace it with equivalent visual storytelling (glowing effects, visual metaphors, etc.).
 
-C. These rules apply equally to video_prompt, video_extend_prompt, AND t2i_prompt fields.
+C. These rules apply equally to video_prompt, video_extend_prompt, AND t2i_prompt fields."""
 
-D. **title_card_text rules**: Only populate when the original scene has a prominent short title or heading (a few words or one short sentence). Use normal case (not ALL CAPS). Leave as empty string for long text, paragraphs, or anything beyond a short phrase.
+    # Summary plans have no title_card_text field
+    title_card_rules = ""
+    if "title_card_text" not in MODE_OMITTED_FIELDS.get(mode, {}).get("Scene", ()):
+        title_card_rules = """
+
+D. **title_card_text rules**: A short phrase from the original's on-screen text goes in title_card_text for post-production overlay. Only populate when the original scene has a prominent short title or heading (a few words or one short sentence). Use normal case (not ALL CAPS). Leave as empty string for long text, paragraphs, or anything beyond a short phrase."""
+
+    image_rules = """
 
 ## NANO BANANA 2 PROMPT RULES
 
@@ -125,7 +147,7 @@ D. **title_card_text rules**: Only populate when the original scene has a promin
 3. Describe spatial relationships clearly ("on the left", "in the foreground")
 4. Include camera metadata: lens type, aperture, focal length (e.g., "shot with 85mm f/1.4 lens")
 5. Use consistent character names across all prompts
-6. Keep character visual descriptions IDENTICAL word-for-word across scenes
+6. Keep character visual descriptions IDENTICAL across scenes by using {{char:character_name}} placeholders
 7. Describe textures and materials explicitly ("matte finish", "soft velvet", "brushed steel")
 
 ## CHARACTER REFERENCE PROMPTS (t2i_reference_prompt)
@@ -216,4 +238,52 @@ Produce a comprehensive reproduction plan:
 - Capture the full pacing and rhythm of the original
 - SKIP all ads, sponsors, end cards, and promotional content"""
 
-    return base + style_section + veo_rules + language + mode_instruction
+    prompt = base + style_section + veo_rules + title_card_rules + image_rules
+    prompt += language + mode_instruction
+    if include_field_reference:
+        prompt += "\n\n" + field_reference(mode)
+    return prompt
+
+
+def get_derive_system_prompt(target_language: str, style: str | None = None) -> str:
+    """Build the system prompt for rewriting an existing plan without the video."""
+
+    base = """\
+You are an expert reproduction planner. You are given an existing VideoReproductionPlan as JSON. You do NOT have the source video. Rewrite the plan as instructed and return the full plan in the same structure.
+
+## RULES
+
+- Keep the same scenes in the same order, with the same scene_number, duration_seconds and generation_method
+- Keep the story, pacing, subjects and camera work of every scene — change only what the instructions ask for
+- Keep character_name values unchanged and character descriptions identical word-for-word across all prompts
+- video_prompt, video_extend_prompt and t2i_prompt contain ZERO text content: no voiceover, dialogue, titles, captions or readable words
+- Keep video_extend_prompt empty for 8-second scenes and t2i_prompt empty for 't2v' scenes
+- All prompt fields stay in English — generation models are English-optimized"""
+
+    style_section = ""
+    if style is not None:
+        style_def = get_style(style)
+        style_section = f"""
+
+## VISUAL STYLE (MANDATORY — EVERY PROMPT)
+
+Replace the previous visual style in ALL video_prompt, video_extend_prompt, t2i_prompt, cover_t2i_prompt and t2i_reference_prompt fields:
+
+Video style directive: {style_def["video_directive"]}
+
+Image style directive: {style_def["image_directive"]}
+
+- EVERY video_prompt and video_extend_prompt MUST begin with the video style directive as the first sentence
+- EVERY t2i_prompt MUST begin with the image style directive as the first sentence
+- Remove wording from the previous style that contradicts the new one (medium, palette, lighting, film stock)"""
+
+    language = f"""
+
+## TARGET LANGUAGE
+
+All voiceover_text fields MUST be in: {target_language}
+Title, description and title_card_text should also be in: {target_language}
+metadata_tags: mix of target language and English for maximum reach.
+When translating voiceover, keep it natural and human, and keep roughly the same spoken duration per scene (~2.5 words/second for English, adjust for the target language)."""
+
+    return base + style_section + language + "\n\n" + field_reference("full", placeholders=False)
@@ -3,6 +3,31 @@
 from __future__ import annotations
 
 from ..styles import get_style
+from ..transcript import format_transcript
+
+
+def _format_timestamp(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+def _ranges_section(ranges: list, preselected: bool = False) -> str:
+    """Explain which excerpts of the source the attached video contains."""
+    spans = ", ".join(f"{_format_timestamp(a)}-{_format_timestamp(b)}" for a, b in ranges)
+    covered = sum(b - a for a, b in ranges)
+    if preselected:
+        guidance = (
+            "The excerpts were preselected as the loudest, most active moments of the original, "
+            "starting with its opening. They are the highlights to keep: build the plan from them "
+            "in order and use the original timestamps above when referring to them."
+        )
+    else:
+        guidance = "Treat the excerpts as representative of the whole video and plan accordingly."
+    return f"""
+## Partial Source
+The attached video contains only these excerpts of the original ({covered:.0f}s total), joined in order: {spans}.
+Timestamps in the attached video do not match the original. {guidance}
+"""
 
 
 def get_user_prompt(
@@ -24,6 +49,35 @@ def get_user_prompt(
 - Duration: {video_metadata.get("duration", "Unknown")} seconds
 - Platform: {video_metadata.get("platform", "Unknown")}
 - Description: {desc or "N/A"}
+"""
+        if video_metadata.get("analyzed_ranges"):
+            metadata_section += _ranges_section(
+                video_metadata["analyzed_ranges"],
+                preselected=bool(video_metadata.get("highlights_preselected")),
+            )
+        transcript = video_metadata.get("transcript")
+        if video_metadata.get("input_mode") == "keyframes":
+            if transcript:
+                metadata_section += """
+## Input Format
+The video is provided as timestamped keyframes (one per shot or every few seconds) and the transcript below, without audio or a video file. Treat each keyframe as the start of what is on screen until the next one, use the transcript for narration and pacing, and infer music and ambient sound from the visuals.
+"""
+            else:
+                metadata_section += """
+## Input Format
+The video is provided as its full audio track followed by timestamped keyframes (one per shot or every few seconds), not as a video file. Treat each keyframe as the start of what is on screen until the next one, and use the audio for narration, music and pacing.
+"""
+        elif video_metadata.get("input_mode") == "storyboard":
+            metadata_section += f"""
+## Input Format
+The video is provided as low-resolution storyboard thumbnails sampled at fixed intervals, {"with the transcript below and " if transcript else ""}without audio or a video file. Each thumbnail stands for what is on screen until the next one; infer cuts, motion, music and ambient sound from the sequence. Details too small to see are unknown — keep prompts plausible rather than inventing specifics.
+"""
+        if transcript:
+            lines = format_transcript(transcript, video_metadata.get("analyzed_ranges"))
+            metadata_section += f"""
+## Transcript
+Platform captions of the source, timestamped in source time. Use them for what is said instead of transcribing the audio yourself; auto-captions may contain recognition errors, so correct obvious ones from context.
+{lines}
 """
 
     return f"""Analyze the attached video and produce a complete reproduction plan.
@@ -34,14 +88,108 @@ Watch the entire video carefully. Then produce a VideoReproductionPlan that allo
 
 Analysis mode: {mode}
 Target language for voiceover and title: {target_language}
-Visual style: {style} — {style_def['description']}
+Visual style: {style} — {style_def["description"]}
 
 IMPORTANT RULES:
 1. SKIP all advertising, sponsorship segments, end cards, subscribe/follow callouts, and promotional content. Only reproduce the substantive content.
 2. If a scene contains ANY character (human, animal, creature), it MUST use generation_method "t2i_i2v" with a t2i_prompt. Only pure environmental/atmospheric scenes without characters use "t2v".
 3. Apply the {style} visual style consistently to every prompt.
 4. Voiceover in {target_language}, sounding natural and human.
-5. Character descriptions must be identical word-for-word across all scenes.
+5. Refer to characters' appearance in prompts as {{{{char:character_name}}}} and begin every prompt with {{{{style}}}} — both are expanded after generation.
 6. CRITICAL: video_prompt, video_extend_prompt, and t2i_prompt must contain ZERO text content — no voiceover, no dialogue, no "Character says:", no on-screen text descriptions, no titles, no captions, no speech bubbles. These fields describe ONLY visuals, camera, and ambient sound. All spoken words go in voiceover_text. All on-screen text goes in title_card_text.
 
 Output the structured JSON response."""
+
+
+def get_outline_prompt(
+    mode: str, target_language: str, video_metadata: dict, style: str = "realistic"
+) -> str:
+    """Build the phase-1 prompt of two-phase generation: the plan without scene prompts."""
+
+    return (
+        get_user_prompt(mode, target_language, video_metadata, style)
+        + """
+
+## Phase 1: Outline Only
+
+Do NOT write video_prompt, video_extend_prompt, t2i_prompt or voiceover_text yet — each scene's prompts are written in a follow-up request. Return a PlanOutline instead:
+- Every plan-level field in full: title, description, metadata_tags, target_language, viral_structure_notes, characters (with complete reference prompts) and cover_t2i_prompt.
+- Per scene: scene_number, start_seconds and end_seconds (where the scene's source material sits in the attached video), duration_seconds, generation_method, scene_description, characters (character_name of everyone on screen) and title_card_text.
+- Make each scene_description specific enough that the scene can be written without re-watching the rest of the video: action, subjects, setting, camera, and the gist of what is said."""
+    )
+
+
+def get_scene_expansion_prompt(
+    outline_json: str,
+    scene_number: int,
+    target_language: str,
+    style: str = "realistic",
+    clipped: bool = False,
+    defects: list[str] | None = None,
+) -> str:
+    """Build the phase-2 prompt of two-phase generation: write one scene's prompts."""
+
+    style_def = get_style(style)
+    source = (
+        "The attached video is clipped to this scene's source material (with a little context)."
+        if clipped
+        else "Use the attached video for the scene's time range."
+    )
+    corrections = ""
+    if defects:
+        corrections = "\n\nIMPORTANT: A previous answer had these problems. Avoid them:\n" + (
+            "\n".join(f"- {defect}" for defect in defects)
+        )
+    return f"""Write the prompts for scene {scene_number} of the reproduction plan outlined below.
+
+## Plan Outline
+```json
+{outline_json}
+```
+
+## Task
+{source}
+Return a SceneExpansion for scene {scene_number} only:
+- video_prompt and t2i_prompt in the {style} visual style — {style_def["description"]}. Begin each prompt with {{{{style}}}} and refer to characters' appearance as {{{{char:character_name}}}} using names from the outline.
+- video_extend_prompt only if duration_seconds is above 8; otherwise an empty string.
+- t2i_prompt only if generation_method is "t2i_i2v"; otherwise an empty string.
+- voiceover_text in {target_language}, natural and human, sized to the scene's duration_seconds and continuing smoothly from the neighbouring scenes.
+- video_prompt, video_extend_prompt and t2i_prompt contain ZERO text content: no voiceover, dialogue, titles or captions.{corrections}
+
+Output the structured JSON response."""
+
+
+def get_derive_prompt(
+    plan_json: str,
+    target_language: str,
+    style: str | None = None,
+    source_language: str | None = None,
+) -> str:
+    """Build the user prompt for restyling/translating an existing plan."""
+
+    changes = []
+    if style is not None:
+        style_def = get_style(style)
+        changes.append(
+            f"- Restyle every prompt to the {style} visual style — {style_def['description']}"
+        )
+    if source_language and source_language != target_language:
+        changes.append(
+            f"- Translate voiceover_text, title, description and title_card_text "
+            f"from {source_language} to {target_language}"
+        )
+    if not changes:
+        changes.append("- Keep the plan as is, fixing only rule violations")
+
+    instructions = "\n".join(changes)
+    return f"""Rewrite the following reproduction plan.
+
+## Changes
+{instructions}
+
+## Existing Plan
+```json
+{plan_json}
+```
+
+Output the complete rewritten plan as structured JSON."""
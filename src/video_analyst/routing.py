@@ -0,0 +1,46 @@
+"""Model routing: start short, simple jobs on a cheaper model and escalate on failure."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .config import Config
+
+# Longest analyzed duration (seconds) per mode that starts on the cheap model.
+# Condensed modes drop most detail, so a weaker model copes with longer input.
+CHEAP_MAX_SECONDS = {
+    "summary": 180,
+    "highlights": 90,
+    "full": 45,
+}
+
+
+@dataclass
+class ModelRoute:
+    model: str
+    # Stronger model to switch to when the first attempt fails, if any
+    escalate_to: str | None
+    reason: str
+
+
+def route_model(config: Config, mode: str, duration: float | None) -> ModelRoute:
+    """Pick the model for a job from its mode and analyzed duration."""
+    strong = config.model_name
+    if not config.cascade:
+        return ModelRoute(model=strong, escalate_to=None, reason="cascade disabled")
+    if config.cascade_model == strong:
+        return ModelRoute(model=strong, escalate_to=None, reason="cascade model is the default")
+    if duration is None:
+        return ModelRoute(model=strong, escalate_to=None, reason="unknown duration")
+    limit = CHEAP_MAX_SECONDS.get(mode, 0)
+    if duration > limit:
+        return ModelRoute(
+            model=strong,
+            escalate_to=None,
+            reason=f"{duration:.0f}s exceeds {limit}s for {mode} mode",
+        )
+    return ModelRoute(
+        model=config.cascade_model,
+        escalate_to=strong,
+        reason=f"{duration:.0f}s {mode} job within {limit}s",
+    )
@@ -0,0 +1,206 @@
+"""Reusable library session wrapping download, analysis and derivation."""
+
+from __future__ import annotations
+
+import dataclasses
+import sys
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import media
+from .analyzer import AnalysisResult, analyze_video, derive_plan, store_plan
+from .canonical import job_key
+from .config import Config
+from .keypool import KeyPool, PooledKey
+from .models import VideoReproductionPlan
+from .pipeline import run_pipeline
+from .singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from .dedup import PhashIndex
+
+
+@dataclass
+class AnalysisOutcome:
+    """Result of one source in ``VideoAnalyst.analyze_many``."""
+
+    source: str
+    result: AnalysisResult | None = None
+    error: str | None = None
+    # The exception behind ``error``, for callers that need its type or details
+    exception: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.result is not None
+
+
+class VideoAnalyst:
+    """A long-lived analysis session.
+
+    Holds the config, a client per API key and the near-duplicate index, so
+    a service can run many analyses without rebuilding them per call. With
+    several keys configured, each analysis runs on the least busy key::
+
+        analyst = VideoAnalyst()
+        result = analyst.analyze("https://youtube.com/shorts/...", mode="summary")
+        print(result.plan.title, result.token_usage.cost_usd(analyst.config.model_name))
+    """
+
+    def __init__(self, config: Config | None = None, verbose: bool = False) -> None:
+        self.config = config or Config.from_env()
+        self.verbose = verbose
+        self.keys = KeyPool.from_config(self.config)
+        # Client of the first key, for callers that need a single client
+        self.client = self.keys.keys[0].client
+        self._dedup_index: PhashIndex | None = None
+        self._index_lock = threading.Lock()
+        # Concurrent analyses of the same video with the same parameters run once
+        self._inflight: SingleFlight[AnalysisResult] = SingleFlight()
+
+    def _config_for(self, key: PooledKey) -> Config:
+        """The session config bound to one key, so uploads use that key too."""
+        return dataclasses.replace(self.config, gemini_api_key=key.api_key)
+
+    @property
+    def dedup_index(self) -> PhashIndex | None:
+        """The near-duplicate index, loaded once when dedup is enabled."""
+        if not self.config.dedup:
+            return None
+        with self._index_lock:
+            if self._dedup_index is None:
+                from .dedup import PhashIndex
+
+                self._dedup_index = PhashIndex(self.config.data_dir / "phash-index")
+        return self._dedup_index
+
+    def analyze(
+        self,
+        source: str | Path,
+        mode: str = "full",
+        lang: str = "en",
+        style: str = "realistic",
+        input_mode: str = "video",
+        keep_video: bool = False,
+    ) -> AnalysisResult:
+        """Analyze a video URL, or a local video file without downloading it.
+
+        A call made while an analysis of the same video (any URL form of it,
+        see canonical.job_key) with the same parameters is running waits for
+        that analysis and returns its result.
+        """
+        path = Path(source)
+        if isinstance(source, Path) or path.is_file():
+            if input_mode == "storyboard":
+                raise RuntimeError("Storyboard input needs a YouTube URL, not a local file")
+            key = f"local:{path.resolve()}"
+
+            def run(key: PooledKey) -> AnalysisResult:
+                return analyze_video(
+                    video_path=path,
+                    mode=mode,
+                    target_language=lang,
+                    video_metadata=_local_metadata(path),
+                    config=self._config_for(key),
+                    style=style,
+                    verbose=self.verbose,
+                    input_mode=input_mode,
+                    client=key.client,
+                    dedup_index=self.dedup_index,
+                )
+        else:
+            key = job_key(str(source), verbose=self.verbose)
+
+            def run(key: PooledKey) -> AnalysisResult:
+                return run_pipeline(
+                    str(source),
+                    self._config_for(key),
+                    mode,
+                    lang,
+                    style,
+                    input_mode,
+                    keep_video=keep_video,
+                    verbose=self.verbose,
+                    client=key.client,
+                    dedup_index=self.dedup_index,
+                )
+
+        result, shared = self._inflight.do(
+            (key, mode, lang, style, input_mode), lambda: self.keys.run(run)
+        )
+        if shared:
+            print(f"  {source}: shared the result of an identical analysis", file=sys.stderr)
+        return result
+
+    def analyze_many(
+        self,
+        sources: Iterable[str | Path],
+        mode: str = "full",
+        lang: str = "en",
+        style: str = "realistic",
+        input_mode: str = "video",
+        max_workers: int = 4,
+    ) -> list[AnalysisOutcome]:
+        """Analyze several sources concurrently. Outcomes keep the input order.
+
+        A failing source is reported on its outcome instead of raising, whatever
+        the error (download, API, transport), so it cannot abort the others.
+        """
+
+        def run(source: str | Path) -> AnalysisOutcome:
+            try:
+                result = self.analyze(source, mode, lang, style, input_mode)
+            except Exception as e:  # noqa: BLE001 - recorded on the outcome
+                error = f"{type(e).__name__}: {e}"
+                print(f"  {source}: {error}", file=sys.stderr)
+                return AnalysisOutcome(source=str(source), error=error, exception=e)
+            return AnalysisOutcome(source=str(source), result=result)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(run, sources))
+
+    def derive(
+        self,
+        plan: VideoReproductionPlan,
+        target_language: str | None = None,
+        style: str | None = None,
+    ) -> AnalysisResult:
+        """Restyle and/or translate an existing plan without the video."""
+        result = self.keys.run(
+            lambda key: derive_plan(
+                plan,
+                self._config_for(key),
+                target_language=target_language,
+                style=style,
+                verbose=self.verbose,
+                client=key.client,
+            )
+        )
+        store_plan(
+            self.config,
+            result.plan,
+            result.token_usage,
+            style=style,
+            language=result.plan.target_language,
+        )
+        return result
+
+
+def _local_metadata(path: Path) -> dict:
+    try:
+        duration = media.probe_duration(path)
+    except (RuntimeError, ValueError, KeyError) as e:
+        # ffprobe missing, or no container duration (e.g. "N/A")
+        print(f"  Could not read the duration of {path}: {e}", file=sys.stderr)
+        duration = None
+    return {
+        "url": str(path.resolve()),
+        "title": path.stem,
+        "duration": duration,
+        "description": "",
+        "platform": "local",
+    }
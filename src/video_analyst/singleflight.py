@@ -0,0 +1,54 @@
+"""Coalescing of concurrent identical calls into one execution."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one call per key at a time.
+
+    Callers arriving while a call for their key is in flight wait for it and
+    receive its result (the same object) or exception instead of running
+    their own. Nothing is cached: once the call finishes, the next caller for
+    the key runs again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Run ``fn`` or join the call in flight for ``key``.
+
+        Returns ``(result, shared)``, where ``shared`` is True for callers
+        that joined another caller's execution.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,199 @@
+"""Local plan store with full-text search (SQLite FTS5).
+
+Every generated plan is kept with its source and run labels; titles, tags,
+characters, scene prompts and voiceovers are indexed so earlier analyses can
+be found without another Gemini call.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import Config
+from .models import VideoReproductionPlan
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    url TEXT,
+    platform TEXT,
+    title TEXT NOT NULL,
+    mode TEXT,
+    style TEXT,
+    language TEXT,
+    model TEXT,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    plan_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_url ON plans (url);
+CREATE VIRTUAL TABLE IF NOT EXISTS plan_text USING fts5(
+    title, description, tags, characters, scenes, voiceover,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Columns of plan_text, in order; search results show a snippet of the best match
+_TEXT_COLUMNS = ("title", "description", "tags", "characters", "scenes", "voiceover")
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class StoredPlan:
+    id: int
+    ts: float
+    url: str | None
+    platform: str | None
+    title: str
+    mode: str | None
+    style: str | None
+    language: str | None
+    model: str | None
+    cost_usd: float
+    plan_json: str
+
+    @property
+    def plan(self) -> VideoReproductionPlan:
+        return VideoReproductionPlan.model_validate_json(self.plan_json)
+
+
+@dataclass
+class PlanHit:
+    id: int
+    ts: float
+    url: str | None
+    title: str
+    mode: str | None
+    style: str | None
+    language: str | None
+    snippet: str
+
+
+def _plan_text(plan: VideoReproductionPlan) -> dict[str, str]:
+    return {
+        "title": plan.title,
+        "description": plan.description,
+        "tags": " ".join(plan.metadata_tags),
+        "characters": "\n".join(
+            f"{c.character_name}: {c.character_description}" for c in plan.characters
+        ),
+        "scenes": "\n".join(
+            " ".join(
+                filter(None, (s.scene_description, s.title_card_text, s.video_prompt, s.t2i_prompt))
+            )
+            for s in plan.scenes
+        ),
+        "voiceover": "\n".join(s.voiceover_text for s in plan.scenes),
+    }
+
+
+def _literal_query(query: str) -> str:
+    """Quote every word so FTS5 operators and punctuation are matched as text."""
+    return " ".join(f'"{word}"' for word in _WORD.findall(query))
+
+
+class PlanStore:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=60)) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add(
+        self,
+        plan: VideoReproductionPlan,
+        url: str | None = None,
+        platform: str | None = None,
+        mode: str | None = None,
+        style: str | None = None,
+        language: str | None = None,
+        model: str | None = None,
+        cost_usd: float = 0.0,
+    ) -> int:
+        """Store a plan and index its text. Returns the plan id."""
+        row = {
+            "ts": time.time(),
+            "url": url,
+            "platform": platform,
+            "title": plan.title,
+            "mode": mode,
+            "style": style,
+            "language": language or plan.target_language,
+            "model": model,
+            "cost_usd": cost_usd,
+            "plan_json": plan.model_dump_json(),
+        }
+        text = _plan_text(plan)
+        with closing(self._connect()) as conn, conn:
+            columns = ", ".join(row)
+            placeholders = ", ".join(f":{name}" for name in row)
+            cursor = conn.execute(f"INSERT INTO plans ({columns}) VALUES ({placeholders})", row)
+            plan_id = cursor.lastrowid
+            conn.execute(
+                f"INSERT INTO plan_text (rowid, {', '.join(_TEXT_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in _TEXT_COLUMNS)})",
+                (plan_id, *(text[c] for c in _TEXT_COLUMNS)),
+            )
+        return plan_id
+
+    def get(self, plan_id: int) -> StoredPlan | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        return StoredPlan(**dict(row)) if row else None
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        mode: str | None = None,
+        style: str | None = None,
+        language: str | None = None,
+    ) -> list[PlanHit]:
+        """Plans matching an FTS5 ``query``, best match first.
+
+        A query that is not valid FTS5 syntax is retried with every word
+        quoted, so plain text always works.
+        """
+        filters, params = [], []
+        for column, value in (("mode", mode), ("style", style), ("language", language)):
+            if value is not None:
+                filters.append(f"AND p.{column} = ?")
+                params.append(value)
+        sql = f"""
+            SELECT p.id, p.ts, p.url, p.title, p.mode, p.style, p.language,
+                   snippet(plan_text, -1, '[', ']', '…', 12) AS snippet
+            FROM plan_text JOIN plans p ON p.id = plan_text.rowid
+            WHERE plan_text MATCH ? {" ".join(filters)}
+            ORDER BY bm25(plan_text, 10.0, 4.0, 4.0, 3.0, 1.0, 1.0)
+            LIMIT ?
+        """
+        with closing(self._connect()) as conn:
+            try:
+                rows = conn.execute(sql, (query, *params, limit)).fetchall()
+            except sqlite3.OperationalError:
+                literal = _literal_query(query)
+                if not literal:
+                    return []
+                rows = conn.execute(sql, (literal, *params, limit)).fetchall()
+        return [PlanHit(**dict(row)) for row in rows]
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+
+def open_plan_store(config: Config) -> PlanStore | None:
+    """The configured plan store, or None when it is disabled."""
+    if not config.plan_store:
+        return None
+    return PlanStore(config.data_dir / "plans.db")
@@ -0,0 +1,117 @@
+"""Storyboard input: frames sliced from the platform's sprite-sheet thumbnails.
+
+YouTube publishes storyboards as small formats ("sb0".."sb3") whose fragments
+are JPEG sheets of ``columns`` x ``rows`` tiles taken at a fixed rate. They
+cost kilobytes to fetch instead of the megabytes of an MP4.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import yt_dlp
+
+from . import media
+from .keyframes import Keyframe
+
+# Frames sent to the model; longer storyboards are sampled evenly
+DEFAULT_MAX_FRAMES = 60
+
+
+def select_storyboard_format(info: dict) -> dict | None:
+    """The storyboard format with the largest tiles, or None if there is none."""
+    boards = [
+        f
+        for f in info.get("formats") or []
+        if f.get("format_note") == "storyboard" and f.get("fragments") and f.get("fps")
+    ]
+    if not boards:
+        return None
+    return max(boards, key=lambda f: ((f.get("width") or 0) * (f.get("height") or 0), f["fps"]))
+
+
+def _tile_times(fmt: dict, duration: float | None) -> list[list[float]]:
+    """Timestamps of the tiles in each sheet, dropping the padding after the end."""
+    per_sheet = fmt["columns"] * fmt["rows"]
+    interval = 1 / fmt["fps"]
+    times: list[list[float]] = []
+    start = 0.0
+    for fragment in fmt["fragments"]:
+        sheet = [start + i * interval for i in range(per_sheet)]
+        end = start + fragment.get("duration", per_sheet * interval)
+        if duration:
+            end = min(end, duration)
+        times.append([t for t in sheet if t < end])
+        start += fragment.get("duration", per_sheet * interval)
+    return times
+
+
+def _fragment_url(fmt: dict, fragment: dict) -> str:
+    return fragment.get("url") or fmt.get("fragment_base_url", "") + fragment["path"]
+
+
+def download_storyboard(
+    ydl: yt_dlp.YoutubeDL,
+    info: dict,
+    output_dir: Path,
+    max_frames: int = DEFAULT_MAX_FRAMES,
+    verbose: bool = False,
+) -> Path:
+    """Fetch the sheets holding an evenly spaced subset of tiles and slice them.
+
+    Frames are written to a ``<id>.storyboard`` directory as
+    ``<milliseconds>.jpg`` and the directory is returned; sheets without a
+    selected tile are never fetched.
+    """
+    fmt = select_storyboard_format(info)
+    if fmt is None:
+        raise RuntimeError("No storyboard available for this video; use --input video or keyframes")
+    times = _tile_times(fmt, info.get("duration"))
+    flat = [(sheet, i) for sheet, sheet_times in enumerate(times) for i in range(len(sheet_times))]
+    if not flat:
+        raise RuntimeError("The storyboard has no frames")
+    step = max(1, -(-len(flat) // max_frames))
+    wanted: dict[int, set[int]] = {}
+    for sheet, i in flat[::step]:
+        wanted.setdefault(sheet, set()).add(i)
+
+    frames_dir = output_dir / f"{info.get('id', 'unknown')}.storyboard"
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    fetched = 0
+    for sheet, indices in sorted(wanted.items()):
+        url = _fragment_url(fmt, fmt["fragments"][sheet])
+        try:
+            with ydl.urlopen(url) as response:
+                data = response.read()
+        except (yt_dlp.utils.YoutubeDLError, OSError) as e:
+            raise RuntimeError(f"Failed to fetch storyboard sheet {sheet}: {e}") from e
+        fetched += len(data)
+        sheet_path = frames_dir / f"sheet-{sheet:04d}.jpg"
+        sheet_path.write_bytes(data)
+        try:
+            tiles = media.untile(sheet_path, fmt["columns"], fmt["rows"], frames_dir)
+        finally:
+            sheet_path.unlink(missing_ok=True)
+        for i, tile in enumerate(tiles):
+            if i in indices:
+                tile.rename(frames_dir / f"{round(times[sheet][i] * 1000):09d}.jpg")
+            else:
+                tile.unlink()
+
+    if verbose:
+        print(
+            f"  Storyboard {fmt.get('format_id')}: {fmt.get('width')}x{fmt.get('height')} "
+            f"tiles, {sum(map(len, wanted.values()))} frames from {len(wanted)} sheets "
+            f"({fetched / 1024:.0f} KB)",
+            file=sys.stderr,
+        )
+    return frames_dir
+
+
+def load_storyboard(frames_dir: Path) -> list[Keyframe]:
+    """Read the frames written by download_storyboard, in time order."""
+    return [
+        Keyframe(timestamp=int(path.stem) / 1000, jpeg=path.read_bytes())
+        for path in sorted(frames_dir.glob("*.jpg"))
+    ]
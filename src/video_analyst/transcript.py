@@ -0,0 +1,163 @@
+"""Platform subtitles and auto-captions as a timestamped transcript."""
+
+from __future__ import annotations
+
+import html
+import re
+import sys
+from dataclasses import dataclass
+
+import yt_dlp
+
+# Longest transcript passed to the prompt; later segments are dropped
+MAX_TRANSCRIPT_CHARS = 20000
+
+_CUE_TIMING = re.compile(
+    r"^((?:\d+:)?\d{1,2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{1,2}:\d{2}\.\d{3})"
+)
+_TAG = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class TranscriptSegment:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class CaptionTrack:
+    language: str
+    url: str
+    # True for platform speech recognition, False for uploaded subtitles
+    automatic: bool
+
+
+def _seconds(timestamp: str) -> float:
+    seconds = 0.0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_vtt(text: str) -> list[TranscriptSegment]:
+    """Parse WebVTT into segments, dropping markup and repeated lines.
+
+    Auto-captions repeat the previous line at the top of each cue as the
+    text scrolls; only lines not already emitted by the previous cue are kept.
+    """
+    segments: list[TranscriptSegment] = []
+    previous: list[str] = []
+    lines = text.replace("\r\n", "\n").split("\n")
+    i = 0
+    while i < len(lines):
+        match = _CUE_TIMING.match(lines[i].strip())
+        i += 1
+        if not match:
+            continue
+        cue: list[str] = []
+        while i < len(lines) and lines[i].strip():
+            line = html.unescape(_TAG.sub("", lines[i])).strip()
+            if line:
+                cue.append(line)
+            i += 1
+        new = [line for line in cue if line not in previous]
+        previous = cue
+        if new:
+            segments.append(
+                TranscriptSegment(
+                    start=_seconds(match.group(1)),
+                    end=_seconds(match.group(2)),
+                    text=" ".join(new),
+                )
+            )
+    return segments
+
+
+def _vtt_url(formats: list[dict]) -> str | None:
+    for fmt in formats:
+        if fmt.get("ext") == "vtt" and fmt.get("url"):
+            return fmt["url"]
+    return None
+
+
+def _matches(key: str, language: str) -> bool:
+    return key == language or key.startswith(f"{language}-")
+
+
+def select_caption_track(info: dict) -> CaptionTrack | None:
+    """Pick a VTT track in the source language: uploaded subtitles, then auto-captions.
+
+    Auto-captions in other languages are machine translations and are never
+    used. Without a known source language, a lone uploaded track or
+    YouTube's original-language ("-orig") auto track is taken.
+    """
+    language = info.get("language")
+    manual = info.get("subtitles") or {}
+    automatic = info.get("automatic_captions") or {}
+
+    if language:
+        manual_keys = [k for k in manual if _matches(k, language)]
+        auto_keys = [f"{language}-orig", language]
+    else:
+        manual_keys = list(manual) if len(manual) == 1 else []
+        auto_keys = [k for k in automatic if k.endswith("-orig")]
+
+    for key in manual_keys:
+        url = _vtt_url(manual[key])
+        if url:
+            return CaptionTrack(language=key, url=url, automatic=False)
+    for key in auto_keys:
+        url = _vtt_url(automatic.get(key, []))
+        if url:
+            return CaptionTrack(language=key, url=url, automatic=True)
+    return None
+
+
+def fetch_transcript(
+    ydl: yt_dlp.YoutubeDL, info: dict, verbose: bool = False
+) -> list[TranscriptSegment] | None:
+    """Download and parse the source-language captions of a probed video.
+
+    Returns None when there is no suitable track or it cannot be fetched;
+    captions are an optimization, so failures never abort the download.
+    """
+    track = select_caption_track(info)
+    if track is None:
+        if verbose:
+            print("  No source-language captions", file=sys.stderr)
+        return None
+    try:
+        with ydl.urlopen(track.url) as response:
+            text = response.read().decode("utf-8", errors="replace")
+    except (yt_dlp.utils.YoutubeDLError, OSError) as e:
+        print(f"  Warning: could not fetch captions: {e}", file=sys.stderr)
+        return None
+    segments = parse_vtt(text)
+    if verbose:
+        kind = "auto-captions" if track.automatic else "subtitles"
+        print(
+            f"  Transcript: {len(segments)} segments from {track.language} {kind}",
+            file=sys.stderr,
+        )
+    return segments or None
+
+
+def format_transcript(
+    segments: list[TranscriptSegment],
+    ranges: list[tuple[float, float]] | None = None,
+    max_chars: int = MAX_TRANSCRIPT_CHARS,
+) -> str:
+    """Render segments as "[m:ss] text" lines, limited to the analyzed ranges."""
+    lines: list[str] = []
+    size = 0
+    for segment in segments:
+        if ranges and not any(segment.start < b and segment.end > a for a, b in ranges):
+            continue
+        minutes, secs = divmod(int(segment.start), 60)
+        line = f"[{minutes}:{secs:02d}] {segment.text}"
+        size += len(line) + 1
+        if size > max_chars:
+            break
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,294 @@
+"""Two-phase generation: one outline call over the video, then concurrent per-scene expansion.
+
+A single plan response grows with the number of scenes, which makes it both
+the latency bottleneck and the usual cause of MAX_TOKENS truncation. Here
+the video call only returns a short outline; each scene's prompts are then
+written by its own small request, so wall time follows the slowest scene.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from google import genai
+from google.genai import errors, types
+from pydantic import BaseModel, ValidationError
+
+from .analyzer import CallUsage, TokenUsage, build_generation_config
+from .archive import ResponseArchive, prompt_fingerprint
+from .context_cache import ContextCache
+from .humanizer import humanize_voiceovers
+from .models import (
+    PlanOutline,
+    Scene,
+    SceneExpansion,
+    SceneOutline,
+    VideoReproductionPlan,
+    compact_schema,
+)
+from .placeholders import expand_placeholders
+from .profiles import Profile
+from .prompts.templates import get_scene_expansion_prompt
+from .validator import validate_and_repair
+
+DEFAULT_EXPANSION_WORKERS = 8
+# Seconds of context kept around a scene when its video part is clipped
+_CLIP_PADDING = 2.0
+_SCENE_DEFECT = re.compile(r"^Scene (\d+):")
+_CONDENSE = (
+    "IMPORTANT: The previous answer was cut off. Keep every field concise so the "
+    "whole response fits."
+)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def _generate_json(
+    client: genai.Client,
+    model: str,
+    contents: list,
+    system_prompt: str,
+    schema: dict,
+    response_model: type[T],
+    token_usage: TokenUsage,
+    usage_lock: threading.Lock,
+    profile: Profile | None = None,
+    cache: ContextCache | None = None,
+    archive: ResponseArchive | None = None,
+    max_retries: int = 2,
+) -> T:
+    """One structured request, retried on server errors and unparseable output.
+
+    A truncated response is retried with a request to keep the answer short.
+    """
+    error: Exception | None = None
+    for _ in range(max_retries + 1):
+        if cache is not None:
+            cache.keep_alive()
+        started = time.monotonic()
+        try:
+            response = client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=build_generation_config(
+                    system_prompt,
+                    schema,
+                    cached_content=cache.name if cache else None,
+                    model=model,
+                    profile=profile,
+                ),
+            )
+        except errors.ServerError as e:
+            # Quota and auth errors propagate so the key pool can act on them
+            error = e
+            print(f"  {response_model.__name__} request failed, retrying: {e}", file=sys.stderr)
+            continue
+        with usage_lock:
+            token_usage.add(response, model=model, latency_seconds=time.monotonic() - started)
+            call = token_usage.calls[-1]
+        finish_reason = None
+        if response.candidates and response.candidates[0].finish_reason:
+            finish_reason = str(response.candidates[0].finish_reason)
+        if archive is not None:
+            archive.record(
+                response.text,
+                call,
+                prompt_fingerprint(system_prompt, schema, contents),
+                finish_reason=finish_reason,
+                response_model=response_model.__name__,
+            )
+        try:
+            return response_model.model_validate_json(response.text or "")
+        except ValidationError as e:
+            error = e
+        if finish_reason and ("MAX_TOKENS" in finish_reason or "LENGTH" in finish_reason):
+            print(f"  {response_model.__name__} truncated, retrying condensed", file=sys.stderr)
+            last = contents[-1]
+            if last.parts[-1].text != _CONDENSE:
+                condensed = types.Content(
+                    role=last.role, parts=[*last.parts, types.Part.from_text(text=_CONDENSE)]
+                )
+                contents = [*contents[:-1], condensed]
+        else:
+            print(f"  {response_model.__name__} parse error, retrying: {error}", file=sys.stderr)
+    raise RuntimeError(
+        f"Failed to get a valid {response_model.__name__} after {max_retries + 1} attempts: {error}"
+    ) from error
+
+
+def _assemble(outline: PlanOutline, expansions: dict[int, SceneExpansion]) -> VideoReproductionPlan:
+    scenes = []
+    for entry in outline.scenes:
+        expansion = expansions[entry.scene_number]
+        scenes.append(
+            Scene(
+                scene_number=entry.scene_number,
+                duration_seconds=entry.duration_seconds,
+                generation_method=entry.generation_method,
+                video_prompt=expansion.video_prompt,
+                video_extend_prompt=expansion.video_extend_prompt,
+                t2i_prompt=expansion.t2i_prompt,
+                voiceover_text=expansion.voiceover_text,
+                title_card_text=entry.title_card_text,
+                scene_description=entry.scene_description,
+            )
+        )
+    return VideoReproductionPlan(
+        title=outline.title,
+        description=outline.description,
+        metadata_tags=outline.metadata_tags,
+        target_language=outline.target_language,
+        viral_structure_notes=outline.viral_structure_notes,
+        characters=outline.characters,
+        scenes=scenes,
+        cover_t2i_prompt=outline.cover_t2i_prompt,
+    )
+
+
+def generate_two_phase(
+    client: genai.Client,
+    model: str,
+    system_prompt: str,
+    outline_prompt: str,
+    mode: str,
+    target_language: str,
+    style: str,
+    media_parts: list,
+    token_usage: TokenUsage,
+    clip: Callable[[float, float], list] | None = None,
+    duration: float | None = None,
+    profile: Profile | None = None,
+    cache: ContextCache | None = None,
+    max_workers: int = DEFAULT_EXPANSION_WORKERS,
+    verbose: bool = False,
+    archive: ResponseArchive | None = None,
+) -> VideoReproductionPlan:
+    """Outline the video, expand every scene concurrently and assemble the plan.
+
+    Scene requests reuse the uploaded media: through the context ``cache``
+    when there is one, else as a part clipped to the scene by ``clip(start,
+    end)`` within ``duration`` (of the uploaded video), else the full
+    ``media_parts``. Scenes left with defects after
+    local repair are expanded once more with the defects listed.
+    """
+    usage_lock = threading.Lock()
+    token_usage.route.append(model)
+    request_media = [] if cache is not None else media_parts
+
+    outline = _generate_json(
+        client,
+        model,
+        [types.Content(parts=[*request_media, types.Part.from_text(text=outline_prompt)])],
+        system_prompt,
+        compact_schema(PlanOutline, mode),
+        PlanOutline,
+        token_usage,
+        usage_lock,
+        profile=profile,
+        cache=cache,
+        archive=archive,
+    )
+    if not outline.scenes:
+        raise RuntimeError("The outline has no scenes")
+    for i, entry in enumerate(outline.scenes, start=1):
+        entry.scene_number = i
+    print(
+        f"  Outline: {len(outline.scenes)} scenes, expanding with up to "
+        f"{max_workers} concurrent requests...",
+        file=sys.stderr,
+    )
+
+    outline_json = outline.model_dump_json()
+    expansion_schema = compact_schema(SceneExpansion, mode)
+
+    def expand(entry: SceneOutline, defects: list[str] | None = None) -> SceneExpansion:
+        if cache is not None:
+            parts, clipped = [], False
+        elif clip is not None:
+            start = max(0.0, entry.start_seconds - _CLIP_PADDING)
+            end = entry.end_seconds + _CLIP_PADDING
+            if duration:
+                end = min(end, duration)
+                start = min(start, max(0.0, end - 2 * _CLIP_PADDING))
+            parts, clipped = clip(start, end), True
+        else:
+            parts, clipped = media_parts, False
+        prompt = get_scene_expansion_prompt(
+            outline_json,
+            entry.scene_number,
+            target_language,
+            style=style,
+            clipped=clipped,
+            defects=defects,
+        )
+        return _generate_json(
+            client,
+            model,
+            [types.Content(parts=[*parts, types.Part.from_text(text=prompt)])],
+            system_prompt,
+            expansion_schema,
+            SceneExpansion,
+            token_usage,
+            usage_lock,
+            profile=profile,
+            cache=cache,
+            archive=archive,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        expanded = list(pool.map(expand, outline.scenes))
+    expansions = {entry.scene_number: e for entry, e in zip(outline.scenes, expanded)}
+
+    plan = _assemble(outline, expansions)
+    notes = expand_placeholders(plan, style)
+    if verbose and notes:
+        print(f"  Placeholders: {'; '.join(notes)}", file=sys.stderr)
+    plan = humanize_voiceovers(plan)
+    report = validate_and_repair(plan)
+    if verbose and report.repairs:
+        print(f"  Repaired locally: {'; '.join(report.repairs)}", file=sys.stderr)
+
+    # Re-expand only the scenes whose defects need the model
+    by_scene: dict[int, list[str]] = {}
+    for defect in report.defects:
+        match = _SCENE_DEFECT.match(defect)
+        if match:
+            by_scene.setdefault(int(match.group(1)), []).append(defect)
+    if by_scene:
+        print(f"  Re-expanding {len(by_scene)} scene(s) with issues...", file=sys.stderr)
+        entries = {entry.scene_number: entry for entry in outline.scenes}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                n: pool.submit(expand, entries[n], defects) for n, defects in by_scene.items()
+            }
+            for n, future in futures.items():
+                expansions[n] = future.result()
+        # Durations may have been repaired above; keep them
+        repaired = {scene.scene_number: scene.duration_seconds for scene in plan.scenes}
+        for entry in outline.scenes:
+            entry.duration_seconds = repaired[entry.scene_number]
+        plan = _assemble(outline, expansions)
+        expand_placeholders(plan, style)
+        plan = humanize_voiceovers(plan)
+        report = validate_and_repair(plan)
+
+    if archive is not None:
+        # The parts are archived above; this record lets reprocessing rebuild the plan
+        archive.record(
+            _assemble(outline, expansions).model_dump_json(),
+            CallUsage(model=model),
+            prompt_fingerprint(system_prompt, {}, []),
+            finish_reason="ASSEMBLED",
+        )
+    if not report.ok:
+        print(
+            f"  Returning plan with unresolved issues: {' '.join(report.defects)}",
+            file=sys.stderr,
+        )
+    return plan
@@ -0,0 +1,368 @@
+"""Resumable chunked uploads to the Gemini Files API.
+
+Implements the resumable upload protocol directly (start, chunked
+"upload" commands, "query" to learn the committed offset) so a dropped
+connection resumes from the last committed byte instead of starting over.
+Session URLs are persisted, so a rerun of an interrupted process resumes too.
+"""
+
+from __future__ import annotations
+
+import json
+import mimetypes
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import httpx
+from google.genai import types
+
+from .config import Config
+from .keypool import key_id
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+# Chunks other than the last must be a multiple of this
+CHUNK_GRANULARITY = 256 * 1024
+# Upload sessions are discarded by the server after a while; don't try older ones
+_SESSION_MAX_AGE_SECONDS = 24 * 3600
+# Bytes written per progress event
+_PROGRESS_STEP = 64 * 1024
+# Files listed per page, and pages searched, when looking up a completed upload
+_LIST_PAGE_SIZE = 100
+_LIST_MAX_PAGES = 5
+
+# Called with (bytes sent, total bytes)
+ProgressCallback = Callable[[int, int], None]
+
+
+class UploadError(RuntimeError):
+    """The upload failed; its session is kept when it can still be resumed."""
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        # HTTP status of the failing response, when there was one
+        self.status_code = status_code
+
+
+class UploadSessions:
+    """Upload session URLs by file identity, persisted as JSON."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @staticmethod
+    def key(path: Path) -> str:
+        stat = path.stat()
+        return f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, sessions: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(sessions, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def get(self, key: str) -> str | None:
+        entry = self._load().get(key)
+        if not entry or time.time() - entry["created"] > _SESSION_MAX_AGE_SECONDS:
+            return None
+        return entry["url"]
+
+    def put(self, key: str, url: str) -> None:
+        now = time.time()
+        sessions = {
+            k: v for k, v in self._load().items() if now - v["created"] <= _SESSION_MAX_AGE_SECONDS
+        }
+        sessions[key] = {"url": url, "created": now}
+        self._save(sessions)
+
+    def drop(self, key: str) -> None:
+        sessions = self._load()
+        if sessions.pop(key, None) is not None:
+            self._save(sessions)
+
+
+def progress_printer(label: str = "Uploading", step: float = 0.1) -> ProgressCallback:
+    """A callback printing progress to stderr every ``step`` of the file."""
+    reported = {"fraction": 0.0}
+
+    def report(sent: int, total: int) -> None:
+        fraction = sent / total if total else 1.0
+        if fraction < 1.0 and fraction - reported["fraction"] < step:
+            return
+        if fraction < reported["fraction"]:
+            # Resumed from an earlier offset
+            reported["fraction"] = fraction
+            return
+        reported["fraction"] = fraction
+        print(
+            f"  {label}: {fraction:.0%} ({sent / 1048576:.1f}/{total / 1048576:.1f} MB)",
+            file=sys.stderr,
+        )
+
+    return report
+
+
+class ResumableUploader:
+    def __init__(
+        self,
+        api_key: str,
+        chunk_size: int = 8 * 1024 * 1024,
+        sessions: UploadSessions | None = None,
+        base_url: str = DEFAULT_BASE_URL,
+        max_retries: int = 5,
+        timeout: float = 120.0,
+    ) -> None:
+        self.api_key = api_key
+        aligned = chunk_size // CHUNK_GRANULARITY * CHUNK_GRANULARITY
+        self.chunk_size = max(CHUNK_GRANULARITY, aligned)
+        self.sessions = sessions
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+    def _start(self, http: httpx.Client, path: Path, size: int, mime_type: str) -> str:
+        """Open a new upload session and return its URL.
+
+        Transport errors, 408/429 and 5xx responses are retried with backoff.
+        """
+        failures = 0
+        while True:
+            try:
+                response = http.post(
+                    f"{self.base_url}/upload/v1beta/files",
+                    headers={
+                        "x-goog-api-key": self.api_key,
+                        "X-Goog-Upload-Protocol": "resumable",
+                        "X-Goog-Upload-Command": "start",
+                        "X-Goog-Upload-Header-Content-Length": str(size),
+                        "X-Goog-Upload-Header-Content-Type": mime_type,
+                    },
+                    json={"file": {"display_name": path.name}},
+                )
+            except httpx.TransportError as e:
+                error, status_code = f"{type(e).__name__}: {e}", None
+            else:
+                url = response.headers.get("x-goog-upload-url")
+                if response.status_code == 200 and url:
+                    return url
+                status_code = response.status_code
+                if status_code == 200 or (status_code not in (408, 429) and status_code < 500):
+                    raise UploadError(
+                        f"Could not start upload ({status_code}): {response.text[:200]}",
+                        status_code=status_code,
+                    )
+                error = f"HTTP {status_code}"
+            failures += 1
+            if failures > self.max_retries:
+                raise UploadError(
+                    f"Could not start upload after {self.max_retries} retries ({error})",
+                    status_code=status_code,
+                )
+            delay = min(2**failures, 30)
+            print(f"  Upload start failed ({error}), retrying in {delay}s...", file=sys.stderr)
+            time.sleep(delay)
+
+    def _query(self, http: httpx.Client, url: str) -> tuple[str, int, httpx.Response] | None:
+        """(status, bytes received, response) of a session, or None if it is gone.
+
+        Transport errors are retried; the session is still valid, so giving
+        up raises instead of starting over.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = http.post(
+                    url,
+                    headers={"x-goog-api-key": self.api_key, "X-Goog-Upload-Command": "query"},
+                )
+                break
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise UploadError(
+                        f"Could not reach the upload session ({e}); rerun to resume"
+                    ) from e
+                time.sleep(min(2 ** (attempt + 1), 30))
+        status = response.headers.get("x-goog-upload-status")
+        if response.status_code != 200 or status not in ("active", "final"):
+            return None
+        return status, int(response.headers.get("x-goog-upload-size-received", 0)), response
+
+    def _send_chunk(
+        self,
+        http: httpx.Client,
+        url: str,
+        data: bytes,
+        offset: int,
+        size: int,
+        on_progress: ProgressCallback | None,
+    ) -> httpx.Response:
+        last = offset + len(data) >= size
+
+        def body():
+            for i in range(0, len(data), _PROGRESS_STEP):
+                piece = data[i : i + _PROGRESS_STEP]
+                yield piece
+                if on_progress is not None:
+                    on_progress(offset + i + len(piece), size)
+
+        return http.post(
+            url,
+            headers={
+                "x-goog-api-key": self.api_key,
+                "Content-Length": str(len(data)),
+                "X-Goog-Upload-Offset": str(offset),
+                "X-Goog-Upload-Command": "upload, finalize" if last else "upload",
+            },
+            content=body(),
+        )
+
+    @staticmethod
+    def _file(response: httpx.Response) -> types.File:
+        try:
+            return types.File.model_validate(response.json()["file"])
+        except (ValueError, KeyError) as e:
+            raise UploadError(f"Unexpected upload response: {response.text[:200]}") from e
+
+    def upload(
+        self,
+        path: Path,
+        mime_type: str | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> types.File:
+        """Upload ``path`` and return its File resource (not yet ACTIVE).
+
+        Transport errors, 408/429 and 5xx responses are retried with backoff
+        from the offset the server reports; a persisted session for the same
+        file (path, size and mtime) is resumed instead of starting over.
+        """
+        size = path.stat().st_size
+        mime_type = mime_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        # Sessions belong to the key that started them, like the files they create
+        key = f"{key_id(self.api_key)}:{UploadSessions.key(path)}"
+
+        with httpx.Client(timeout=self.timeout) as http, open(path, "rb") as f:
+            url = self.sessions.get(key) if self.sessions else None
+            offset = 0
+            if url:
+                state = self._query(http, url)
+                if state is None:
+                    url = None
+                elif state[0] == "final":
+                    return self._completed(http, key, state[2], path.name, size)
+                else:
+                    offset = state[1]
+                    print(f"  Resuming upload at {offset / 1048576:.1f} MB", file=sys.stderr)
+            if url is None:
+                url = self._start(http, path, size, mime_type)
+                if self.sessions:
+                    self.sessions.put(key, url)
+
+            failures = 0
+            while True:
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                try:
+                    response = self._send_chunk(http, url, data, offset, size, on_progress)
+                except httpx.TransportError as e:
+                    error, status_code = f"{type(e).__name__}: {e}", None
+                else:
+                    if response.status_code == 200:
+                        if offset + len(data) >= size:
+                            return self._finish(key, response)
+                        offset += len(data)
+                        failures = 0
+                        continue
+                    if response.status_code not in (408, 429) and response.status_code < 500:
+                        if self.sessions:
+                            self.sessions.drop(key)
+                        raise UploadError(
+                            f"Upload rejected ({response.status_code}): {response.text[:200]}",
+                            status_code=response.status_code,
+                        )
+                    error = f"HTTP {response.status_code}"
+                    status_code = response.status_code
+
+                failures += 1
+                if failures > self.max_retries:
+                    raise UploadError(
+                        f"Upload failed after {self.max_retries} retries ({error}); "
+                        "rerun to resume from the last committed offset",
+                        status_code=status_code,
+                    )
+                delay = min(2**failures, 30)
+                print(f"  Upload interrupted ({error}), retrying in {delay}s...", file=sys.stderr)
+                time.sleep(delay)
+                state = self._query(http, url)
+                if state is None:
+                    # The session is gone; start a new one from the beginning
+                    url, offset = self._start(http, path, size, mime_type), 0
+                    if self.sessions:
+                        self.sessions.put(key, url)
+                elif state[0] == "final":
+                    return self._completed(http, key, state[2], path.name, size)
+                else:
+                    offset = state[1]
+
+    def _finish(self, key: str, response: httpx.Response) -> types.File:
+        if self.sessions:
+            self.sessions.drop(key)
+        return self._file(response)
+
+    def _completed(
+        self, http: httpx.Client, key: str, response: httpx.Response, name: str, size: int
+    ) -> types.File:
+        """File of a session a query reports as final.
+
+        The query response need not carry the file resource; the file is
+        then looked up by display name and size.
+        """
+        if self.sessions:
+            self.sessions.drop(key)
+        try:
+            return self._file(response)
+        except UploadError:
+            file = self._find_file(http, name, size)
+        if file is None:
+            raise UploadError(f"Upload of {name} completed but its file was not found")
+        return file
+
+    def _find_file(self, http: httpx.Client, name: str, size: int) -> types.File | None:
+        """The newest file named ``name`` of ``size`` bytes, from the Files API."""
+        matches: list[types.File] = []
+        params = {"pageSize": str(_LIST_PAGE_SIZE)}
+        for _ in range(_LIST_MAX_PAGES):
+            response = http.get(
+                f"{self.base_url}/v1beta/files",
+                headers={"x-goog-api-key": self.api_key},
+                params=params,
+            )
+            if response.status_code != 200:
+                raise UploadError(
+                    f"Could not list files ({response.status_code}): {response.text[:200]}",
+                    status_code=response.status_code,
+                )
+            page = response.json()
+            for entry in page.get("files", []):
+                file = types.File.model_validate(entry)
+                if file.display_name == name and file.size_bytes == size:
+                    matches.append(file)
+            if not page.get("nextPageToken"):
+                break
+            params["pageToken"] = page["nextPageToken"]
+        if not matches:
+            return None
+        return max(matches, key=lambda f: f.create_time.timestamp() if f.create_time else 0)
+
+
+def open_uploader(config: Config) -> ResumableUploader:
+    return ResumableUploader(
+        config.gemini_api_key,
+        chunk_size=config.upload_chunk_mb * 1024 * 1024,
+        sessions=UploadSessions(config.data_dir / "upload-sessions.json"),
+    )
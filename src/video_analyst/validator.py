@@ -0,0 +1,138 @@
+"""Deterministic validation and local repair of parsed reproduction plans.
+
+Most constraint violations (durations off the 8/16/24 grid, stale totals,
+bad numbering) are fixed here for free. Only defects that need new content
+from the model are reported back so the caller can retry.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from .models import VideoReproductionPlan
+
+ALLOWED_DURATIONS = (8, 16, 24)
+
+# Typical narration pace in words per second
+WORD_RATES = {
+    "en": 2.5,
+    "es": 2.8,
+    "fr": 2.7,
+    "de": 2.2,
+    "it": 2.7,
+    "pt": 2.6,
+    "vi": 2.9,
+    "id": 2.4,
+    "ru": 2.2,
+    "tr": 2.1,
+}
+# Languages written without spaces: characters (or syllable blocks) per second
+CHAR_RATES = {
+    "ja": 7.0,
+    "zh": 4.5,
+    "ko": 5.5,
+    "th": 6.0,
+}
+DEFAULT_WORD_RATE = 2.5
+# Voiceover may run this much past the scene before it counts as too long
+_OVERRUN_TOLERANCE = 1.1
+
+
+@dataclass
+class ValidationReport:
+    repairs: list[str] = field(default_factory=list)
+    defects: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.defects
+
+
+def estimate_speech_seconds(text: str, language: str) -> float:
+    """Estimate how long ``text`` takes to narrate in ``language``."""
+    lang = language.lower().split("-")[0]
+    if lang in CHAR_RATES:
+        chars = len(re.sub(r"[\s\W]", "", text))
+        return chars / CHAR_RATES[lang]
+    words = len(text.split())
+    return words / WORD_RATES.get(lang, DEFAULT_WORD_RATE)
+
+
+def _snap_duration(duration: int, min_seconds: float) -> int:
+    """Nearest allowed duration that still fits ``min_seconds`` of voiceover."""
+    fitting = [d for d in ALLOWED_DURATIONS if d >= min_seconds / _OVERRUN_TOLERANCE]
+    if not fitting:
+        return ALLOWED_DURATIONS[-1]
+    return min(fitting, key=lambda d: (abs(d - duration), d))
+
+
+def validate_and_repair(plan: VideoReproductionPlan) -> ValidationReport:
+    """Fix locally repairable constraint violations in place and report the rest.
+
+    Run it on humanized voiceovers: speech estimates and durations follow the text.
+    """
+    report = ValidationReport()
+
+    if not plan.scenes:
+        report.defects.append("The plan has no scenes.")
+        return report
+
+    numbers = [scene.scene_number for scene in plan.scenes]
+    if numbers != list(range(1, len(plan.scenes) + 1)):
+        for i, scene in enumerate(plan.scenes, start=1):
+            scene.scene_number = i
+        report.repairs.append(f"renumbered scenes (were {numbers})")
+
+    for scene in plan.scenes:
+        n = scene.scene_number
+        speech = estimate_speech_seconds(scene.voiceover_text, plan.target_language)
+        scene.voiceover_duration_estimate_seconds = round(speech, 1)
+
+        if scene.duration_seconds not in ALLOWED_DURATIONS:
+            snapped = _snap_duration(scene.duration_seconds, speech)
+            report.repairs.append(
+                f"scene {n}: duration {scene.duration_seconds}s snapped to {snapped}s"
+            )
+            scene.duration_seconds = snapped
+
+        if speech > scene.duration_seconds * _OVERRUN_TOLERANCE:
+            needed = _snap_duration(scene.duration_seconds, speech)
+            if needed > scene.duration_seconds and scene.video_extend_prompt:
+                report.repairs.append(
+                    f"scene {n}: duration {scene.duration_seconds}s raised to {needed}s "
+                    f"to fit {speech:.0f}s of voiceover"
+                )
+                scene.duration_seconds = needed
+            if speech > scene.duration_seconds * _OVERRUN_TOLERANCE:
+                report.defects.append(
+                    f"Scene {n}: voiceover takes ~{speech:.0f}s but the scene is "
+                    f"{scene.duration_seconds}s. Shorten voiceover_text."
+                )
+
+        if scene.duration_seconds == 8 and scene.video_extend_prompt:
+            scene.video_extend_prompt = ""
+            report.repairs.append(f"scene {n}: cleared video_extend_prompt on 8s scene")
+        elif scene.duration_seconds > 8 and not scene.video_extend_prompt.strip():
+            report.defects.append(
+                f"Scene {n}: the scene is {scene.duration_seconds}s but video_extend_prompt "
+                "is empty. Write the extension prompt."
+            )
+
+        if scene.generation_method == "t2i_i2v" and not scene.t2i_prompt.strip():
+            report.defects.append(
+                f"Scene {n}: generation_method is 't2i_i2v' but t2i_prompt is empty. "
+                "Write the reference image prompt."
+            )
+
+        if not scene.video_prompt.strip():
+            report.defects.append(f"Scene {n}: video_prompt is empty.")
+
+    total = sum(scene.duration_seconds for scene in plan.scenes)
+    if plan.total_duration_seconds != total:
+        report.repairs.append(
+            f"total_duration_seconds {plan.total_duration_seconds} recomputed to {total}"
+        )
+        plan.total_duration_seconds = total
+
+    return report
@@ -0,0 +1,161 @@
+"""Queue worker: leases jobs and runs the download/analyze pipeline."""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import httpx
+from google.genai import errors
+
+from .analyzer import AnalysisResult
+from .config import Config
+from .downloader import AdmissionRejected
+from .formatter import format_output
+from .jobqueue import Job, JobQueue
+from .keypool import KeyPool, PooledKey
+from .ledger import BudgetExceeded
+from .pipeline import run_pipeline
+
+# Failures worth another attempt: download, upload, API and I/O errors
+_RETRYABLE = (RuntimeError, OSError, errors.APIError, httpx.HTTPError)
+
+
+class _Heartbeat(threading.Thread):
+    """Extends a job's lease in the background while the pipeline runs."""
+
+    def __init__(self, queue: JobQueue, job: Job, worker_id: str) -> None:
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = queue.visibility_timeout / 3
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            if not self.queue.heartbeat(self.job.id, self.worker_id):
+                self.lost = True
+                print(f"  Job {self.job.id}: lease lost", file=sys.stderr)
+                return
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def process_job(
+    job: Job, config: Config, verbose: bool = False, keys: KeyPool | None = None
+) -> dict:
+    """Run one job's pipeline and write its output. Returns the job result.
+
+    With ``keys``, the job runs on the least busy key of the pool.
+    """
+    payload = job.payload
+    style = payload.get("style", "realistic")
+
+    def run(key: PooledKey | None) -> AnalysisResult:
+        return run_pipeline(
+            payload["url"],
+            dataclasses.replace(config, gemini_api_key=key.api_key) if key else config,
+            mode=payload.get("mode", "full"),
+            lang=payload.get("lang", "en"),
+            style=style,
+            input_mode=payload.get("input_mode", "video"),
+            verbose=verbose,
+            client=key.client if key else None,
+        )
+
+    analysis = keys.run(run) if keys is not None else run(None)
+    output = Path(payload["output"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        format_output(analysis.plan, payload.get("format", "json"), style=style),
+        encoding="utf-8",
+    )
+    tokens = analysis.token_usage
+    return {
+        "output": str(output),
+        "scenes": len(analysis.plan.scenes),
+        "total_tokens": tokens.total_tokens,
+        "cost_usd": round(tokens.cost_usd(config.model_name), 6),
+    }
+
+
+def run_worker(
+    queue: JobQueue,
+    config: Config,
+    worker_id: str | None = None,
+    idle_sleep: float = 5.0,
+    once: bool = False,
+    verbose: bool = False,
+) -> int:
+    """Lease and run jobs until interrupted. Returns the number of jobs handled.
+
+    With ``once``, exit as soon as the queue has no ready job.
+    """
+    worker_id = worker_id or default_worker_id()
+    # Processes begin on different keys; cooldowns are tracked per process
+    keys = KeyPool.from_config(config, start=os.getpid())
+    handled = 0
+    print(f"Worker {worker_id} polling {queue.path}", file=sys.stderr)
+
+    while True:
+        job = queue.lease(worker_id)
+        if job is None:
+            if once:
+                return handled
+            time.sleep(idle_sleep)
+            continue
+
+        print(
+            f"\n=== Job {job.id} (attempt {job.attempts}/{job.max_attempts}): "
+            f"{job.payload.get('url')}",
+            file=sys.stderr,
+        )
+        heartbeat = _Heartbeat(queue, job, worker_id)
+        heartbeat.start()
+        try:
+            result = process_job(job, config, verbose=verbose, keys=keys)
+        except KeyboardInterrupt:
+            heartbeat.stop()
+            queue.release(job.id, worker_id)
+            raise
+        except BudgetExceeded as e:
+            # Nothing more can run until the budget resets; leave the job for later
+            heartbeat.stop()
+            queue.release(job.id, worker_id)
+            print(f"  {e}. Worker stopping.", file=sys.stderr)
+            return handled
+        except AdmissionRejected as e:
+            heartbeat.stop()
+            queue.fail(job.id, worker_id, str(e), retry=False)
+            print(f"  Job {job.id} rejected: {e}", file=sys.stderr)
+        except _RETRYABLE as e:
+            heartbeat.stop()
+            status = queue.fail(job.id, worker_id, f"{type(e).__name__}: {e}")
+            print(f"  Job {job.id} failed ({status}): {e}", file=sys.stderr)
+        except Exception as e:  # noqa: BLE001 - one bad job must not stop the worker
+            # Likely a bug: retrying would fail the same way
+            heartbeat.stop()
+            traceback.print_exc(file=sys.stderr)
+            queue.fail(job.id, worker_id, f"{type(e).__name__}: {e}", retry=False)
+            print(f"  Job {job.id} dead-lettered after an unexpected error", file=sys.stderr)
+        else:
+            heartbeat.stop()
+            if queue.complete(job.id, worker_id, result):
+                print(f"  Job {job.id} done -> {result['output']}", file=sys.stderr)
+            else:
+                print(f"  Job {job.id} finished after its lease was lost", file=sys.stderr)
+        handled += 1
@@ -0,0 +1,171 @@
+import json
+from pathlib import Path
+
+import pytest
+from google.genai import errors, types
+
+from video_analyst import batch
+from video_analyst.analyzer import TokenUsage
+from video_analyst.config import Config
+from video_analyst.downloader import DownloadResult
+from video_analyst.models import CharacterProfile, Scene, VideoReproductionPlan
+
+URLS = [
+    "https://www.youtube.com/watch?v=aaaaaaaaaaa",
+    "https://www.youtube.com/watch?v=bbbbbbbbbbb",
+    "https://www.youtube.com/watch?v=ccccccccccc",
+    # Same video as the first URL
+    "https://youtu.be/aaaaaaaaaaa",
+]
+
+
+def _plan() -> VideoReproductionPlan:
+    return VideoReproductionPlan(
+        title="Test",
+        description="A test plan",
+        metadata_tags=["#test"],
+        target_language="en",
+        viral_structure_notes="Hook, arc, payoff",
+        characters=[
+            CharacterProfile(
+                character_name="Ana",
+                character_description="A woman in a red coat",
+                t2i_reference_prompt="Reference sheet of a woman in a red coat",
+            )
+        ],
+        scenes=[
+            Scene(
+                scene_number=1,
+                duration_seconds=8,
+                generation_method="t2v",
+                video_prompt="A street at dusk, slow dolly in",
+                video_extend_prompt="",
+                t2i_prompt="",
+                voiceover_text="It started on an ordinary evening.",
+                scene_description="Opening shot",
+            )
+        ],
+        cover_t2i_prompt="A street at dusk",
+    )
+
+
+def _respond(request: types.InlinedRequest) -> types.GenerateContentResponse:
+    video_id = request.contents[0].parts[0].file_data.file_uri.rsplit("/", 1)[-1]
+    if video_id == "bbbbbbbbbbb":
+        raise errors.APIError(500, {"error": {"message": "backend error"}})
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=_plan().model_dump_json())]
+                ),
+                finish_reason=types.FinishReason.STOP,
+            )
+        ],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=1000, candidates_token_count=200, total_token_count=1200
+        ),
+    )
+
+
+@pytest.fixture
+def stubbed_media(monkeypatch, tmp_path):
+    """Replace downloads and uploads; the third video is routed to summary mode."""
+
+    def download_video(url, output_dir, mode="full", **kwargs):
+        video_id = url.rsplit("=", 1)[-1]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"{video_id}.mp4"
+        path.write_bytes(b"\0" * 16)
+        return DownloadResult(
+            video_path=path,
+            title=f"Video {video_id}",
+            duration=30,
+            description="",
+            platform="youtube",
+            original_url=url,
+            mode="summary" if video_id == "ccccccccccc" else None,
+        )
+
+    def upload_and_wait(client, path, verbose=False, uploader=None):
+        return types.File(
+            name=f"files/{path.stem}",
+            uri=f"https://example.invalid/files/{path.stem}",
+            mime_type="video/mp4",
+        )
+
+    monkeypatch.setattr(batch, "download_video", download_video)
+    monkeypatch.setattr(batch, "upload_and_wait", upload_and_wait)
+    return Config(
+        gemini_api_key="test-key",
+        download_dir=tmp_path / "downloads",
+        data_dir=tmp_path / "data",
+    )
+
+
+def test_prepare_submit_collect(stubbed_media, tmp_path):
+    config = stubbed_media
+    out_dir = tmp_path / "plans"
+    out_dir.mkdir()
+
+    state, requests = batch.prepare_batch(
+        URLS,
+        out_dir,
+        config,
+        client=None,
+        mode="full",
+        target_language="en",
+        style="cinematic",
+        fmt="json",
+    )
+    assert len(requests) == 3
+    assert [item.duplicate_of for item in state.items] == [None, None, None, 0]
+    assert [item.mode for item in state.items] == ["full", "full", "summary", None]
+    assert state.items[2].prompt_fingerprint != state.prompt_fingerprint
+    # Downloads are deleted once uploaded
+    assert not list(config.download_dir.iterdir())
+
+    backend = batch.LocalBatchBackend(_respond, polls_until_done=2)
+    state.job_name = backend.create(config.model_name, requests, display_name="test")
+    state_path = out_dir / "batch-state.json"
+    state.save(state_path)
+
+    # Collect from the saved state, as a resumed run would
+    state = batch.BatchState.load(state_path)
+    assert batch.wait_for_batch(backend, state.job_name, initial_interval=0) == (
+        "JOB_STATE_SUCCEEDED"
+    )
+    tokens = TokenUsage()
+    written = batch.collect_batch_results(backend, state, tokens, archive_dir=tmp_path / "archive")
+
+    assert written == 3
+    assert tokens.prompt_tokens == 2000
+    first, failed, routed, duplicate = state.items
+    assert first.error is None and routed.error is None and duplicate.error is None
+    assert failed.error.startswith("Batch request failed:")
+    assert json.loads(Path(first.output_path).read_text())["title"] == "Test"
+    assert Path(duplicate.output_path).read_text() == Path(first.output_path).read_text()
+    assert Path(routed.output_path).exists()
+    assert not Path(failed.output_path).exists()
+
+
+def test_collect_records_unparseable_response(stubbed_media, tmp_path):
+    state, requests = batch.prepare_batch(
+        URLS[:1],
+        tmp_path,
+        stubbed_media,
+        client=None,
+        mode="full",
+        target_language="en",
+        style="cinematic",
+        fmt="json",
+    )
+
+    def truncated(request):
+        content = types.Content(role="model", parts=[types.Part(text='{"ti')])
+        return types.GenerateContentResponse(candidates=[types.Candidate(content=content)])
+
+    backend = batch.LocalBatchBackend(truncated)
+    state.job_name = backend.create(state.model, requests, display_name="test")
+    assert batch.collect_batch_results(backend, state, TokenUsage()) == 0
+    assert state.items[0].error.startswith("Failed to parse response:")
@@ -0,0 +1,279 @@
+import json
+import os
+import re
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from video_analyst import upload
+from video_analyst.upload import CHUNK_GRANULARITY, ResumableUploader, UploadError, UploadSessions
+
+
+class FakeUploadServer(ThreadingHTTPServer):
+    """Local stand-in for the Gemini resumable upload endpoints.
+
+    Failures are scripted per upload request, in order: ``("drop", n)`` reads
+    ``n`` bytes of the chunk, commits the 256 KiB-aligned part and cuts the
+    connection; an int answers with that status code; ``"drop-after"``
+    processes the chunk and cuts the connection instead of answering.
+    ``start_script`` does the same for start requests, with ``"drop"`` cutting
+    the connection before answering.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.script: list = []
+        self.start_script: list = []
+        self.starts = 0
+        self.sessions: dict[str, bytearray] = {}
+        self.final: set[str] = set()
+        # Whether query responses for final sessions carry the file resource
+        self.query_includes_file = True
+        self.display_name = ""
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def file_resource(self, session: str) -> dict:
+        return {
+            "name": f"files/{session}",
+            "displayName": self.display_name,
+            "mimeType": "video/mp4",
+            "sizeBytes": str(len(self.sessions[session])),
+            "createTime": "2026-10-19T00:00:00Z",
+            "state": "PROCESSING",
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeUploadServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict | None = None, headers: dict | None = None):
+        payload = json.dumps(body or {}).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _cut(self):
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_GET(self):
+        assert self.path.startswith("/v1beta/files")
+        files = [self.server.file_resource(s) for s in sorted(self.server.final)]
+        self._reply(200, {"files": files})
+
+    def do_POST(self):
+        server = self.server
+        command = self.headers.get("X-Goog-Upload-Command", "")
+        if self.path == "/upload/v1beta/files":
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            step = server.start_script.pop(0) if server.start_script else None
+            if step == "drop":
+                self._cut()
+                return
+            if isinstance(step, int):
+                self._reply(step, {"error": {"code": step}})
+                return
+            server.display_name = body["file"]["display_name"]
+            server.starts += 1
+            session = str(server.starts)
+            server.sessions[session] = bytearray()
+            self._reply(200, headers={"X-Goog-Upload-URL": f"{server.base_url}/session/{session}"})
+            return
+
+        session = re.fullmatch(r"/session/(\d+)", self.path).group(1)
+        received = server.sessions[session]
+        if command == "query":
+            final = session in server.final
+            body = {}
+            if final and server.query_includes_file:
+                body = {"file": server.file_resource(session)}
+            self._reply(
+                200,
+                body,
+                headers={
+                    "X-Goog-Upload-Status": "final" if final else "active",
+                    "X-Goog-Upload-Size-Received": str(len(received)),
+                },
+            )
+            return
+
+        length = int(self.headers["Content-Length"])
+        assert int(self.headers["X-Goog-Upload-Offset"]) == len(received)
+        step = server.script.pop(0) if server.script else None
+        if isinstance(step, tuple):
+            partial = self.rfile.read(min(step[1], length))
+            received += partial[: len(partial) // CHUNK_GRANULARITY * CHUNK_GRANULARITY]
+            self._cut()
+            return
+        data = self.rfile.read(length)
+        if isinstance(step, int):
+            self._reply(step, {"error": {"code": step}})
+            return
+        received += data
+        if command == "upload, finalize":
+            server.final.add(session)
+            if step == "drop-after":
+                self._cut()
+                return
+            self._reply(
+                200, {"file": server.file_resource(session)}, {"X-Goog-Upload-Status": "final"}
+            )
+        else:
+            if step == "drop-after":
+                self._cut()
+                return
+            self._reply(200, headers={"X-Goog-Upload-Status": "active"})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(upload.time, "sleep", lambda seconds: None)
+    srv = FakeUploadServer()
+    thread = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.mp4"
+    # Four full chunks and a partial last one
+    path.write_bytes(os.urandom(4 * CHUNK_GRANULARITY + 1000))
+    return path
+
+
+def _uploader(server, tmp_path, **kwargs) -> ResumableUploader:
+    return ResumableUploader(
+        "test-key",
+        chunk_size=CHUNK_GRANULARITY,
+        sessions=UploadSessions(tmp_path / "sessions.json"),
+        base_url=server.base_url,
+        timeout=5.0,
+        **kwargs,
+    )
+
+
+def test_uploads_in_chunks(server, tmp_path, video):
+    progress = []
+    file = _uploader(server, tmp_path).upload(
+        video, on_progress=lambda sent, total: progress.append(sent)
+    )
+    assert file.name == "files/1"
+    assert server.sessions["1"] == video.read_bytes()
+    assert progress[-1] == video.stat().st_size
+    assert (
+        UploadSessions(tmp_path / "sessions.json").get(
+            f"{upload.key_id('test-key')}:{UploadSessions.key(video)}"
+        )
+        is None
+    )
+
+
+def test_resumes_after_mid_chunk_drop(server, tmp_path, video):
+    # Chunks of two granules, so a drop can commit part of a chunk: the first
+    # drop commits nothing, the second the first granule of the second chunk
+    server.script = [("drop", 100 * 1024), None, ("drop", CHUNK_GRANULARITY + 10), None]
+    uploader = _uploader(server, tmp_path)
+    uploader.chunk_size = 2 * CHUNK_GRANULARITY
+    file = uploader.upload(video)
+    assert file.name == "files/1"
+    assert server.starts == 1
+    assert server.sessions["1"] == video.read_bytes()
+    assert server.script == []
+
+
+def test_retries_server_errors_and_rate_limits(server, tmp_path, video):
+    server.script = [503, None, 429, 500]
+    file = _uploader(server, tmp_path).upload(video)
+    assert file.name == "files/1"
+    assert server.starts == 1
+    assert server.sessions["1"] == video.read_bytes()
+
+
+def test_gives_up_after_max_retries_keeping_status(server, tmp_path, video):
+    server.script = [503, 503, 503]
+    with pytest.raises(UploadError) as excinfo:
+        _uploader(server, tmp_path, max_retries=2).upload(video)
+    assert excinfo.value.status_code == 503
+
+
+def test_retries_failed_start(server, tmp_path, video):
+    server.start_script = [503, "drop", 429]
+    file = _uploader(server, tmp_path).upload(video)
+    assert file.name == "files/1"
+    assert server.start_script == []
+    assert server.sessions["1"] == video.read_bytes()
+
+
+def test_start_gives_up_with_upload_error(server, tmp_path, video):
+    server.start_script = ["drop", "drop", "drop"]
+    with pytest.raises(UploadError) as excinfo:
+        _uploader(server, tmp_path, max_retries=2).upload(video)
+    assert excinfo.value.status_code is None
+    assert server.starts == 0
+
+    server.start_script = [400]
+    with pytest.raises(UploadError) as excinfo:
+        _uploader(server, tmp_path).upload(video)
+    assert excinfo.value.status_code == 400
+    assert server.start_script == []
+
+
+def test_rejection_is_not_retried(server, tmp_path, video):
+    server.script = [403]
+    with pytest.raises(UploadError) as excinfo:
+        _uploader(server, tmp_path).upload(video)
+    assert excinfo.value.status_code == 403
+    assert server.script == []
+
+
+def test_rerun_resumes_persisted_session(server, tmp_path, video):
+    server.script = [None, None, ("drop", CHUNK_GRANULARITY // 2)]
+    with pytest.raises(UploadError):
+        _uploader(server, tmp_path, max_retries=0).upload(video)
+    assert len(server.sessions["1"]) == 2 * CHUNK_GRANULARITY
+
+    # A new process: same session file, fresh uploader
+    file = _uploader(server, tmp_path).upload(video)
+    assert file.name == "files/1"
+    assert server.starts == 1
+    assert server.sessions["1"] == video.read_bytes()
+
+
+@pytest.mark.parametrize("query_includes_file", [True, False])
+def test_final_on_query_returns_file(server, tmp_path, video, query_includes_file):
+    # The finalizing chunk is committed but its response never arrives
+    server.script = [None, None, None, None, "drop-after"]
+    server.query_includes_file = query_includes_file
+    file = _uploader(server, tmp_path).upload(video)
+    assert file.name == "files/1"
+    assert file.display_name == "clip.mp4"
+    assert file.size_bytes == video.stat().st_size
+    assert server.starts == 1
+
+
+def test_rerun_after_completed_upload_returns_file(server, tmp_path, video):
+    server.script = [None, None, None, None, "drop-after"]
+    server.query_includes_file = False
+    with pytest.raises(UploadError):
+        # No retries: the lost response fails this run with the upload complete
+        _uploader(server, tmp_path, max_retries=0).upload(video)
+    file = _uploader(server, tmp_path).upload(video)
+    assert file.name == "files/1"
+    assert server.starts == 1